@@ -0,0 +1,103 @@
+import json
+import os
+import uuid
+
+from calendar_sync import BASE_DIR, STORE_PATH, TOKEN_PATH
+
+
+ACCOUNTS_PATH = os.path.join(BASE_DIR, "accounts.json")
+
+
+class Account:
+    __slots__ = ("id", "name", "token_path", "store_path")
+
+    def __init__(self, account_id, name, token_path, store_path):
+        self.id = account_id
+        # The primary calendar's title (the address, for Google accounts); "" until known
+        self.name = name
+        self.token_path = token_path
+        self.store_path = store_path
+
+
+class AccountRegistry:
+    """The Google accounts signed in on this machine, each with its own token and store file.
+
+    Without a registry file there is one account on the original ``token.pkl`` and
+    ``events.db``, so an existing install keeps its login and its cache. Accounts added later
+    get their files next to the registry.
+    """
+
+    def __init__(self, path=ACCOUNTS_PATH, store_path=STORE_PATH, token_path=TOKEN_PATH):
+        self.path = path
+        self._dir = os.path.dirname(os.path.abspath(path))
+        self.accounts = []
+        self.active_id = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.accounts = [
+                Account(a["id"], a.get("name", ""), self._abspath(a["token"]), self._abspath(a["store"]))
+                for a in data.get("accounts", [])
+            ]
+            self.active_id = data.get("active")
+        if not self.accounts:
+            self.accounts = [Account("default", "", token_path, store_path)]
+        if self.get(self.active_id) is None:
+            self.active_id = self.accounts[0].id
+
+    def _abspath(self, path):
+        return path if os.path.isabs(path) else os.path.join(self._dir, path)
+
+    def _relpath(self, path):
+        # Files next to the registry are saved by name, so the folder can be moved
+        return os.path.basename(path) if os.path.dirname(os.path.abspath(path)) == self._dir else path
+
+    @property
+    def active(self):
+        return self.get(self.active_id)
+
+    def get(self, account_id):
+        for account in self.accounts:
+            if account.id == account_id:
+                return account
+        return None
+
+    def add(self):
+        """A new account with fresh token and store files; it logs in when first used."""
+        account_id = uuid.uuid4().hex[:8]
+        account = Account(account_id, "", os.path.join(self._dir, f"token-{account_id}.pkl"),
+                          os.path.join(self._dir, f"events-{account_id}.db"))
+        self.accounts.append(account)
+        self.save()
+        return account
+
+    def remove(self, account_id):
+        self.accounts = [account for account in self.accounts if account.id != account_id]
+        if self.active_id == account_id and self.accounts:
+            self.active_id = self.accounts[0].id
+        self.save()
+
+    def set_active(self, account_id):
+        if self.active_id != account_id:
+            self.active_id = account_id
+            self.save()
+
+    def rename(self, account_id, name):
+        account = self.get(account_id)
+        if account is not None and account.name != name:
+            account.name = name
+            self.save()
+
+    def save(self):
+        data = {
+            "active": self.active_id,
+            "accounts": [
+                {"id": a.id, "name": a.name, "token": self._relpath(a.token_path), "store": self._relpath(a.store_path)}
+                for a in self.accounts
+            ],
+        }
+        # Written aside and swapped in, so a crash never leaves a half-written registry
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
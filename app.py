@@ -1,85 +1,945 @@
 import sys
 import os
+import time
+# Taken before the heavy imports so the startup breakdown can include them
+STARTUP_T0 = time.perf_counter()
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
-    QCalendarWidget, QListWidget, QPushButton, QInputDialog, QMessageBox, QLabel, QSizePolicy,
-    QDialog, QFormLayout, QLineEdit, QTimeEdit, QDialogButtonBox, QSpinBox, QComboBox, QTextEdit, QListWidgetItem, QTextBrowser, QToolButton
+    QCalendarWidget, QListView, QPushButton, QInputDialog, QMessageBox, QLabel, QSizePolicy,
+    QDialog, QFormLayout, QLineEdit, QTimeEdit, QDialogButtonBox, QSpinBox, QComboBox, QTextEdit,
+    QStyledItemDelegate, QStyle, QMenu, QShortcut, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog,
+    QProgressDialog, QListWidget, QListWidgetItem, QDateEdit, QScrollArea, QToolTip, QAbstractScrollArea,
+    QStackedWidget, QButtonGroup, QSystemTrayIcon
 )
 from PyQt5.QtCore import QDate, Qt, QRectF, QSize, QEvent
-from PyQt5.QtGui import QFont, QPainter, QColor, QPainterPath, QTextOption, QPixmap, QPolygon, QIcon
-from PyQt5.QtCore import QDate, Qt, QRectF, QSize, QEvent, QPoint
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-import pickle
+from PyQt5.QtGui import QFont, QPainter, QColor, QTextOption, QPolygon, QPixmap, QTextDocument, QFontMetrics, QFontInfo, QDesktopServices
+from PyQt5.QtGui import QAbstractTextDocumentLayout, QPalette, QKeySequence, QPen, QIcon
+from PyQt5.QtCore import QDate, Qt, QRectF, QSize, QEvent, QPoint, QRect, QUrl, QTime, QPointF, QLocale
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, QAbstractListModel, QModelIndex
+from googleapiclient.errors import HttpError
+import bisect
 import datetime
+import heapq
 import subprocess
+import threading
+import uuid
+from collections import OrderedDict
+from event_record import EventRecord
+from event_store import event_row
+from outbox import classify, backoff_delay, DONE, RETRY
+from month_cache import MonthCache, local_midnight_ts, month_index, month_range, shift_month
+from metrics import METRICS, DUMP_PATH
+from calendar_sync import CalendarSync, STORE_PATH
+from accounts import AccountRegistry, ACCOUNTS_PATH
+from ics_io import export_calendar, import_calendar
+from availability import Availability, FREE_SLOT_HORIZON_DAYS
+from reminders import MAX_REMINDER_MINUTES, ReminderQueue, popup_minutes
+from request_scheduler import RequestScheduler
+from time_layout import (
+    MIN_BLOCK_MINUTES, bucket_by_day, day_bounds, events_on_day, is_day_long, layout_days, split_by_day
+)
 
-SCOPES = ["https://www.googleapis.com/auth/calendar"]
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CREDENTIALS_PATH = os.path.join(BASE_DIR, "credentials.json")
-TOKEN_PATH = os.path.join(BASE_DIR, "token.pkl")
 SHOW_HOLIDAYS = True
-HOLIDAY_CALENDAR_IDS = [
-    "ro.romanian#holiday@group.v.calendar.google.com",
-    "ro.romanian@holiday.calendar.google.com",
-    "en.romanian#holiday@group.v.calendar.google.com",
-]
+API_WORKER_THREADS = 4
+# Seconds between background refreshes: focused window, visible but unfocused, minimized
+POLL_INTERVAL_ACTIVE = 60
+POLL_INTERVAL_INACTIVE = 5 * 60
+POLL_INTERVAL_MINIMIZED = 30 * 60
+SHOW_STARTUP_TIMINGS = "--timings" in sys.argv or os.environ.get("CALENDAR_STARTUP_TIMINGS") == "1"
+# Instrumentation (metrics.py), which CALENDAR_METRICS=1 also turns on
+COLLECT_METRICS = "--metrics" in sys.argv
+# Sync recurring events as masters and expand them here (see CalendarSync)
+EXPAND_RECURRENCE_LOCALLY = "--local-recurrence" in sys.argv or os.environ.get("CALENDAR_LOCAL_RECURRENCE") == "1"
+MONTH_CACHE_BYTES = 16 * 1024 * 1024
+# Holiday lookups wait until paging has paused this long; they and the month prefetches run
+# at most this many at a time (the rest of the pool is left to syncs and writes), and are
+# dropped while queued once the view is more months than this away from them
+NAVIGATION_SETTLE_SECONDS = 0.15
+SCHEDULED_REQUESTS = 2
+SCHEDULED_KEEP_MONTHS = 2
+OUTBOX_BATCH_SIZE = 50
+# Google's event colours by colorId
+GOOGLE_COLORS = {
+    "1": "#a4bdfc", "2": "#7ae7bf", "3": "#dbadff", "4": "#ff887c",
+    "5": "#fbd75b", "6": "#ffb878", "7": "#46d6db", "8": "#e1e1e1",
+    "9": "#5484ed", "10": "#51b749", "11": "#dc2127"
+}
+DEFAULT_EVENT_COLOR = "#51b749"
+HOLIDAY_COLOR = "#4caf50"
+# Calendar id of the records standing in for public holidays in the month grid
+HOLIDAY_CALENDAR = "#holidays"
+# Longest the reminder timer sleeps, so a wake from sleep is noticed within that long
+REMINDER_CHECK_SECONDS = 60
+# Missed reminders (asleep, busy) still show while their event started less than this ago
+REMINDER_LATE_GRACE = 15 * 60
+# Reminders are queued for events starting up to this far ahead, loaded a day at a time
+REMINDER_LOOKAHEAD = MAX_REMINDER_MINUTES * 60 + 24 * 3600
+REMINDER_EXTEND_SECONDS = 24 * 3600
+# More reminders than this at once are summed up in one notification
+REMINDER_LIST_LIMIT = 5
+REMINDER_TOAST_MS = 10 * 1000
+# Access tokens (of every signed-in account) are renewed this long before they expire,
+# and a failed renewal is tried again after the second delay
+TOKEN_REFRESH_MARGIN = 5 * 60
+TOKEN_REFRESH_RETRY = 5 * 60
+
+
+def after_paint(callback):
+    # Runs once the current paint pass is over: lets per-cell timings add up to one frame
+    QTimer.singleShot(0, callback)
+
+
+class StartupTimer:
+    """Collects named checkpoints since process start; prints them once when enabled."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = []
+        self._last = STARTUP_T0
+        self._reported = False
+
+    def mark(self, label):
+        if not self.enabled or self._reported:
+            return
+        now = time.perf_counter()
+        self.marks.append((label, (now - STARTUP_T0) * 1000, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self):
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        lines = ["startup timings (ms):"]
+        for label, total, step in self.marks:
+            lines.append(f"  {label:<28} {total:8.1f}  (+{step:.1f})")
+        print("\n".join(lines), file=sys.stderr)
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    progress = pyqtSignal(object)
+
+
+class ApiWorker(QRunnable):
+    """Runs a blocking API call on the thread pool and reports back through signals."""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+
+CELL_SHADE_CURRENT = QColor(0, 0, 0, 40)
+CELL_SHADE_OTHER = QColor(0, 0, 0, 90)
+PILL_TEXT_COLOR = QColor("#0b1a10")
+PILL_HEIGHT = 18
+
 
 class Calendar(QCalendarWidget):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, color_fn, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.color_fn = color_fn
+        # QDate -> EventRecords shown in that cell, the same objects the month cache holds
         self.date_to_events = {}
+        # (date, width, height) -> pre-rendered pills for that cell; rebuilt only when
+        # the month's events change or the cells are resized
+        self._cell_cache = {}
+        self._colors = {}
 
+    @METRICS.accumulated("paint/calendar_frame", after_paint)
     def paintCell(self, painter: QPainter, rect, date: QDate):
         super().paintCell(painter, rect, date)
         is_selected = (date == self.selectedDate())
         is_current_month = (date.month() == self.monthShown() and date.year() == self.yearShown())
         if not is_selected:
-            painter.save()
-            if is_current_month:
-                painter.fillRect(rect, QColor(0, 0, 0, 40))
-            else:
-                painter.fillRect(rect, QColor(0, 0, 0, 90))
-            painter.restore()
+            painter.fillRect(rect, CELL_SHADE_CURRENT if is_current_month else CELL_SHADE_OTHER)
 
         # Render event titles (first 2) inside the cell for current month
         if is_current_month and date in self.date_to_events:
-            events = self.date_to_events.get(date, [])[:2]
-            if events:
-                painter.save()
-                painter.setRenderHint(QPainter.Antialiasing, True)
-                y = rect.top() + 18
-                for title, color_hex in events:
-                    pill_rect = rect.adjusted(8, y - rect.top(), -8, 0)
-                    pill_rect.setHeight(18)
-                    painter.setBrush(QColor(color_hex))
-                    painter.setPen(Qt.NoPen)
-                    path = QPainterPath()
-                    path.addRoundedRect(QRectF(pill_rect), 9.0, 9.0)
-                    painter.drawPath(path)
-                    painter.setPen(QColor("#0b1a10"))
-                    elided = title[:22] + ("…" if len(title) > 22 else "")
-                    painter.drawText(pill_rect.adjusted(6, 0, -6, 0), 0x84, elided)
-                    y += 18
-                painter.restore()
+            key = (date, rect.width(), rect.height())
+            pixmap = self._cell_cache.get(key)
+            if pixmap is None:
+                pixmap = self._cell_cache[key] = self._render_cell_events(
+                    self.date_to_events[date][:2], rect.size(), painter.font())
+            painter.drawPixmap(rect.topLeft(), pixmap)
+
+    def _render_cell_events(self, events, size, font):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(size * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        # Pin the pixel size so the pixmap's DPI cannot change how big the text comes out
+        font = QFont(font)
+        font.setPixelSize(QFontInfo(font).pixelSize())
+        painter.setFont(font)
+        fm = QFontMetrics(font)
+        y = PILL_HEIGHT
+        for event in events:
+            pill_rect = QRect(8, y, size.width() - 16, PILL_HEIGHT)
+            painter.setBrush(self._color(self.color_fn(event)))
+            painter.setPen(Qt.NoPen)
+            painter.drawRoundedRect(QRectF(pill_rect), 9.0, 9.0)
+            painter.setPen(PILL_TEXT_COLOR)
+            text_rect = pill_rect.adjusted(6, 0, -6, 0)
+            elided = fm.elidedText(event.summary or "Fără titlu", Qt.ElideRight, text_rect.width())
+            painter.drawText(text_rect, Qt.AlignCenter, elided)
+            y += PILL_HEIGHT
+        painter.end()
+        return pixmap
+
+    def _color(self, color_hex):
+        color = self._colors.get(color_hex)
+        if color is None:
+            color = self._colors[color_hex] = QColor(color_hex)
+        return color
+
+    def resizeEvent(self, event):
+        self._cell_cache.clear()
+        super().resizeEvent(event)
 
     def set_events_for_month(self, mapping):
         self.date_to_events = mapping or {}
+        self._cell_cache.clear()
         self.updateCells()
 
+    def set_events_for_day(self, date, entries):
+        if entries:
+            self.date_to_events[date] = entries
+        else:
+            self.date_to_events.pop(date, None)
+        for key in [k for k in self._cell_cache if k[0] == date]:
+            del self._cell_cache[key]
+        self.updateCell(date)
+
+
+HEATMAP_CELL = 12
+HEATMAP_GAP = 2
+HEATMAP_LABEL_WIDTH = 44
+HEATMAP_MONTH_HEIGHT = 16
+HEATMAP_YEAR_GAP = 10
+# Empty day, then four levels from the quartiles of the non-empty days
+HEATMAP_COLORS = [QColor(c) for c in ("#262626", "#0e4429", "#006d32", "#26a641", "#39d353")]
+HEATMAP_YEARS = 5
+MONTH_INITIALS = "IFMAMIIASOND"
+
+
+class YearHeatmap(QWidget):
+    """Per-day density over whole years, one row of weeks per year, painted into one cached pixmap."""
+
+    dayClicked = pyqtSignal(QDate)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.first_year = QDate.currentDate().year()
+        self.years = 1
+        self.values = []
+        self.unit = ""
+        self._pixmap = None
+        self.setMouseTracking(True)
+        self._resize()
+
+    def set_values(self, first_year, years, values, unit):
+        """``values`` holds one number per day from 1 January of ``first_year`` on."""
+        self.first_year, self.years, self.values, self.unit = first_year, years, values, unit
+        self._pixmap = None
+        self._resize()
+        self.update()
+
+    def _resize(self):
+        self.setFixedSize(HEATMAP_LABEL_WIDTH + 54 * (HEATMAP_CELL + HEATMAP_GAP), self._block_top(self.years))
+
+    @staticmethod
+    def _grid_start(year):
+        # Columns are Monday-to-Sunday weeks, the first one holding 1 January
+        jan1 = datetime.date(year, 1, 1)
+        return jan1 - datetime.timedelta(days=jan1.weekday())
+
+    @staticmethod
+    def _block_top(block):
+        return block * (HEATMAP_MONTH_HEIGHT + 7 * (HEATMAP_CELL + HEATMAP_GAP) + HEATMAP_YEAR_GAP)
+
+    def _cell_rect(self, day):
+        week = HEATMAP_CELL + HEATMAP_GAP
+        offset = (day - self._grid_start(day.year)).days
+        top = self._block_top(day.year - self.first_year) + HEATMAP_MONTH_HEIGHT
+        return QRect(HEATMAP_LABEL_WIDTH + offset // 7 * week, top + offset % 7 * week, HEATMAP_CELL, HEATMAP_CELL)
+
+    def date_at(self, pos):
+        week = HEATMAP_CELL + HEATMAP_GAP
+        block, y = divmod(pos.y(), self._block_top(1))
+        column, x = divmod(pos.x() - HEATMAP_LABEL_WIDTH, week)
+        row, y = divmod(y - HEATMAP_MONTH_HEIGHT, week)
+        if block >= self.years or column < 0 or not 0 <= row < 7 or x >= HEATMAP_CELL or y >= HEATMAP_CELL:
+            return None
+        year = self.first_year + block
+        day = self._grid_start(year) + datetime.timedelta(days=column * 7 + row)
+        return day if day.year == year else None
+
+    def _value(self, day):
+        i = (day - datetime.date(self.first_year, 1, 1)).days
+        return self.values[i] if 0 <= i < len(self.values) else 0
+
+    def _render(self):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        busy = sorted(v for v in self.values if v)
+        thresholds = [busy[len(busy) * q // 4] for q in (1, 2, 3)] if busy else []
+        # One batch of rectangles per colour rather than a fill per day
+        levels = [[] for _ in HEATMAP_COLORS]
+        first = datetime.date(self.first_year, 1, 1)
+        day, i = first, 0
+        while day.year < self.first_year + self.years:
+            value = self.values[i] if i < len(self.values) else 0
+            level = bisect.bisect_right(thresholds, value) + 1 if value else 0
+            levels[level].append(self._cell_rect(day))
+            day += datetime.timedelta(days=1)
+            i += 1
+
+        painter = QPainter(pixmap)
+        painter.setPen(Qt.NoPen)
+        for color, rects in zip(HEATMAP_COLORS, levels):
+            if rects:
+                painter.setBrush(color)
+                painter.drawRects(rects)
+        painter.setPen(QColor("#bbbbbb"))
+        font = QFont("Segoe UI")
+        font.setPixelSize(10)
+        painter.setFont(font)
+        for block in range(self.years):
+            year = self.first_year + block
+            top = self._block_top(block)
+            painter.drawText(QRect(0, top + HEATMAP_MONTH_HEIGHT, HEATMAP_LABEL_WIDTH - 6, HEATMAP_CELL * 2),
+                             Qt.AlignRight | Qt.AlignTop, str(year))
+            for month in range(1, 13):
+                left = self._cell_rect(datetime.date(year, month, 1)).left()
+                painter.drawText(QRect(left, top, 3 * HEATMAP_CELL, HEATMAP_MONTH_HEIGHT),
+                                 Qt.AlignLeft | Qt.AlignVCenter, MONTH_INITIALS[month - 1])
+        painter.end()
+        return pixmap
+
+    @METRICS.timed("paint/year_heatmap")
+    def paintEvent(self, event):
+        if self._pixmap is None or self._pixmap.devicePixelRatio() != self.devicePixelRatioF():
+            self._pixmap = self._render()
+        QPainter(self).drawPixmap(0, 0, self._pixmap)
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            day = self.date_at(event.pos())
+            if day is None:
+                QToolTip.hideText()
+            else:
+                value = self._value(day)
+                QToolTip.showText(event.globalPos(), f"{day:%d.%m.%Y}: {value:g} {self.unit}", self)
+            return True
+        return super().event(event)
+
+    def mousePressEvent(self, event):
+        day = self.date_at(event.pos())
+        if event.button() == Qt.LeftButton and day is not None:
+            self.dayClicked.emit(QDate(day.year, day.month, day.day))
+        super().mousePressEvent(event)
+
+
+EVENT_ROLE = Qt.UserRole
+COLOR_ROLE = Qt.UserRole + 1
+EXPANDED_ROLE = Qt.UserRole + 2
+AGENDA_TIME_ROLE = Qt.UserRole + 3
+AGENDA_DATE_ROLE = Qt.UserRole + 4
+DESCRIPTION_ROLE = Qt.UserRole + 5
+
+
+class EventListModel(QAbstractListModel):
+    def __init__(self, label_fn, color_fn, description_fn, parent=None):
+        super().__init__(parent)
+        self.label_fn = label_fn
+        self.color_fn = color_fn
+        self.description_fn = description_fn
+        self.events = []
+        # Keyed by event key rather than row, so inserting or removing a row keeps them valid
+        self._labels = {}
+        self._expanded = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.events)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        event = self.events[index.row()]
+        if role == Qt.DisplayRole:
+            # Labels parse the start time, so only build them for rows that actually get painted
+            key = event.key
+            label = self._labels.get(key)
+            if label is None:
+                label = self._labels[key] = self.label_fn(event)
+            return label
+        if role == EVENT_ROLE:
+            return event
+        if role == COLOR_ROLE:
+            return self.color_fn(event)
+        if role == EXPANDED_ROLE:
+            return event.key in self._expanded
+        if role == DESCRIPTION_ROLE:
+            # Descriptions stay in the store until a row is expanded
+            return self.description_fn(event)
+        return None
+
+    def set_events(self, events):
+        self.beginResetModel()
+        self.events = events
+        self._labels.clear()
+        self._expanded.clear()
+        self.endResetModel()
+
+    def row_of(self, key):
+        for row, event in enumerate(self.events):
+            if event.key == key:
+                return row
+        return -1
+
+    def insert_event(self, row, event):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.events.insert(row, event)
+        self.endInsertRows()
+
+    def remove_event(self, row):
+        event = self.events[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.events[row]
+        self._labels.pop(event.key, None)
+        self.endRemoveRows()
+
+    def replace_event(self, row, event):
+        self._labels.pop(self.events[row].key, None)
+        self.events[row] = event
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def toggle_expanded(self, row):
+        key = self.events[row].key
+        if key in self._expanded:
+            self._expanded.discard(key)
+        else:
+            self._expanded.add(key)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [EXPANDED_ROLE])
+
+
+class EventItemDelegate(QStyledItemDelegate):
+    """Paints a day-list row (colour dot, time, title, chevron and, when expanded, the description)."""
+
+    toggleRequested = pyqtSignal(QModelIndex)
+
+    MARGIN = 8
+    SPACING = 6
+    DOT = 14
+    CHEVRON = 24
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._size_cache = {}
+        self._docs = {}
+        self._cached_width = None
+
+    def clear_cache(self):
+        self._size_cache.clear()
+        self._docs.clear()
+
+    def forget(self, key):
+        self._docs.pop(key, None)
+        self._size_cache.pop((key, False), None)
+        self._size_cache.pop((key, True), None)
+
+    def _row_width(self, option):
+        view = self.parent()
+        width = view.viewport().width() if view is not None else option.rect.width()
+        if width != self._cached_width:
+            # Word wrapping depends on the width, so every cached height is stale now
+            self._cached_width = width
+            self._size_cache.clear()
+        return width
+
+    def _title_rect(self, rect):
+        left = rect.left() + self.MARGIN + self.DOT
+        right = rect.right() - self.MARGIN - self.CHEVRON - self.SPACING
+        return QRect(left, rect.top() + self.MARGIN, max(right - left, 1), rect.height())
+
+    def _description_doc(self, index, width):
+        key = index.data(EVENT_ROLE).key
+        doc = self._docs.get(key)
+        if doc is None:
+            desc = index.data(DESCRIPTION_ROLE).strip()
+            doc = QTextDocument(self)
+            doc.setDefaultFont(self.parent().font() if self.parent() is not None else QFont())
+            doc.setDefaultStyleSheet("a { color: #64b5f6; }")
+            opt = QTextOption()
+            opt.setWrapMode(QTextOption.WrapAnywhere)
+            doc.setDefaultTextOption(opt)
+            if desc and Qt.mightBeRichText(desc):
+                doc.setHtml(desc)
+            else:
+                doc.setPlainText(desc if desc else "(fără descriere)")
+            self._docs[key] = doc
+        doc.setTextWidth(max(width, 1))
+        return doc
+
+    def _description_origin(self, rect, title_height):
+        return QPoint(rect.left() + self.MARGIN, rect.top() + self.MARGIN + title_height + self.SPACING)
+
+    def _title_height(self, option, index, rect):
+        fm = QFontMetrics(option.font)
+        text_rect = fm.boundingRect(self._title_rect(rect), Qt.TextWordWrap, index.data(Qt.DisplayRole))
+        return max(text_rect.height(), self.CHEVRON)
+
+    def sizeHint(self, option, index):
+        width = self._row_width(option)
+        expanded = index.data(EXPANDED_ROLE)
+        key = (index.data(EVENT_ROLE).key, expanded)
+        size = self._size_cache.get(key)
+        if size is None:
+            rect = QRect(0, 0, width, 0)
+            height = self.MARGIN + self._title_height(option, index, rect) + self.MARGIN + 4
+            if expanded:
+                doc = self._description_doc(index, width - 2 * self.MARGIN)
+                height += self.SPACING + int(doc.size().height())
+            size = self._size_cache[key] = QSize(width, height)
+        return size
+
+    @METRICS.accumulated("paint/day_list_frame", after_paint)
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style() if widget is not None else QApplication.style()
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, widget)
+
+        rect = option.rect
+        expanded = index.data(EXPANDED_ROLE)
+        title_height = self._title_height(option, index, rect)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        fm = QFontMetrics(option.font)
+        dot_y = rect.top() + self.MARGIN + fm.height() // 2
+        color = QColor(index.data(COLOR_ROLE))
+        if index.data(EVENT_ROLE).pending:
+            # Hollow dot: this change has not reached the server yet
+            painter.setPen(color)
+            painter.setBrush(Qt.NoBrush)
+            painter.drawEllipse(QPoint(rect.left() + self.MARGIN + 4, dot_y), 3, 3)
+        else:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color)
+            painter.drawEllipse(QPoint(rect.left() + self.MARGIN + 4, dot_y), 4, 4)
+
+        painter.setPen(QColor("#ffffff"))
+        painter.setFont(option.font)
+        painter.drawText(self._title_rect(rect), Qt.TextWordWrap, index.data(Qt.DisplayRole))
+
+        chevron = QRect(rect.right() - self.MARGIN - self.CHEVRON, rect.top() + self.MARGIN, self.CHEVRON, self.CHEVRON)
+        painter.setPen(QColor("#3a3a3a"))
+        painter.setBrush(QColor("#2a2a2a"))
+        painter.drawRoundedRect(QRectF(chevron), 6, 6)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#d0d0d0"))
+        x, y = chevron.left() + 6, chevron.top() + 6
+        if expanded:
+            poly = QPolygon([QPoint(x + 2, y + 4), QPoint(x + 6, y + 9), QPoint(x + 10, y + 4)])
+        else:
+            poly = QPolygon([QPoint(x + 4, y + 2), QPoint(x + 9, y + 6), QPoint(x + 4, y + 10)])
+        painter.drawPolygon(poly)
+
+        if expanded:
+            doc = self._description_doc(index, rect.width() - 2 * self.MARGIN)
+            painter.translate(self._description_origin(rect, title_height))
+            ctx = QAbstractTextDocumentLayout.PaintContext()
+            ctx.palette.setColor(QPalette.Text, QColor("#ffffff"))
+            doc.documentLayout().draw(painter, ctx)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            if index.data(EXPANDED_ROLE):
+                rect = option.rect
+                origin = self._description_origin(rect, self._title_height(option, index, rect))
+                doc = self._description_doc(index, rect.width() - 2 * self.MARGIN)
+                anchor = doc.documentLayout().anchorAt(event.pos() - origin)
+                if anchor:
+                    QDesktopServices.openUrl(QUrl(anchor))
+                    return True
+            self.toggleRequested.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+WEEK_DAYS = 7
+WEEK_HOUR_HEIGHT = 40
+WEEK_GUTTER = 48
+WEEK_HEADER_HEIGHT = 30
+WEEK_LANE_HEIGHT = 20
+WEEK_FIRST_HOUR = 8
+WEEK_DAY_NAMES = ("Lu", "Ma", "Mi", "Jo", "Vi", "Sâ", "Du")
+NOW_LINE_COLOR = QColor("#e53935")
+LAYOUT_CACHE_SIZE = 8
+AGENDA_ROW_HEIGHT = 30
+AGENDA_HORIZON_MONTHS = 60
+ROMANIAN = QLocale(QLocale.Romanian, QLocale.Romania)
+
+
+class WeekView(QAbstractScrollArea):
+    """Seven days side by side on an hour grid, painted straight from a ``TimeGridLayout``:
+    day-long events as bars across the top, overlapping ones in columns within a day.
+    """
+
+    eventClicked = pyqtSignal(object, QDate)
+    eventActivated = pyqtSignal(object, QDate)
+    dayClicked = pyqtSignal(QDate)
+
+    def __init__(self, color_fn, parent=None):
+        super().__init__(parent)
+        self.color_fn = color_fn
+        self.grid = None
+        self.selected_date = None
+        self.selected_key = None
+        self._colors = {}
+        self._scrolled = False
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(WEEK_HOUR_HEIGHT // 2)
+        self.viewport().setMouseTracking(True)
+        font = QFont("Segoe UI")
+        font.setPixelSize(11)
+        self.setFont(font)
+        # The red "now" line moves on its own
+        self._clock = QTimer(self)
+        self._clock.timeout.connect(self.viewport().update)
+        self._clock.start(60 * 1000)
+
+    def set_grid(self, grid, selected_date, selected_key=None):
+        self.grid = grid
+        self.selected_date = selected_date
+        self.selected_key = selected_key
+        self._update_scroll_range()
+        if not self._scrolled:
+            self._scrolled = True
+            self.verticalScrollBar().setValue(WEEK_FIRST_HOUR * WEEK_HOUR_HEIGHT)
+        self.viewport().update()
+
+    def _grid_top(self):
+        lanes = self.grid.lanes if self.grid is not None else 0
+        return WEEK_HEADER_HEIGHT + max(lanes, 1) * WEEK_LANE_HEIGHT + 4
+
+    def _update_scroll_range(self):
+        visible = self.viewport().height() - self._grid_top()
+        self.verticalScrollBar().setPageStep(max(visible, 1))
+        self.verticalScrollBar().setRange(0, max(24 * WEEK_HOUR_HEIGHT - visible, 0))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_range()
+
+    def scrollContentsBy(self, dx, dy):
+        # The header stays put, so repaint rather than let Qt shift the pixels
+        self.viewport().update()
+
+    def _column_width(self):
+        return (self.viewport().width() - WEEK_GUTTER) / WEEK_DAYS
+
+    def _day_x(self, day):
+        return WEEK_GUTTER + day * self._column_width()
+
+    def _day_date(self, day):
+        first = self.grid.first
+        return QDate(first.year, first.month, first.day).addDays(day)
+
+    def _color(self, event):
+        color_hex = self.color_fn(event)
+        color = self._colors.get(color_hex)
+        if color is None:
+            color = self._colors[color_hex] = QColor(color_hex)
+        return color
+
+    def _bar_rect(self, bar):
+        left = self._day_x(bar.first)
+        return QRectF(left + 1, WEEK_HEADER_HEIGHT + bar.column * WEEK_LANE_HEIGHT + 1,
+                      self._day_x(bar.last + 1) - left - 2, WEEK_LANE_HEIGHT - 2)
+
+    def _block_rect(self, block):
+        width = self._column_width() - 4
+        top = block.start * WEEK_HOUR_HEIGHT / 60
+        bottom = max(block.end, block.start + MIN_BLOCK_MINUTES) * WEEK_HOUR_HEIGHT / 60
+        return QRectF(self._day_x(block.day) + 2 + block.column * width / block.columns,
+                      self._grid_top() - self.verticalScrollBar().value() + top,
+                      width / block.columns - 1, bottom - top - 1)
+
+    @METRICS.timed("paint/week_view")
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor("#1e1e1e"))
+        if self.grid is None:
+            return
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        fm = QFontMetrics(self.font())
+        width, height = self.viewport().width(), self.viewport().height()
+        top = self._grid_top()
+        scroll = self.verticalScrollBar().value()
+        today = datetime.date.today()
+        today_column = (today - self.grid.first).days
+
+        painter.save()
+        painter.setClipRect(QRect(0, top, width, height - top))
+        if 0 <= today_column < WEEK_DAYS:
+            painter.fillRect(QRectF(self._day_x(today_column), top, self._column_width(), height - top),
+                             QColor(255, 255, 255, 8))
+        for hour in range(25):
+            y = top - scroll + hour * WEEK_HOUR_HEIGHT
+            painter.setPen(QColor("#2e2e2e"))
+            painter.drawLine(WEEK_GUTTER, y, width, y)
+            if 0 < hour < 24:
+                painter.setPen(QColor("#888888"))
+                painter.drawText(QRect(0, y - fm.height() // 2, WEEK_GUTTER - 6, fm.height()),
+                                 Qt.AlignRight | Qt.AlignVCenter, f"{hour:02d}:00")
+        for day in range(WEEK_DAYS + 1):
+            x = round(self._day_x(day))
+            painter.setPen(QColor("#2e2e2e"))
+            painter.drawLine(x, top, x, height)
+        for day_blocks in self.grid.blocks:
+            for block in day_blocks:
+                self._paint_item(painter, fm, self._block_rect(block), block.event, self._block_times(block))
+        if 0 <= today_column < WEEK_DAYS:
+            now = datetime.datetime.now()
+            y = top - scroll + (now.hour * 60 + now.minute) * WEEK_HOUR_HEIGHT / 60
+            painter.setPen(NOW_LINE_COLOR)
+            painter.drawLine(QPoint(round(self._day_x(today_column)), round(y)),
+                             QPoint(round(self._day_x(today_column + 1)), round(y)))
+        painter.restore()
+
+        for day in range(WEEK_DAYS):
+            date = self._day_date(day)
+            rect = QRectF(self._day_x(day), 0, self._column_width(), WEEK_HEADER_HEIGHT)
+            if date == self.selected_date:
+                painter.fillRect(rect, QColor("#3a3a3a"))
+            painter.setPen(NOW_LINE_COLOR if day == today_column else QColor("#ffffff"))
+            painter.drawText(rect, Qt.AlignCenter, f"{WEEK_DAY_NAMES[day]} {date.day()}.{date.month():02d}")
+        for bar in self.grid.bars:
+            self._paint_item(painter, fm, self._bar_rect(bar), bar.event, "")
+        painter.setPen(QColor("#333333"))
+        painter.drawLine(0, top - 1, width, top - 1)
+
+    def _paint_item(self, painter, fm, rect, event, times):
+        painter.setPen(QPen(QColor("#ffffff"), 2) if event.key == self.selected_key else Qt.NoPen)
+        painter.setBrush(self._color(event))
+        painter.drawRoundedRect(rect, 4, 4)
+        painter.setPen(PILL_TEXT_COLOR)
+        text_rect = rect.adjusted(4, 1, -3, -1)
+        title = fm.elidedText(event.summary or "Fără titlu", Qt.ElideRight, int(text_rect.width()))
+        if times and text_rect.height() >= 2 * fm.height():
+            painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop, f"{title}\n{times}")
+        else:
+            painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop, title)
+
+    @staticmethod
+    def _block_times(block):
+        return f"{block.start // 60:02d}:{block.start % 60:02d}–{block.end // 60:02d}:{block.end % 60:02d}"
+
+    def item_at(self, pos):
+        """``(event or None, QDate)`` under a viewport position, or None outside the days."""
+        if self.grid is None or pos.x() < WEEK_GUTTER:
+            return None
+        day = min(int((pos.x() - WEEK_GUTTER) // self._column_width()), WEEK_DAYS - 1)
+        point = QPointF(pos)
+        if pos.y() < self._grid_top():
+            for bar in self.grid.bars:
+                if self._bar_rect(bar).contains(point):
+                    return bar.event, self._day_date(day)
+            return None, self._day_date(day)
+        # Later columns are painted on top, so look at them first
+        for block in reversed(self.grid.blocks[day]):
+            if self._block_rect(block).contains(point):
+                return block.event, self._day_date(day)
+        return None, self._day_date(day)
+
+    def mousePressEvent(self, event):
+        hit = self.item_at(event.pos()) if event.button() == Qt.LeftButton else None
+        if hit is not None:
+            if hit[0] is not None:
+                self.eventClicked.emit(hit[0], hit[1])
+            else:
+                self.dayClicked.emit(hit[1])
+        super().mousePressEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        hit = self.item_at(event.pos())
+        if hit is not None and hit[0] is not None:
+            self.eventActivated.emit(hit[0], hit[1])
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip:
+            hit = self.item_at(event.pos())
+            if hit is not None and hit[0] is not None:
+                QToolTip.showText(event.globalPos(), hit[0].summary or "Fără titlu", self.viewport())
+            else:
+                QToolTip.hideText()
+            return True
+        return super().viewportEvent(event)
+
+
+class AgendaModel(QAbstractListModel):
+    """Days from ``start`` on, each a heading row followed by its events (multi-day ones on every
+    day they cover), loaded a month at a time as the view scrolls, through ``fetchMore``.
+
+    Rows are ``(date, event, start_ts, end_ts)``; headings have no event.
+    """
+
+    def __init__(self, load_events, color_fn, parent=None):
+        super().__init__(parent)
+        # load_events(year, month) -> records overlapping that month, in start order
+        self.load_events = load_events
+        self.color_fn = color_fn
+        self.items = []
+        self.start = None
+        self.months = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        date, event, start, end = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            if event is None:
+                return ROMANIAN.toString(QDate(date.year, date.month, date.day), "dddd, d MMMM yyyy")
+            return event.summary or "Fără titlu"
+        if role == EVENT_ROLE:
+            return event
+        if role == COLOR_ROLE:
+            return self.color_fn(event) if event is not None else None
+        if role == AGENDA_TIME_ROLE:
+            if event is None or is_day_long(event):
+                return None if event is None else "Toată ziua"
+            return f"{datetime.datetime.fromtimestamp(start):%H:%M}–{datetime.datetime.fromtimestamp(end):%H:%M}"
+        if role == AGENDA_DATE_ROLE:
+            return QDate(date.year, date.month, date.day)
+        return None
+
+    def reset(self, start, months=1):
+        """Start over from the local day ``start``, loading at least ``months`` months straight away."""
+        self.beginResetModel()
+        self.items = []
+        self.start = start
+        self.months = 0
+        self.endResetModel()
+        while self.months < months and self.canFetchMore():
+            self.fetchMore()
+
+    def covers(self, day):
+        """Whether ``day`` falls within the months loaded so far."""
+        if self.start is None:
+            return False
+        return self.start <= day < datetime.date(*shift_month(self.start.year, self.start.month, self.months), 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self.start is not None and self.months < AGENDA_HORIZON_MONTHS
+
+    @METRICS.timed("build/agenda_page")
+    def fetchMore(self, parent=QModelIndex()):
+        added = []
+        # An empty month adds no rows, and the view only asks again once rows arrive
+        while not added and self.canFetchMore():
+            year, month = shift_month(self.start.year, self.start.month, self.months)
+            first, end = month_range(year, month)
+            first = max(first, self.start)
+            days = (end - first).days
+            per_day = [[] for _ in range(days)]
+            for day, start, finish, event in split_by_day(self.load_events(year, month), day_bounds(first, days)):
+                per_day[day].append((not is_day_long(event), start, finish, event))
+            for day, entries in enumerate(per_day):
+                if entries:
+                    date = first + datetime.timedelta(days=day)
+                    added.append((date, None, 0, 0))
+                    entries.sort(key=lambda e: e[:2])
+                    added.extend((date, event, start, finish) for _, start, finish, event in entries)
+            self.months += 1
+        if added:
+            self.beginInsertRows(QModelIndex(), len(self.items), len(self.items) + len(added) - 1)
+            self.items.extend(added)
+            self.endInsertRows()
+
+
+class AgendaDelegate(QStyledItemDelegate):
+    """Paints an agenda row: a day heading, or a colour bar, the time and the title."""
+
+    TIME_WIDTH = 96
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), AGENDA_ROW_HEIGHT)
+
+    @METRICS.accumulated("paint/agenda_frame", after_paint)
+    def paint(self, painter, option, index):
+        rect = option.rect
+        painter.save()
+        if index.data(EVENT_ROLE) is None:
+            painter.fillRect(rect, QColor("#141414"))
+            font = QFont(option.font)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("#ffffff"))
+            painter.drawText(rect.adjusted(10, 0, -10, 0), Qt.AlignLeft | Qt.AlignBottom, index.data(Qt.DisplayRole))
+            painter.restore()
+            return
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, QColor("#2a2a2a"))
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(index.data(COLOR_ROLE)))
+        painter.drawRoundedRect(QRectF(rect.left() + 10, rect.top() + 6, 4, rect.height() - 12), 2, 2)
+        painter.setFont(option.font)
+        painter.setPen(QColor("#aaaaaa"))
+        time_rect = QRect(rect.left() + 22, rect.top(), self.TIME_WIDTH, rect.height())
+        painter.drawText(time_rect, Qt.AlignLeft | Qt.AlignVCenter, index.data(AGENDA_TIME_ROLE))
+        painter.setPen(QColor("#ffffff"))
+        title_rect = QRect(time_rect.right() + 8, rect.top(), rect.right() - time_rect.right() - 16, rect.height())
+        title = QFontMetrics(option.font).elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, title_rect.width())
+        painter.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter, title)
+        painter.restore()
+
 
 class AddEventDialog(QDialog):
-    def __init__(self, parent=None, default_date: QDate = None):
+    def __init__(self, parent=None, default_date: QDate = None, availability=None):
         super().__init__(parent)
         self.setWindowTitle("Adaugă eveniment")
+        self.availability = availability
         layout = QFormLayout(self)
         self.title_edit = QLineEdit(self)
+        self.date_edit = QDateEdit(default_date or QDate.currentDate(), self)
+        self.date_edit.setCalendarPopup(True)
+        self.date_edit.setDisplayFormat("dd.MM.yyyy")
         self.start_time = QTimeEdit(self)
         self.end_time = QTimeEdit(self)
         self.start_time.setDisplayFormat("HH:mm")
         self.end_time.setDisplayFormat("HH:mm")
+        self.conflict_label = QLabel(self)
+        self.conflict_label.setWordWrap(True)
+        self.free_slot_button = QPushButton("🔎 Următorul interval liber", self)
+        self.free_slot_button.clicked.connect(self.find_free_slot)
+        self.free_slot_button.setVisible(availability is not None)
+        if availability is not None:
+            availability.on_change = self.check_conflicts
+        for signal in (self.date_edit.dateChanged, self.start_time.timeChanged, self.end_time.timeChanged):
+            signal.connect(self.check_conflicts)
         self.reminder_minutes = QSpinBox(self)
         self.reminder_minutes.setRange(0, 1440)
         self.reminder_minutes.setSuffix(" min")
@@ -101,8 +961,11 @@ class AddEventDialog(QDialog):
             self.color_combo.addItem(name)
 
         layout.addRow("Titlu", self.title_edit)
+        layout.addRow("Data", self.date_edit)
         layout.addRow("Începe la", self.start_time)
         layout.addRow("Se termină la", self.end_time)
+        layout.addRow("", self.conflict_label)
+        layout.addRow("", self.free_slot_button)
         layout.addRow("Notificare", self.reminder_minutes)
         layout.addRow("Descriere", self.description_edit)
         layout.addRow("Culoare", self.color_combo)
@@ -112,6 +975,47 @@ class AddEventDialog(QDialog):
         buttons.rejected.connect(self.reject)
         layout.addRow(buttons)
 
+    def _span(self):
+        day = self.date_edit.date().toPyDate()
+        start = datetime.datetime.combine(day, self.start_time.time().toPyTime())
+        end = datetime.datetime.combine(day, self.end_time.time().toPyTime())
+        return start, end
+
+    def check_conflicts(self):
+        if self.availability is None:
+            return
+        start, end = self._span()
+        if end <= start:
+            self.conflict_label.setText("")
+            return
+        clashes = self.availability.conflicts(int(start.timestamp()), int(end.timestamp()))
+        if not clashes:
+            self.conflict_label.setText("✅ Interval liber")
+            return
+        names = ", ".join(ev.get("summary", "Fără titlu") for ev in clashes[:3])
+        more = f" și încă {len(clashes) - 3}" if len(clashes) > 3 else ""
+        self.conflict_label.setText(f"⚠️ Se suprapune cu: {names}{more}")
+
+    def find_free_slot(self):
+        start, end = self._span()
+        duration = end - start if end > start else datetime.timedelta(hours=1)
+        slot = self.availability.next_free_slot(start, duration)
+        if slot == start:
+            # Already free: pressing again moves on to the next free slot
+            slot = self.availability.next_free_slot(start + duration, duration)
+        if slot is None:
+            self.conflict_label.setText("Niciun interval liber în următoarele săptămâni")
+            return
+        for widget in (self.date_edit, self.start_time, self.end_time):
+            widget.blockSignals(True)
+        self.date_edit.setDate(QDate(slot.year, slot.month, slot.day))
+        self.start_time.setTime(QTime(slot.hour, slot.minute))
+        slot_end = slot + duration
+        self.end_time.setTime(QTime(slot_end.hour, slot_end.minute))
+        for widget in (self.date_edit, self.start_time, self.end_time):
+            widget.blockSignals(False)
+        self.check_conflicts()
+
     def get_values(self):
         idx = self.color_combo.currentIndex()
         _, color_hex, color_id = self.color_options[idx]
@@ -126,38 +1030,328 @@ class AddEventDialog(QDialog):
         )
 
 
+class MetricsDialog(QDialog):
+    """Developer panel over the instrumentation counters; opened with Ctrl+Shift+M."""
+
+    COLUMNS = ("site", "count", "errors", "mean_ms", "p50_ms", "p95_ms", "max_ms", "bytes", "pages")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Instrumentare")
+        self.resize(820, 420)
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        reset_button = QPushButton("Resetează")
+        reset_button.clicked.connect(self._reset)
+        dump_button = QPushButton("Salvează JSON lines…")
+        dump_button.clicked.connect(self._dump)
+        buttons.addWidget(reset_button)
+        buttons.addStretch(1)
+        buttons.addWidget(dump_button)
+        layout.addLayout(buttons)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        snapshot = METRICS.snapshot()
+        self.table.setRowCount(len(snapshot))
+        for row, (site, stats) in enumerate(snapshot.items()):
+            values = dict(stats, site=site)
+            for col, name in enumerate(self.COLUMNS):
+                value = values[name]
+                item = QTableWidgetItem("—" if value is None else str(value))
+                if col:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+    def _reset(self):
+        METRICS.reset()
+        self.refresh()
+
+    def _dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Salvează metricile", "metrics.jsonl", "JSON lines (*.jsonl)")
+        if path:
+            METRICS.dump(path)
+
+
+class YearViewDialog(QDialog):
+    """Several years at a glance; clicking a day shows it in the month view."""
+
+    METRICS_SHOWN = (("Evenimente", "ev."), ("Ore ocupate", "ore"))
+
+    def __init__(self, load, parent=None):
+        # load(first, end, on_done) fetches (counts, hours) for the days [first, end) and
+        # calls on_done with them, possibly later
+        super().__init__(parent)
+        self.setWindowTitle("Privire de ansamblu")
+        self._load = load
+        self._density = None
+        self.picked_date = None
+        self.first_year = QDate.currentDate().year() - HEATMAP_YEARS // 2
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        previous_button = QPushButton("◀")
+        previous_button.clicked.connect(lambda: self._shift(-1))
+        next_button = QPushButton("▶")
+        next_button.clicked.connect(lambda: self._shift(1))
+        self.years_spin = QSpinBox()
+        self.years_spin.setRange(1, 10)
+        self.years_spin.setValue(HEATMAP_YEARS)
+        self.years_spin.setSuffix(" ani")
+        self.years_spin.valueChanged.connect(self.reload)
+        self.metric_combo = QComboBox()
+        for label, _ in self.METRICS_SHOWN:
+            self.metric_combo.addItem(label)
+        self.metric_combo.currentIndexChanged.connect(self._show)
+        controls.addWidget(previous_button)
+        controls.addWidget(next_button)
+        controls.addWidget(self.years_spin)
+        controls.addStretch(1)
+        controls.addWidget(self.metric_combo)
+        layout.addLayout(controls)
+
+        self.heatmap = YearHeatmap()
+        self.heatmap.dayClicked.connect(self._pick)
+        scroll = QScrollArea()
+        scroll.setFrameShape(QScrollArea.NoFrame)
+        scroll.setStyleSheet("QScrollArea, QScrollArea > QWidget > QWidget { background: transparent; }")
+        scroll.setWidget(self.heatmap)
+        scroll.setAlignment(Qt.AlignHCenter)
+        scroll.setMinimumWidth(self.heatmap.width() + 24)
+        layout.addWidget(scroll)
+        self.resize(self.heatmap.width() + 48, 720)
+
+    def _pick(self, qdate):
+        self.picked_date = qdate
+        self.accept()
+
+    def _shift(self, delta):
+        self.first_year += delta
+        self.reload()
+
+    def reload(self):
+        first_year, years = self.first_year, self.years_spin.value()
+        self.setWindowTitle(f"Privire de ansamblu {first_year}–{first_year + years - 1}")
+
+        def loaded(counts, hours):
+            # A later request may have moved on already
+            if (first_year, years) == (self.first_year, self.years_spin.value()):
+                self._density = (counts, hours)
+                self._show()
+
+        self._load(datetime.date(first_year, 1, 1), datetime.date(first_year + years, 1, 1), loaded)
+
+    def _show(self):
+        if self._density is not None:
+            metric = self.metric_combo.currentIndex()
+            self.heatmap.set_values(self.first_year, self.years_spin.value(), self._density[metric],
+                                    self.METRICS_SHOWN[metric][1])
+
+
+class AccountSession:
+    """One signed-in account as the window keeps it: its engine (credentials, API client, store
+    and outbox), its month cache and the background work running for it.
+
+    Sessions live as long as the window, so switching back to an account repaints from its
+    cache and goes on with the client it already has.
+    """
+
+    def __init__(self, account, expand_recurrence=False):
+        self.account = account
+        self.engine = CalendarSync(account.store_path, account.token_path, expand_recurrence=expand_recurrence)
+        self.engine.outbox.release_in_flight()
+        self.month_cache = MonthCache(MONTH_CACHE_BYTES)
+        self.syncing = set()
+        self.sync_again = set()
+        self.outbox_busy = False
+        self.connecting = False
+        self.refreshing = False
+        # time.monotonic() before which a failed token renewal is not tried again
+        self.refresh_after = 0
+
+
 class CalendarApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Google Calendar")
         self.resize(950, 550)
 
-        self.service = self.get_calendar_service()
+        self.startup = StartupTimer(SHOW_STARTUP_TIMINGS)
+        self.startup.mark("imports")
+        # The service is built in the background; until then everything renders from the local store
+        self.accounts = AccountRegistry(ACCOUNTS_PATH, STORE_PATH)
+        self.sessions = {}
+        # Shown again if the login of an account being added does not go through
+        self._account_before_add = None
+        self._use_session(self._session_for(self.accounts.active))
+        self.events = []
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(API_WORKER_THREADS)
+        self._workers = set()
+        self._pending_requests = 0
+        self._outbox_timer = QTimer(self)
+        self._outbox_timer.setSingleShot(True)
+        self._outbox_timer.timeout.connect(self._drain_outbox)
+        self._token_timer = QTimer(self)
+        self._token_timer.setSingleShot(True)
+        self._token_timer.timeout.connect(self._refresh_tokens)
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self.requests = RequestScheduler(
+            lambda fn, on_done, on_error: self._run_in_background(fn, on_done, on_error, show_loading=False),
+            lambda delay: self._request_timer.start(int(delay * 1000)),
+            max_running=SCHEDULED_REQUESTS, settle=NAVIGATION_SETTLE_SECONDS, keep=SCHEDULED_KEEP_MONTHS,
+        )
+        self._request_timer.timeout.connect(self.requests.pump)
+        self._holiday_cache = {}
+        self._holiday_requests = set()
+        self._calendars = {}
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setSingleShot(True)
+        self._poll_timer.timeout.connect(self._poll)
+        self._last_poll = time.monotonic()
+        self._metrics_dialog = None
+        self._year_dialog = None
+        self.reminders = ReminderQueue(time.time())
+        self._default_reminders = {}
+        # One set per reminder load in flight: events changed meanwhile, which it must not overwrite
+        self._reminder_touched = []
+        self._notified = None
+        self._reminder_timer = QTimer(self)
+        self._reminder_timer.setSingleShot(True)
+        self._reminder_timer.timeout.connect(self._on_reminder_timer)
+        self.tray = QSystemTrayIcon(self._tray_icon(), self)
+        self.tray.setToolTip("Google Calendar")
+        self.tray.messageClicked.connect(self._open_notified_event)
+        self.tray.activated.connect(lambda reason: self._bring_to_front())
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray.show()
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, activated=self._show_metrics)
+        QShortcut(QKeySequence("Ctrl+Y"), self, activated=self.show_year_view)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         main_layout = QHBoxLayout(central_widget)
 
-        self.calendar = Calendar()
+        self.calendar = Calendar(self._event_color)
         self.calendar.selectionChanged.connect(self.load_events)
         self.calendar.setGridVisible(True)
         self.calendar.setFont(QFont("Segoe UI", 11))
-        self.calendar.currentPageChanged.connect(self.refresh_month_events)
+        self.calendar.currentPageChanged.connect(self._on_page_changed)
+        self.requests.visible = month_index(self.calendar.yearShown(), self.calendar.monthShown())
+
+        self._layout_cache = OrderedDict()
+        self._agenda_revision = None
+        self.week_view = WeekView(self._event_color)
+        self.week_view.eventClicked.connect(lambda ev, qd: self._show_event(qd, ev.key))
+        self.week_view.eventActivated.connect(self._edit_shown_event)
+        self.week_view.dayClicked.connect(self.calendar.setSelectedDate)
+        self.agenda_model = AgendaModel(self._month_events, self._event_color, self)
+        self.agenda_list = QListView()
+        self.agenda_list.setFont(QFont("Segoe UI", 10))
+        self.agenda_list.setUniformItemSizes(True)
+        self.agenda_list.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.agenda_list.setModel(self.agenda_model)
+        self.agenda_list.setItemDelegate(AgendaDelegate(self.agenda_list))
+        self.agenda_list.clicked.connect(self._open_agenda_row)
+        self.agenda_list.doubleClicked.connect(
+            lambda index: index.data(EVENT_ROLE) and self._edit_shown_event(
+                index.data(EVENT_ROLE), index.data(AGENDA_DATE_ROLE)))
+
+        self.views = QStackedWidget()
+        self.view_buttons = QButtonGroup(self)
+        view_row = QHBoxLayout()
+        for index, (label, widget) in enumerate(
+                (("Lună", self.calendar), ("Săptămână", self.week_view), ("Agendă", self.agenda_list))):
+            self.views.addWidget(widget)
+            button = QPushButton(label)
+            button.setObjectName("calendars")
+            button.setCheckable(True)
+            button.setChecked(index == 0)
+            self.view_buttons.addButton(button, index)
+            view_row.addWidget(button)
+            QShortcut(QKeySequence(f"Ctrl+{index + 1}"), self, activated=button.click)
+        self.view_buttons.idClicked.connect(self._set_view)
+        view_row.addStretch(1)
+        self.previous_week_button = QPushButton("◀")
+        self.next_week_button = QPushButton("▶")
+        for button, days in ((self.previous_week_button, -WEEK_DAYS), (self.next_week_button, WEEK_DAYS)):
+            button.setObjectName("calendars")
+            button.setVisible(False)
+            button.clicked.connect(lambda _, days=days: self.calendar.setSelectedDate(
+                self.calendar.selectedDate().addDays(days)))
+            view_row.addWidget(button)
+        left_layout = QVBoxLayout()
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addLayout(view_row)
+        left_layout.addWidget(self.views)
 
         right_layout = QVBoxLayout()
 
         title = QLabel("📅 Evenimente")
         title.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        self.loading_label = QLabel("⏳ Se încarcă…")
+        self.loading_label.setFont(QFont("Segoe UI", 9))
+        self.loading_label.setVisible(False)
+        self.calendars_button = QPushButton("🗂️ Calendare")
+        self.calendars_button.setObjectName("calendars")
+        self.calendars_button.setMenu(QMenu(self.calendars_button))
+        self.accounts_button = QPushButton("👤")
+        self.accounts_button.setObjectName("calendars")
+        self.accounts_button.setMenu(QMenu(self.accounts_button))
+        self.ics_button = QPushButton("📁 ICS")
+        self.ics_button.setObjectName("calendars")
+        ics_menu = QMenu(self.ics_button)
+        ics_menu.addAction("Importă .ics…", self.import_ics)
+        ics_menu.addAction("Exportă .ics…", self.export_ics)
+        self.ics_button.setMenu(ics_menu)
+        self.year_button = QPushButton("📊 Ani")
+        self.year_button.setObjectName("calendars")
+        self.year_button.setToolTip("Densitatea evenimentelor pe mai mulți ani (Ctrl+Y)")
+        self.year_button.clicked.connect(self.show_year_view)
+        self.outbox_label = QLabel()
+        self.outbox_label.setFont(QFont("Segoe UI", 9))
+        self.outbox_label.setToolTip("Modificări care nu au ajuns încă pe server")
+        self.outbox_label.setVisible(False)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔍 Caută evenimente…")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self._on_search_changed)
+        self.search_edit.returnPressed.connect(self._open_first_search_result)
+        self.search_results = QListWidget()
+        self.search_results.setFont(QFont("Segoe UI", 10))
+        self.search_results.setVisible(False)
+        self.search_results.itemActivated.connect(self._open_search_result)
+        self.search_results.itemClicked.connect(self._open_search_result)
 
-        self.events_list = QListWidget()
+        self.events_list = QListView()
         self.events_list.setFont(QFont("Segoe UI", 10))
         self.events_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.events_list.setWordWrap(True)
-        from PyQt5.QtCore import Qt as _Qt
-        self.events_list.setHorizontalScrollBarPolicy(_Qt.ScrollBarAlwaysOff)
-        self.events_list.setTextElideMode(_Qt.ElideNone)
-        self.events_list.itemClicked.connect(self._toggle_event_description)
-        self._widget_to_item = {}
+        self.events_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.events_list.setTextElideMode(Qt.ElideNone)
+        self.events_list.setResizeMode(QListView.Adjust)
+        self.events_list.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.events_model = EventListModel(
+            lambda ev: self.format_event_label(ev), self._event_color, self._description, self)
+        self.events_delegate = EventItemDelegate(self.events_list)
+        self.events_delegate.toggleRequested.connect(self._toggle_event_description)
+        self.events_list.setModel(self.events_model)
+        self.events_list.setItemDelegate(self.events_delegate)
+        self.events_model.modelReset.connect(self.events_delegate.clear_cache)
+        self.events_list.selectionModel().currentChanged.connect(lambda *_: self._refresh_time_view())
 
         self.add_button = QPushButton("➕ Adaugă Eveniment")
         self.add_button.clicked.connect(self.add_event)
@@ -178,7 +1372,18 @@ class CalendarApp(QMainWindow):
 
         right_layout.setContentsMargins(0, 0, 0, 0)
 
-        right_layout.addWidget(title)
+        title_row = QHBoxLayout()
+        title_row.addWidget(title)
+        title_row.addStretch(1)
+        title_row.addWidget(self.outbox_label)
+        title_row.addWidget(self.calendars_button)
+        title_row.addWidget(self.ics_button)
+        title_row.addWidget(self.year_button)
+        title_row.addWidget(self.accounts_button)
+        title_row.addWidget(self.loading_label)
+        right_layout.addLayout(title_row)
+        right_layout.addWidget(self.search_edit)
+        right_layout.addWidget(self.search_results)
         right_layout.addWidget(self.events_list)
         buttons_row = QHBoxLayout()
         buttons_row.addWidget(self.add_button)
@@ -186,11 +1391,20 @@ class CalendarApp(QMainWindow):
         right_layout.addLayout(buttons_row)
         right_layout.addLayout(bottom_buttons)
 
-        main_layout.addWidget(self.calendar, 2)
+        main_layout.addLayout(left_layout, 2)
         main_layout.addLayout(right_layout, 1)
 
+        # Start pulling the delta first so the holiday lookups can share its round trip,
+        # then paint whatever is already on disk
+        self._load_calendars()
+        self._update_accounts_menu()
         self.load_events()
         self.refresh_month_events()
+        self._update_outbox_label()
+        self._extend_reminders()
+        self._arm_reminder_timer()
+        self.startup.mark("cached first paint")
+        self._connect()
 
         QApplication.instance().setStyleSheet("""
             QMainWindow {
@@ -242,27 +1456,19 @@ class CalendarApp(QMainWindow):
                 background-color: #141414;
                 color: #ffffff;
             }
-            QListWidget {
+            QListView {
                 border: 1px solid #333;
                 border-radius: 8px;
                 padding: 6px;
                 background: #1e1e1e;
                 color: #ffffff;
             }
-            QListWidget::item {
+            QListView::item {
                 border-bottom: 1px solid #333;
-                padding: 8px 6px;
             }
-            QToolButton#expand {
-                color: #cccccc;
+            QListView::item:selected {
                 background-color: #2a2a2a;
-                border: 1px solid #3a3a3a;
-                border-radius: 6px;
-                padding: 0px;
-                min-width: 24px;
-                qproperty-iconSize: 12px;
             }
-            QToolButton#expand:hover { color: #ffffff; background-color: #3a3a3a; }
             QPushButton {
                 padding: 10px;
                 border-radius: 8px;
@@ -288,252 +1494,574 @@ class CalendarApp(QMainWindow):
             QPushButton#edit {
                 background-color: #4169E1;
             }
+            QPushButton#calendars {
+                padding: 4px 10px;
+                font-size: 12px;
+                background-color: #2a2a2a;
+            }
+            QMenu {
+                background-color: #1e1e1e;
+                color: #ffffff;
+                border: 1px solid #333;
+            }
+            QMenu::item:selected {
+                background-color: #3a3a3a;
+            }
         """)
 
         self.add_button.setObjectName("add")
         self.delete_button.setObjectName("delete")
         self.logout_button.setObjectName("logout")
 
-    @staticmethod
-    def to_local_rfc3339(dt_naive: datetime.datetime) -> str:
-        local_tz = datetime.datetime.now().astimezone().tzinfo
-        return dt_naive.replace(tzinfo=local_tz).isoformat()
+    @property
+    def service(self):
+        return self.engine.service
 
     @staticmethod
-    def format_event_label(event, color_hex: str) -> str:
-        title = event.get('summary', 'Fără titlu')
-        start_str = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
-        display_time = ""
-        try:
-            if "T" in start_str:
-                dt = datetime.datetime.fromisoformat(start_str)
-                dt_local = dt.astimezone()
-                display_time = dt_local.strftime("%Y-%m-%d %H:%M")
-            else:
-                display_time = start_str
-        except Exception:
-            display_time = start_str or ""
-        dot = f"<span style='color:{color_hex};'>●</span>"
-        return f"{dot} {display_time} - {title}"
-
-    def _add_event_list_item(self, event):
-        desc = (event.get("description", "") or "").strip()
-        color_hex = self.google_color_id_to_hex(event.get("colorId"))
-
-        container = QWidget()
-        v = QVBoxLayout(container)
-        v.setContentsMargins(8, 8, 8, 8)
-        v.setSpacing(6)
-
-        header = QHBoxLayout()
-        header.setContentsMargins(0, 0, 0, 0)
-        header.setSpacing(8)
-        toggle_btn = QToolButton()
-        toggle_btn.setFixedSize(24, 24)
-        toggle_btn.setObjectName("expand")
-        toggle_btn.setAutoRaise(True)
-        # Set a smaller custom chevron icon
-        pm = QPixmap(12, 12)
-        pm.fill(Qt.transparent)
-        painter = QPainter(pm)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QColor('#d0d0d0'))
-        poly = QPolygon([
-            QPoint(4, 2), QPoint(9, 6), QPoint(4, 10)
-        ])
-        painter.drawPolygon(poly)
-        painter.end()
-        toggle_btn.setIcon(QIcon(pm))
-        toggle_btn.setIconSize(QSize(12, 12))
-        title_lbl = QLabel(self.format_event_label(event, color_hex))
-        title_lbl.setTextFormat(Qt.RichText)
-        title_lbl.setWordWrap(True)
-        title_lbl.setMargin(2)
-        title_lbl.setMinimumHeight(title_lbl.fontMetrics().height() + 6)
-        header.addWidget(title_lbl, 1)
-        header.addStretch(1)
-        header.addWidget(toggle_btn)
-        desc_view = QTextBrowser()
-        desc_view.setText(desc if desc else "(fără descriere)")
-        desc_view.setOpenExternalLinks(True)
-        desc_view.setReadOnly(True)
-        desc_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        desc_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        opt = QTextOption()
-        opt.setWrapMode(QTextOption.WrapAnywhere)
-        desc_view.document().setDefaultTextOption(opt)
-        desc_view.setStyleSheet("QTextBrowser{background:transparent;border:none;color:#ffffff;}")
-        desc_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        desc_view.setVisible(False)
-        desc_view.setObjectName("desc")
-
-        v.addLayout(header)
-        v.addWidget(desc_view)
-
-        item = QListWidgetItem()
-        container.adjustSize()
-        item.setSizeHint(container.sizeHint() + QSize(0, 4))
-        self.events_list.addItem(item)
-        self.events_list.setItemWidget(item, container)
-        container.installEventFilter(self)
-        self._widget_to_item[container] = item
-        toggle_btn.clicked.connect(lambda: self._toggle_by_container(container, toggle_btn))
-
-    def _toggle_event_description(self, item):
-        container = self.events_list.itemWidget(item)
-        if container is None:
-            return
-        desc_view = container.findChild(QTextBrowser, "desc")
-        if desc_view is None:
-            return
-        new_state = not desc_view.isVisible()
-        desc_view.setVisible(new_state)
-        if new_state:
-            desc_view.document().adjustSize()
-            h = int(desc_view.document().size().height()) + 8
-            if h < 20:
-                h = 20
-            desc_view.setFixedHeight(h)
+    def format_event_label(event) -> str:
+        title = event.summary or "Fără titlu"
+        if event.all_day:
+            display_time = event.start_day.isoformat()
         else:
-            desc_view.setFixedHeight(0)
-        container.adjustSize()
-        item.setSizeHint(container.sizeHint() + QSize(0, 12))
-        self.events_list.doItemsLayout()
-
-    def eventFilter(self, watched, event):
-        if event.type() == QEvent.MouseButtonRelease and watched in self._widget_to_item:
-            item = self._widget_to_item.get(watched)
-            if item is not None:
-                self._toggle_event_description(item)
-                return True
-        return super().eventFilter(watched, event)
-
-    def _toggle_by_container(self, container, btn=None):
-        item = self._widget_to_item.get(container)
-        if item is None:
-            return
-        self._toggle_event_description(item)
-        if btn is not None:
-            desc_view = container.findChild(QTextBrowser, "desc")
-            # Flip icon by rotating 90 degrees when expanded
-            size = 12
-            pm = QPixmap(size, size)
-            pm.fill(Qt.transparent)
-            painter = QPainter(pm)
-            painter.setRenderHint(QPainter.Antialiasing, True)
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(QColor('#d0d0d0'))
-            if desc_view and desc_view.isVisible():
-                poly = QPolygon([QPoint(2, 4), QPoint(6, 9), QPoint(10, 4)])
-            else:
-                poly = QPolygon([QPoint(4, 2), QPoint(9, 6), QPoint(4, 10)])
-            painter.drawPolygon(poly)
-            painter.end()
-            btn.setIcon(QIcon(pm))
-
-    def get_calendar_service(self):
-        creds = None
-        if os.path.exists(TOKEN_PATH):
-            with open(TOKEN_PATH, "rb") as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open(TOKEN_PATH, "wb") as token:
-                pickle.dump(creds, token)
-        return build("calendar", "v3", credentials=creds)
+            display_time = datetime.datetime.fromtimestamp(event.start_ts).strftime("%Y-%m-%d %H:%M")
+        label = f"{display_time} - {title}"
+        if event.pending:
+            label += " · nesincronizat"
+        return label
+
+    def _on_search_changed(self, text):
+        searching = bool(text.strip())
+        self.search_results.setVisible(searching)
+        self.events_list.setVisible(not searching)
+        self.search_results.clear()
+        if not searching:
+            return
+        for event in self.engine.search(self._selected_calendar_ids(), text):
+            record = EventRecord.from_event(event)
+            if record is None:
+                continue
+            item = QListWidgetItem(self.format_event_label(record))
+            item.setData(Qt.UserRole, (record.start_day, record.key))
+            self.search_results.addItem(item)
+        if not self.search_results.count():
+            item = QListWidgetItem("Niciun rezultat")
+            item.setFlags(Qt.NoItemFlags)
+            self.search_results.addItem(item)
+
+    def _open_search_result(self, item):
+        target = item.data(Qt.UserRole)
+        if target is None:
+            return
+        day, key = target
+        self.search_edit.clear()
+        self._show_event(QDate(day.year, day.month, day.day), key)
+        self.events_list.setFocus()
+
+    def _show_event(self, qdate, key):
+        """Select ``qdate`` and, in its day list, the event with ``key``."""
+        self.calendar.setSelectedDate(qdate)
+        row = self.events_model.row_of(key)
+        if row >= 0:
+            self.events_list.setCurrentIndex(self.events_model.index(row))
+            self.events_list.scrollTo(self.events_model.index(row))
+
+    def _open_first_search_result(self):
+        if self.search_results.count():
+            self._open_search_result(self.search_results.item(0))
+
+    def _toggle_event_description(self, index):
+        # Only this row's size hint changes; the delegate keeps every other cached height
+        self.events_model.toggle_expanded(index.row())
+        self.events_delegate.sizeHintChanged.emit(index)
+
+    def get_calendar_service(self, engine, interactive=True):
+        return engine.connect(interactive)
+
+    def _connect(self, session=None, interactive=True):
+        """Build the API client of ``session`` (default: the shown one) in the background."""
+        session = session or self.session
+        if session.connecting or session.engine.service is not None:
+            return
+        session.connecting = True
+        self._run_in_background(
+            lambda: self.get_calendar_service(session.engine, interactive),
+            lambda result: self._on_service_ready(session, result),
+            lambda error: self._on_connect_failed(session, error),
+            show_loading=session is self.session,
+        )
+
+    def _on_service_ready(self, session, result):
+        session.connecting = False
+        session.engine.attach(*result)
+        self._schedule_token_refresh()
+        if session is not self.session:
+            return
+        self.startup.mark("auth + client built")
+        self._account_before_add = None
+        self._start_session()
+        # Picks up the holiday years the cached first paint could not ask for
+        self.refresh_month_events()
+        # Then get the other accounts ready too, so switching to them does not wait for a login
+        for account in self.accounts.accounts:
+            self._connect(self._session_for(account), interactive=False)
+
+    def _start_session(self):
+        """Catch the shown account up with the server, now that it has a client."""
+        self.sync_events()
+        self.refresh_calendar_list()
+        self._drain_outbox()
+        self._last_poll = time.monotonic()
+        self._schedule_poll()
 
+    def _poll_interval(self):
+        if self.isMinimized() or not self.isVisible():
+            return POLL_INTERVAL_MINIMIZED
+        if self.isActiveWindow():
+            return POLL_INTERVAL_ACTIVE
+        return POLL_INTERVAL_INACTIVE
+
+    def _schedule_poll(self):
+        if self.service is None:
+            return
+        # Counted from the last poll, so focusing a long-idle window refreshes it right away
+        due = self._last_poll + self._poll_interval() - time.monotonic()
+        self._poll_timer.start(max(0, int(due * 1000)))
+
+    def _poll(self):
+        """Background refresh: an unchanged calendar costs an empty syncToken delta and a 304 for the list."""
+        self._last_poll = time.monotonic()
+        idle = [cal_id for cal_id in self._selected_calendar_ids() if cal_id not in self.session.syncing]
+        if idle:
+            self.sync_events(idle, show_loading=False)
+        self.refresh_calendar_list()
+        self._schedule_poll()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() in (QEvent.ActivationChange, QEvent.WindowStateChange):
+            self._schedule_poll()
+
+    def _show_metrics(self):
+        if not METRICS.enabled:
+            QMessageBox.information(
+                self, "Instrumentare", "Instrumentarea este oprită. Porniți aplicația cu --metrics.")
+            return
+        if self._metrics_dialog is None:
+            self._metrics_dialog = MetricsDialog(self)
+        self._metrics_dialog.show()
+        self._metrics_dialog.raise_()
+
+    def show_year_view(self):
+        if self._year_dialog is None:
+            self._year_dialog = YearViewDialog(self._load_day_density, self)
+            self._year_dialog.accepted.connect(self._on_year_day_picked)
+        # Always from the store as it is now, so edits since the last opening show up
+        self._year_dialog.reload()
+        self._year_dialog.show()
+        self._year_dialog.raise_()
+
+    def _load_day_density(self, first, end, on_done):
+        calendar_ids = self._selected_calendar_ids()
+        engine = self.engine
+        self.requests.submit(("density", self.session.account.id, tuple(calendar_ids), first, end),
+                             lambda: engine.day_density(calendar_ids, first, end),
+                             lambda result: on_done(*result))
+
+    def _on_year_day_picked(self):
+        qdate = self._year_dialog.picked_date
+        if qdate is not None:
+            self.calendar.setCurrentPage(qdate.year(), qdate.month())
+            self.calendar.setSelectedDate(qdate)
+
+    def _on_connect_failed(self, session, error):
+        session.connecting = False
+        if session is not self.session:
+            # Not logged in yet, or offline: it connects (interactively) once it is shown
+            return
+        self.startup.report()
+        QMessageBox.warning(self, "Eroare", f"Conectarea la Google Calendar a eșuat:\n{error}")
+        if not os.path.exists(session.engine.token_path) and self._account_before_add is not None:
+            # A newly added account whose login did not go through
+            self._forget_session(session)
+            self.switch_account(self._account_before_add)
+
+    def _run_in_background(self, fn, on_done, on_error=None, show_loading=True, on_progress=None):
+        worker = ApiWorker(fn)
+        if on_progress is not None:
+            # fn receives a thread-safe callback that forwards partial results to the GUI thread
+            worker.kwargs["report"] = worker.signals.progress.emit
+            worker.signals.progress.connect(on_progress)
+        self._workers.add(worker)
+        if show_loading:
+            self._set_loading(1)
+
+        def finish():
+            self._workers.discard(worker)
+            if show_loading:
+                self._set_loading(-1)
+
+        def done(result):
+            finish()
+            on_done(result)
+
+        def failed(error):
+            finish()
+            (on_error or self._show_api_error)(error)
+
+        worker.signals.finished.connect(done)
+        worker.signals.failed.connect(failed)
+        self.thread_pool.start(worker)
+
+    def _set_loading(self, delta):
+        self._pending_requests += delta
+        busy = self._pending_requests > 0
+        self.loading_label.setVisible(busy)
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+        else:
+            self.unsetCursor()
+
+    def _show_api_error(self, error):
+        QMessageBox.warning(self, "Eroare", f"Cererea către Google Calendar a eșuat:\n{error}")
+
+    @METRICS.timed("build/day_list")
     def load_events(self):
-        self.events_list.clear()
         date = self.calendar.selectedDate()
-        start = datetime.datetime(date.year(), date.month(), date.day(), 0, 0, 0)
-        end = start + datetime.timedelta(days=1)
+        month_events = self._month_events(date.year(), date.month())
+        self.events = events_on_day(month_events, date.toPyDate())
+        self.events_model.set_events(self.events)
+        self._refresh_time_view()
+
+    def _set_view(self, index):
+        self.views.setCurrentIndex(index)
+        for button in (self.previous_week_button, self.next_week_button):
+            button.setVisible(self.views.currentWidget() is self.week_view)
+        self._refresh_time_view()
+
+    def _refresh_time_view(self):
+        """Bring the week or agenda view, whichever is showing, up to the selected day and the cached rows."""
+        view = self.views.currentWidget()
+        date = self.calendar.selectedDate()
+        if view is self.week_view:
+            current = self.events_list.currentIndex()
+            key = current.data(EVENT_ROLE).key if current.isValid() else None
+            self.week_view.set_grid(self._week_grid(date.toPyDate()), date, key)
+        elif view is self.agenda_list:
+            if not self.agenda_model.covers(date.toPyDate()):
+                self.agenda_model.reset(date.toPyDate())
+                self._agenda_revision = self.month_cache.revision
+            elif self._agenda_revision != self.month_cache.revision:
+                # Reload as far as the user had scrolled, and stay there
+                scroll = self.agenda_list.verticalScrollBar().value()
+                self.agenda_model.reset(self.agenda_model.start, self.agenda_model.months)
+                self.agenda_list.verticalScrollBar().setValue(scroll)
+                self._agenda_revision = self.month_cache.revision
+
+    def _week_grid(self, day):
+        """Layout of the Monday-to-Sunday week holding ``day``, cached per week and cache revision."""
+        first = day - datetime.timedelta(days=day.weekday())
+        last = first + datetime.timedelta(days=WEEK_DAYS - 1)
+        months = sorted({(first.year, first.month), (last.year, last.month)})
+        key = (first, self.month_cache.revision)
+        grid = self._layout_cache.get(key)
+        if grid is not None:
+            self._layout_cache.move_to_end(key)
+            return grid
+        month_events = [self._month_events(*month) for month in months]
+        events, seen = [], set()
+        # An event overlapping both months is in both lists, as the same record
+        for event in heapq.merge(*month_events, key=lambda ev: ev.start_ts):
+            if id(event) not in seen:
+                seen.add(id(event))
+                events.append(event)
+        grid = self._layout_cache[key] = layout_days(events, first, WEEK_DAYS)
+        if len(self._layout_cache) > LAYOUT_CACHE_SIZE:
+            self._layout_cache.popitem(last=False)
+        return grid
 
-        events_result = self.service.events().list(
-            calendarId="primary",
-            timeMin=self.to_local_rfc3339(start),
-            timeMax=self.to_local_rfc3339(end),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
+    def _open_agenda_row(self, index):
+        event = index.data(EVENT_ROLE)
+        if event is None:
+            self.calendar.setSelectedDate(index.data(AGENDA_DATE_ROLE))
+        else:
+            self._show_event(index.data(AGENDA_DATE_ROLE), event.key)
 
-        self.events = events_result.get("items", [])
-        for event in self.events:
-            self._add_event_list_item(event)
+    def _edit_shown_event(self, event, qdate):
+        self._show_event(qdate, event.key)
+        if self.events_list.currentIndex().isValid():
+            self.edit_event()
 
+    def _selected_calendar_ids(self):
+        selected = [cal_id for cal_id, cal in self._calendars.items() if cal["selected"]]
+        # Until calendarList has been fetched once, show the primary calendar as before
+        return selected if self._calendars else ["primary"]
+
+    def _month_events(self, year, month):
+        events = self.month_cache.get((year, month))
+        if events is None:
+            events, nbytes = self._month_loader(year, month)()
+            self.month_cache.put((year, month), events, nbytes)
+        return events
+
+    def _month_loader(self, year, month):
+        """Loads ``(records, nbytes)`` of one month of the shown account; the event dicts are
+        dropped once converted.
+        """
+        engine, calendar_ids = self.engine, self._selected_calendar_ids()
+        return lambda: self._month_records(engine, calendar_ids, year, month)
+
+    @staticmethod
+    def _month_records(engine, calendar_ids, year, month):
+        rows, _ = engine.month_rows(calendar_ids, year, month)
+        events = []
+        for row in rows:
+            record = EventRecord.from_event(row[3], row)
+            if record is not None:
+                events.append(record)
+        return events, sum(record.nbytes() for record in events)
+
+    def _description(self, event):
+        # Loaded from the store the first time a row is expanded, then kept on the record
+        if event.description is None:
+            stored = self.engine.stored_event(event.calendar, event.id)
+            event.description = (stored.get("description") or "") if stored is not None else ""
+        return event.description
+
+    def _on_page_changed(self, year, month):
+        self.requests.navigate(month_index(year, month))
+        self.refresh_month_events()
+
+    @METRICS.timed("build/month_grid")
     def refresh_month_events(self):
         year = self.calendar.yearShown()
         month = self.calendar.monthShown()
-        first = datetime.datetime(year, month, 1, 0, 0, 0)
-        if month == 12:
-            next_month = datetime.datetime(year + 1, 1, 1)
-        else:
-            next_month = datetime.datetime(year, month + 1, 1)
         mapping = {}
-        events_result = self.service.events().list(
-            calendarId="primary",
-            timeMin=self.to_local_rfc3339(first),
-            timeMax=self.to_local_rfc3339(next_month),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        items = events_result.get("items", [])
-        for ev in items:
-            start_str = ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date")
-            try:
-                date_part = start_str.split("T")[0]
-                y, m, d = [int(x) for x in date_part.split("-")]
-                qd = QDate(y, m, d)
-                color_hex = self.google_color_id_to_hex(ev.get("colorId"))
-                mapping.setdefault(qd, []).append((ev.get("summary", "Fără titlu"), color_hex))
-            except Exception:
-                continue
+        for day, events in bucket_by_day(self._month_events(year, month), *month_range(year, month)).items():
+            mapping[QDate(day.year, day.month, day.day)] = events
 
         if SHOW_HOLIDAYS:
-            for cal_id in HOLIDAY_CALENDAR_IDS:
-                try:
-                    hol = self.service.events().list(
-                        calendarId=cal_id,
-                        timeMin=self.to_local_rfc3339(first),
-                        timeMax=self.to_local_rfc3339(next_month),
-                        singleEvents=True,
-                        orderBy="startTime"
-                    ).execute()
-                    hol_items = hol.get("items", [])
-                    for ev in hol_items:
-                        start_str = ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date")
-                        try:
-                            date_part = start_str.split("T")[0]
-                            y, m, d = [int(x) for x in date_part.split("-")]
-                            qd = QDate(y, m, d)
-                            mapping.setdefault(qd, []).append((ev.get("summary", "Sărbătoare"), "#4caf50"))
-                        except Exception:
-                            continue
-                    break
-                except Exception:
-                    continue
+            holidays = self._holidays_for_year(year)
+            if holidays is None:
+                self._request_holidays([year])
+            else:
+                for qd, holiday in holidays:
+                    if qd.month() == month:
+                        mapping.setdefault(qd, []).append(holiday)
         self.calendar.set_events_for_month(mapping)
 
+        # Warm up the neighbours so paging with the arrows is instant
+        for delta in (-1, 1):
+            self._prefetch_month(*shift_month(year, month, delta))
+        self._refresh_time_view()
+
+    def _event_color(self, ev):
+        if ev.calendar == HOLIDAY_CALENDAR:
+            return HOLIDAY_COLOR
+        # Events without their own colour take the colour of the calendar they live in
+        calendar = self._calendars.get(ev.calendar)
+        if ev.color_id or calendar is None or not calendar["color"] or calendar["id"] == "primary":
+            return self.google_color_id_to_hex(ev.color_id)
+        return calendar["color"]
+
+    def _prefetch_month(self, year, month):
+        key = (year, month)
+        if SHOW_HOLIDAYS and self._holidays_for_year(year) is None:
+            self._request_holidays([year])
+        if key in self.month_cache:
+            return
+        # Bound now: the result belongs to this account's cache even if another one is shown by then
+        cache = self.month_cache
+        load = self._month_loader(year, month)
+
+        def run():
+            if key in cache:
+                # The view got there first while this was queued
+                return None
+            return cache.generation, load()
+
+        def done(result):
+            if result is not None:
+                generation, (events, nbytes) = result
+                cache.put(key, events, nbytes, generation=generation)
+
+        page = month_index(year, month)
+        self.requests.submit(("month", self.session.account.id, year, month), run, done, pages=(page, page))
+
+    def _holidays_for_year(self, year):
+        holidays = self._holiday_cache.get(year)
+        if holidays is None:
+            rows = self.engine.holidays_for_year(year)
+            if rows is None:
+                return None
+            holidays = []
+            for date_part, summary in rows:
+                day = datetime.date.fromisoformat(date_part)
+                start_ts = local_midnight_ts(day)
+                holiday = EventRecord(HOLIDAY_CALENDAR, date_part, summary, None, start_ts, start_ts + 86400, True)
+                holidays.append((QDate(day.year, day.month, day.day), holiday))
+            self._holiday_cache[year] = holidays
+        return holidays
+
+    def _missing_holiday_years(self, years):
+        missing = [y for y in years if y not in self._holiday_requests and self._holidays_for_year(y) is None]
+        self._holiday_requests.update(missing)
+        return missing
+
+    def _request_holidays(self, years):
+        if self.service is None:
+            return
+        engine = self.engine
+        for year in self._missing_holiday_years(years):
+            self.requests.submit(
+                ("holidays", self.session.account.id, year),
+                lambda year=year: engine.fetch_holidays([year]),
+                lambda _, year=year: self._on_holidays_loaded([year]),
+                lambda error, year=year: self._on_holidays_loaded([year]),
+                pages=(month_index(year, 1), month_index(year, 12)),
+                settle=True,
+            )
+
+    def _on_holidays_loaded(self, years):
+        self._holiday_requests.difference_update(years)
+        # Only repaint if the user is still looking at one of those years
+        if self.calendar.yearShown() in years:
+            self.refresh_month_events()
+
+    def sync_events(self, calendar_ids=None, show_loading=True):
+        """Sync the given (default: all shown) calendars, each on its own pool thread."""
+        if self.service is None:
+            return
+        session = self.session
+        holiday_years = self._missing_holiday_years([self.calendar.yearShown()]) if SHOW_HOLIDAYS else []
+        for calendar_id in calendar_ids or self._selected_calendar_ids():
+            if calendar_id in session.syncing:
+                session.sync_again.add(calendar_id)
+                continue
+            session.syncing.add(calendar_id)
+            # Only one of the calendars carries the holiday lookups in its first round trip
+            years, holiday_years = holiday_years, []
+            changes = []
+            self._run_in_background(
+                lambda report, cal_id=calendar_id, years=years, changes=changes:
+                    session.engine.sync_calendar(cal_id, years, report, changes),
+                lambda changed, cal_id=calendar_id, years=years, changes=changes:
+                    self._on_sync_finished(session, cal_id, changed, years, changes),
+                lambda error, cal_id=calendar_id, years=years: self._on_sync_failed(session, cal_id, error, years),
+                show_loading=show_loading,
+                on_progress=lambda changed: self._on_sync_progress(session, changed),
+            )
+        if holiday_years:
+            self._holiday_requests.difference_update(holiday_years)
+
+    def _on_sync_progress(self, session, changed):
+        session.month_cache.clear()
+        if session is self.session:
+            self.load_events()
+            self.refresh_month_events()
+
+    def _on_sync_finished(self, session, calendar_id, changed, holiday_years=(), changes=()):
+        session.syncing.discard(calendar_id)
+        if session is not self.session:
+            # Stored for when it is shown again, which syncs it anyway
+            session.sync_again.discard(calendar_id)
+            if changed:
+                session.month_cache.clear()
+            return
+        if not session.syncing:
+            self.startup.mark("first sync")
+            self.startup.report()
+        if holiday_years:
+            self._on_holidays_loaded(holiday_years)
+        if calendar_id in session.sync_again:
+            session.sync_again.discard(calendar_id)
+            self.sync_events([calendar_id])
+        if changed and calendar_id in self._selected_calendar_ids():
+            self.month_cache.clear()
+            self.load_events()
+            self.refresh_month_events()
+        if changes:
+            self._on_reminder_changes(calendar_id, changes)
+
+    def _on_sync_failed(self, session, calendar_id, error, holiday_years=()):
+        session.syncing.discard(calendar_id)
+        session.sync_again.discard(calendar_id)
+        if session is not self.session:
+            return
+        self._holiday_requests.difference_update(holiday_years)
+        # Offline is not worth a dialog: the cached events are on screen and the outbox keeps the writes
+        if isinstance(error, HttpError):
+            self._show_api_error(error)
+
+    def refresh_calendar_list(self):
+        if self.service is None:
+            return
+        session = self.session
+        self._run_in_background(session.engine.fetch_calendar_list,
+                                lambda result: self._on_calendar_list_loaded(session, result),
+                                lambda error: None, show_loading=False)
+
+    def _on_calendar_list_loaded(self, session, result):
+        if result is None:
+            return
+        calendars, etag = result
+        added = session.engine.store.save_calendars(calendars, etag)
+        if session is not self.session:
+            return
+        self._load_calendars()
+        if added:
+            self.month_cache.clear()
+            self.load_events()
+            self.refresh_month_events()
+            # The primary calendar is usually already synced (or syncing) under its alias
+            fresh = [cal_id for cal_id in added
+                     if cal_id not in self.session.syncing and self.store.get_sync_token(cal_id) is None]
+            if fresh:
+                self.sync_events(fresh)
+
+    def _load_calendars(self):
+        self._calendars = {cal["id"]: cal for cal in self.store.calendars()}
+        primary = self._calendars.get("primary")
+        if primary is not None and primary["summary"] != self.session.account.name:
+            self.accounts.rename(self.session.account.id, primary["summary"])
+            self._update_accounts_menu()
+        defaults = self.store.default_reminders()
+        if defaults != self._default_reminders:
+            self._default_reminders = defaults
+            self._reload_reminders()
+        menu = self.calendars_button.menu()
+        menu.clear()
+        for cal in self._calendars.values():
+            action = menu.addAction(cal["summary"])
+            action.setCheckable(True)
+            action.setChecked(cal["selected"])
+            action.toggled.connect(lambda checked, cal_id=cal["id"]: self._set_calendar_shown(cal_id, checked))
+        self.calendars_button.setEnabled(bool(self._calendars))
+
+    def _set_calendar_shown(self, calendar_id, shown):
+        self.store.set_calendar_selected(calendar_id, shown)
+        self._calendars[calendar_id]["selected"] = shown
+        if shown:
+            self._reload_reminders([calendar_id])
+        else:
+            self.reminders.remove_calendar(calendar_id)
+        self.month_cache.clear()
+        self.load_events()
+        self.refresh_month_events()
+        if shown:
+            self.sync_events([calendar_id])
+
     @staticmethod
     def google_color_id_to_hex(color_id):
-        palette = {
-            "1": "#a4bdfc", "2": "#7ae7bf", "3": "#dbadff", "4": "#ff887c",
-            "5": "#fbd75b", "6": "#ffb878", "7": "#46d6db", "8": "#e1e1e1",
-            "9": "#5484ed", "10": "#51b749", "11": "#dc2127"
-        }
-        return palette.get(str(color_id), "#51b749")
+        return GOOGLE_COLORS.get(str(color_id), DEFAULT_EVENT_COLOR)
 
     def add_event(self):
-        dlg = AddEventDialog(self, self.calendar.selectedDate())
+        dlg = AddEventDialog(self, self.calendar.selectedDate(), self._availability_for(self.calendar.selectedDate()))
+        dlg.check_conflicts()
         if dlg.exec_() == QDialog.Accepted:
             title, qstart, qend, reminder_min, color_hex, color_id, description = dlg.get_values()
             if not title:
                 return
-            date = self.calendar.selectedDate()
+            date = dlg.date_edit.date()
             start = datetime.datetime(date.year(), date.month(), date.day(), qstart.hour(), qstart.minute(), 0)
             end = datetime.datetime(date.year(), date.month(), date.day(), qend.hour(), qend.minute(), 0)
             if end <= start:
@@ -550,48 +2078,47 @@ class CalendarApp(QMainWindow):
                     "overrides": [{"method": "popup", "minutes": reminder_min}] if reminder_min > 0 else []
                 }
             }
-            self.service.events().insert(calendarId="primary", body=event).execute()
-            self.load_events()
-            self.refresh_month_events()
+            # The id is chosen here so a retried insert can never create a duplicate
+            event["id"] = uuid.uuid4().hex
+            self._apply_local_change(None, EventRecord.from_event(dict(event, _calendar="primary", _pending=True)))
+            self._update_reminders(("primary", event["id"]), event)
+            self._queue_write("primary", "insert", event["id"], event)
 
     def delete_event(self):
-        selected = self.events_list.currentRow()
+        selected = self.events_list.currentIndex().row()
         if selected >= 0:
             event = self.events[selected]
+            if not self._can_write(event):
+                return
             reply = QMessageBox.question(
-                self, "Confirmare", f"Ștergi evenimentul '{event.get('summary', 'Fără titlu')}'?",
+                self, "Confirmare", f"Ștergi evenimentul '{event.summary or 'Fără titlu'}'?",
                 QMessageBox.Yes | QMessageBox.No
             )
             if reply == QMessageBox.Yes:
-                self.service.events().delete(calendarId="primary", eventId=event["id"]).execute()
-                self.load_events()
-                self.refresh_month_events()
+                self._apply_local_change(event, None)
+                self._update_reminders(event.key, None)
+                self._queue_write(event.calendar, "delete", event.id)
 
     def edit_event(self):
-        selected = self.events_list.currentRow()
+        selected = self.events_list.currentIndex().row()
         if selected < 0:
             return
         ev = self.events[selected]
-        dlg = AddEventDialog(self, self.calendar.selectedDate())
-        dlg.title_edit.setText(ev.get("summary", ""))
-        # Set times if present
-        start_str = ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date")
-        end_str = ev.get("end", {}).get("dateTime") or ev.get("end", {}).get("date")
-        try:
-            if start_str and "T" in start_str:
-                h, m = start_str.split("T")[1][:5].split(":")
-                from PyQt5.QtCore import QTime
-                dlg.start_time.setTime(QTime(int(h), int(m)))
-            if end_str and "T" in end_str:
-                h, m = end_str.split("T")[1][:5].split(":")
-                from PyQt5.QtCore import QTime
-                dlg.end_time.setTime(QTime(int(h), int(m)))
-        except Exception:
-            pass
-        dlg.description_edit.setText(ev.get("description", ""))
+        if not self._can_write(ev):
+            return
+        dlg = AddEventDialog(self, self.calendar.selectedDate(),
+                             self._availability_for(self.calendar.selectedDate(), ignore_key=ev.key))
+        dlg.title_edit.setText(ev.summary)
+        if not ev.all_day:
+            start = datetime.datetime.fromtimestamp(ev.start_ts)
+            end = datetime.datetime.fromtimestamp(ev.end_ts)
+            dlg.start_time.setTime(QTime(start.hour, start.minute))
+            dlg.end_time.setTime(QTime(end.hour, end.minute))
+        dlg.description_edit.setText(self._description(ev))
+        dlg.check_conflicts()
         if dlg.exec_() == QDialog.Accepted:
             title, qstart, qend, reminder_min, color_hex, color_id, description = dlg.get_values()
-            date = self.calendar.selectedDate()
+            date = dlg.date_edit.date()
             start = datetime.datetime(date.year(), date.month(), date.day(), qstart.hour(), qstart.minute(), 0)
             end = datetime.datetime(date.year(), date.month(), date.day(), qend.hour(), qend.minute(), 0)
             if end <= start:
@@ -607,20 +2134,524 @@ class CalendarApp(QMainWindow):
                     "overrides": [{"method": "popup", "minutes": reminder_min}] if reminder_min > 0 else []
                 }
             }
-            self.service.events().patch(calendarId="primary", eventId=ev["id"], body=body).execute()
+            patched = {**body, "id": ev.id, "_calendar": ev.calendar, "_pending": True}
+            self._apply_local_change(ev, EventRecord.from_event(patched))
+            self._update_reminders(ev.key, patched)
+            self._queue_write(ev.calendar, "patch", ev.id, body)
+
+    def _apply_local_change(self, old, new):
+        """Swap the record ``old`` for ``new`` (either may be None) in the month cache, its grid cell(s)
+        and the day list.
+        """
+        key = (old or new).key
+        self.month_cache.replace_event(key, new)
+
+        year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        first, next_month = month_range(year, month)
+        # Every day of the shown month either version covers
+        dates = bucket_by_day([ev for ev in (old, new) if ev is not None], first, next_month)
+        month_events = self._month_events(year, month)
+        for day in dates:
+            qd = QDate(day.year, day.month, day.day)
+            entries = bucket_by_day(month_events, day, day + datetime.timedelta(days=1)).get(day, [])
+            entries += [holiday for hol_date, holiday in self._holidays_for_year(year) or [] if hol_date == qd]
+            self.calendar.set_events_for_day(qd, entries)
+
+        date = self.calendar.selectedDate()
+        day_events = events_on_day(self._month_events(date.year(), date.month()), date.toPyDate())
+        old_row = self.events_model.row_of(key)
+        new_row = next((i for i, ev in enumerate(day_events) if ev is new), -1)
+        self.events_delegate.forget(key)
+        if old_row >= 0 and old_row == new_row:
+            self.events_model.replace_event(old_row, new)
+        else:
+            if old_row >= 0:
+                self.events_model.remove_event(old_row)
+            if new_row >= 0:
+                self.events_model.insert_event(new_row, new)
+        self.events = self.events_model.events
+        self._refresh_time_view()
+
+    def _availability_for(self, qdate, ignore_key=None):
+        """Busy time from the local store, topped up in the background with free/busy for
+        calendars that have no local copy.
+        """
+        local_ids, remote_ids = self.engine.availability_calendars(self._selected_calendar_ids())
+        availability = Availability(
+            lambda start_ts, end_ts: self.engine.busy_rows(local_ids, start_ts, end_ts),
+            qdate.toPyDate(), ignore_key)
+        if remote_ids and self.service is not None:
+            first = qdate.toPyDate()
+            end = first + datetime.timedelta(days=FREE_SLOT_HORIZON_DAYS + 1)
+
+            def loaded(busy):
+                for cal_id, intervals in busy.items():
+                    name = self._calendars.get(cal_id, {}).get("summary", cal_id)
+                    availability.add_busy(intervals, f"ocupat în „{name}”")
+                if availability.on_change is not None:
+                    availability.on_change()
+
+            self._run_in_background(
+                lambda: self.engine.fetch_free_busy(remote_ids, first, end), loaded, lambda error: None,
+                show_loading=False)
+        return availability
+
+    def _can_write(self, event):
+        calendar = self._calendars.get(event.calendar)
+        if calendar is not None and calendar["access_role"] not in (None, "writer", "owner"):
+            QMessageBox.information(self, "Calendar", f"Calendarul „{calendar['summary']}” este doar pentru citire.")
+            return False
+        return True
+
+    def _pick_calendar(self, title, writable):
+        calendars = [cal for cal in self._calendars.values()
+                     if not writable or cal["access_role"] in (None, "writer", "owner")]
+        if not calendars:
+            return None
+        names = [cal["summary"] for cal in calendars]
+        name, ok = QInputDialog.getItem(self, title, "Calendar:", names, 0, False)
+        return calendars[names.index(name)]["id"] if ok else None
+
+    def _run_with_progress(self, label, fn, on_done):
+        """Run ``fn(report, should_stop)`` in the background behind a cancellable progress dialog.
+
+        ``report`` takes a ``(done, total, text)`` tuple; a zero total shows a busy bar.
+        """
+        stop = threading.Event()
+        dialog = QProgressDialog(label, "Anulează", 0, 100, self)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+        dialog.canceled.connect(stop.set)
+
+        def progress(state):
+            done, total, text = state
+            if total:
+                dialog.setValue(done * 100 // total)
+            else:
+                dialog.setRange(0, 0)
+            dialog.setLabelText(f"{label}\n{text}")
+
+        def finished(result):
+            dialog.reset()
+            on_done(result)
+
+        def failed(error):
+            dialog.reset()
+            self._show_api_error(error)
+
+        self._run_in_background(lambda report: fn(report, stop.is_set), finished, failed, on_progress=progress)
+
+    def import_ics(self):
+        if self.service is None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Importă .ics", "", "iCalendar (*.ics)")
+        calendar_id = path and self._pick_calendar("Importă în", writable=True)
+        if not calendar_id:
+            return
+
+        def run(report, should_stop):
+            return import_calendar(
+                self.engine, path, calendar_id, should_stop=should_stop,
+                report=lambda state: report((state[0], state[1], f"{state[2].get('imported', 0)} importate")))
+
+        def done(stats):
+            lines = [f"Importate: {stats['imported']}", f"Existau deja: {stats['duplicates']}"]
+            if stats["skipped"] or stats["failed"]:
+                lines.append(f"Ignorate: {stats['skipped'] + stats['failed']}")
+            if stats["interrupted"]:
+                lines.append("Importul a fost oprit; rulează-l din nou pentru a continua.")
+            QMessageBox.information(self, "Import .ics", "\n".join(lines))
+            self.sync_events([calendar_id])
+
+        self._run_with_progress("Se importă evenimentele…", run, done)
+
+    def export_ics(self):
+        if self.service is None:
+            return
+        calendar_id = self._pick_calendar("Exportă", writable=False)
+        if not calendar_id:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exportă .ics", f"{self._calendars[calendar_id]['summary']}.ics", "iCalendar (*.ics)")
+        if not path:
+            return
+
+        def run(report, should_stop):
+            # The total is unknown until the last page; keep the bar moving instead
+            return export_calendar(self.engine, path, calendar_id, should_stop=should_stop,
+                                   report=lambda written: report((0, 0, f"{written} evenimente")))
+
+        def done(written):
+            if written is not None:
+                QMessageBox.information(self, "Export .ics", f"{written} evenimente salvate în\n{path}")
+
+        self._run_with_progress("Se exportă evenimentele…", run, done)
+
+    def _queue_write(self, calendar_id, kind, event_id, body=None):
+        self.outbox.enqueue(calendar_id, kind, event_id, body)
+        self._update_outbox_label()
+        self._drain_outbox()
+
+    def _drain_outbox(self):
+        session = self.session
+        if session.outbox_busy or self.service is None:
+            return
+        ops = self.outbox.take_ready(OUTBOX_BATCH_SIZE)
+        if not ops:
+            due = self.outbox.next_due()
+            if due is not None:
+                self._outbox_timer.start(max(0, int((due - time.time()) * 1000)))
+            return
+        session.outbox_busy = True
+        self._run_in_background(
+            lambda: session.engine.send_outbox_batch(ops),
+            lambda results: self._on_outbox_sent(session, ops, results),
+            lambda error: self._on_outbox_sent(session, ops, {op["op_id"]: (None, error) for op in ops}),
+            show_loading=False,
+        )
+
+    def _on_outbox_sent(self, session, ops, results):
+        session.outbox_busy = False
+        shown = session is self.session
+        outbox = session.engine.outbox
+        failures = []
+        for op in ops:
+            response, error = results.get(op["op_id"], (None, None))
+            outcome, retry_after = classify(op, error)
+            if outcome == DONE:
+                outbox.complete(op["op_id"])
+                if shown:
+                    self._confirm_write(op, response)
+                else:
+                    session.engine.confirm_write(op, response)
+            elif outcome == RETRY:
+                outbox.retry(op["op_id"], time.time() + backoff_delay(op["attempts"], retry_after))
+            else:
+                outbox.drop(op["op_id"])
+                failures.append(error)
+        if not shown:
+            # Its cached months still show these writes as pending; the rest go out once it is shown
+            session.month_cache.clear()
+            return
+        self._update_outbox_label()
+        if failures:
+            # The server refused these writes for good: go back to what it actually has
+            self.month_cache.clear()
             self.load_events()
             self.refresh_month_events()
+            self._reload_reminders()
+            self._show_api_error(failures[0])
+        self._drain_outbox()
+
+    def _confirm_write(self, op, saved):
+        calendar_id, event_id = op["calendar_id"], op["event_id"]
+        if not self.engine.confirm_write(op, saved):
+            self.sync_events()
+            return
+        if op["kind"] == "delete":
+            return
+        if self.outbox.has_pending(calendar_id, event_id):
+            # A newer local edit is still queued; keep showing that one
+            return
+        self._update_reminders((calendar_id, event_id), saved)
+        record = EventRecord.from_event(dict(saved, _calendar=calendar_id))
+        old = self._cached_event((calendar_id, event_id)) or record
+        if old is not None:
+            self._apply_local_change(old, record)
+
+    def _cached_event(self, key):
+        for ev in self._month_events(self.calendar.yearShown(), self.calendar.monthShown()):
+            if ev.key == key:
+                return ev
+        return None
+
+    def _load_reminders(self, calendar_ids, start_ts, end_ts, on_error=None):
+        """Queue, from the store, the reminders of events starting in [start_ts, end_ts)."""
+        if start_ts >= end_ts:
+            return
+        touched = set()
+        self._reminder_touched.append(touched)
+        session = self.session
+
+        def loaded(found):
+            self._reminder_touched.remove(touched)
+            if session is not self.session:
+                # Another account is shown now and has queued its own
+                return
+            shown = set(self._selected_calendar_ids())
+            for key, summary, start, minutes in found:
+                if key not in touched and key[0] in shown:
+                    self.reminders.set_event(key, summary, start, minutes)
+            self._arm_reminder_timer()
+
+        def failed(error):
+            self._reminder_touched.remove(touched)
+            if on_error is not None:
+                on_error()
+
+        self._run_in_background(lambda: self.engine.reminders_between(calendar_ids, start_ts, end_ts),
+                                loaded, failed, show_loading=False)
+
+    def _extend_reminders(self):
+        """Load the events coming within the look-ahead, a day past it, once a day at most."""
+        start = max(self.reminders.until, time.time())
+        horizon = time.time() + REMINDER_LOOKAHEAD
+        if start >= horizon:
+            return
+        end = horizon + REMINDER_EXTEND_SECONDS
+        previous, self.reminders.until = self.reminders.until, end
+        self._load_reminders(self._selected_calendar_ids(), start, end,
+                             on_error=lambda: setattr(self.reminders, "until", previous))
+
+    def _reload_reminders(self, calendar_ids=None):
+        """Queue the reminders of ``calendar_ids`` (default: all shown) afresh from the store."""
+        if calendar_ids is None:
+            self.reminders.clear()
+        else:
+            for calendar_id in calendar_ids:
+                self.reminders.remove_calendar(calendar_id)
+        self._load_reminders(calendar_ids or self._selected_calendar_ids(), time.time(), self.reminders.until)
+        self._extend_reminders()
+
+    def _on_reminder_changes(self, calendar_id, changes):
+        if calendar_id not in self._selected_calendar_ids():
+            return
+        if None in changes or any("recurrence" in item for item in changes):
+            # A full sync drops events without an item for them, and series are expanded here
+            self._reload_reminders([calendar_id])
+            return
+        for item in changes:
+            self._update_reminders((calendar_id, item.get("id")), item)
+
+    def _update_reminders(self, key, event):
+        """Requeue the reminders of one event (an API dict), or drop them if ``event`` is None or cancelled."""
+        for touched in self._reminder_touched:
+            touched.add(key)
+        row = event_row(event) if event is not None and event.get("status") != "cancelled" else None
+        if row is None:
+            self.reminders.remove(key)
+        else:
+            minutes = popup_minutes(event, self._default_reminders.get(key[0], ()))
+            self.reminders.set_event(key, event.get("summary") or "", row[0], minutes)
+        self._arm_reminder_timer()
+
+    def _arm_reminder_timer(self):
+        due = self.reminders.next_due()
+        wait = REMINDER_CHECK_SECONDS if due is None else min(max(due - time.time(), 0), REMINDER_CHECK_SECONDS)
+        self._reminder_timer.start(int(wait * 1000))
+
+    def _on_reminder_timer(self):
+        now = time.time()
+        # After a sleep this is every reminder missed meanwhile; only those whose event is
+        # still to come, or has only just begun, are worth showing
+        due = [r for r in self.reminders.pop_due(now) if r.start_ts + REMINDER_LATE_GRACE > now]
+        if due:
+            self._notify(due)
+        self._extend_reminders()
+        self._arm_reminder_timer()
+
+    @staticmethod
+    def _reminder_line(reminder, now):
+        start = datetime.datetime.fromtimestamp(reminder.start_ts)
+        when = f"{start:%H:%M}" if start.date() == datetime.date.today() else f"{start:%d.%m %H:%M}"
+        minutes = round((reminder.start_ts - now) / 60)
+        if minutes <= 0:
+            when += " (a început)"
+        elif minutes < 60:
+            when += f" (peste {minutes} min)"
+        return when
+
+    def _notify(self, due):
+        # Several reminders of one event at once (after a sleep): the latest one says it all
+        latest = list({r.key: r for r in due}.values())
+        now = time.time()
+        if len(latest) == 1:
+            title = latest[0].summary or "Fără titlu"
+            text = self._reminder_line(latest[0], now)
+        else:
+            title = f"{len(latest)} mementouri"
+            lines = [f"{self._reminder_line(r, now)}  {r.summary or 'Fără titlu'}" for r in latest[:REMINDER_LIST_LIMIT]]
+            if len(latest) > REMINDER_LIST_LIMIT:
+                lines.append(f"și încă {len(latest) - REMINDER_LIST_LIMIT}")
+            text = "\n".join(lines)
+        self._notified = latest[0]
+        if self.tray.isVisible() and QSystemTrayIcon.supportsMessages():
+            self.tray.showMessage(title, text, QSystemTrayIcon.Information, REMINDER_TOAST_MS)
+            return
+        # No notification area: a box that does not block the window, plus a taskbar flash
+        QApplication.alert(self)
+        box = QMessageBox(QMessageBox.Information, title, text, QMessageBox.Open | QMessageBox.Close, self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.setModal(False)
+        box.button(QMessageBox.Open).clicked.connect(self._open_notified_event)
+        box.show()
+
+    def _open_notified_event(self):
+        if self._notified is None:
+            return
+        self._bring_to_front()
+        day = datetime.date.fromtimestamp(self._notified.start_ts)
+        self._show_event(QDate(day.year, day.month, day.day), self._notified.key)
+
+    def _bring_to_front(self):
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    @staticmethod
+    def _tray_icon():
+        pixmap = QPixmap(32, 32)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#1976d2"))
+        painter.drawRoundedRect(QRectF(2, 3, 28, 27), 5, 5)
+        painter.setPen(QColor("#ffffff"))
+        font = QFont("Segoe UI")
+        font.setPixelSize(15)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(QRect(2, 5, 28, 25), Qt.AlignCenter, str(datetime.date.today().day))
+        painter.end()
+        return QIcon(pixmap)
+
+    def _update_outbox_label(self):
+        pending = self.outbox.count()
+        self.outbox_label.setText(f"⟳ {pending} nesincronizate")
+        self.outbox_label.setVisible(pending > 0)
+
+    def _session_for(self, account):
+        session = self.sessions.get(account.id)
+        if session is None:
+            session = self.sessions[account.id] = AccountSession(account, EXPAND_RECURRENCE_LOCALLY)
+        return session
+
+    def _use_session(self, session):
+        self.session = session
+        self.engine = session.engine
+        self.store = session.engine.store
+        self.outbox = session.engine.outbox
+        self.month_cache = session.month_cache
+
+    def _forget_session(self, session):
+        self.sessions.pop(session.account.id, None)
+        self.accounts.remove(session.account.id)
+        self._update_accounts_menu()
+
+    def switch_account(self, account_id):
+        """Show ``account_id``: repaint from its cache right away, then catch it up in the background."""
+        if account_id == self.session.account.id:
+            self._update_accounts_menu()
+            return
+        self.accounts.set_active(account_id)
+        self._show_session(self._session_for(self.accounts.get(account_id)))
+
+    def _show_session(self, session):
+        self._use_session(session)
+        self._poll_timer.stop()
+        self._outbox_timer.stop()
+        # Everything below is per account; background work of the previous one finds it replaced
+        self.requests.clear()
+        self._holiday_cache = {}
+        self._holiday_requests = set()
+        self._layout_cache.clear()
+        self._agenda_revision = None
+        self._default_reminders = None
+        self.search_edit.clear()
+        self._load_calendars()
+        self._update_accounts_menu()
+        self.load_events()
+        self.refresh_month_events()
+        self._update_outbox_label()
+        if self._year_dialog is not None and self._year_dialog.isVisible():
+            self._year_dialog.reload()
+        if self.service is None:
+            self._connect()
+        else:
+            self._start_session()
+
+    def add_account(self):
+        """Sign in one more account; it is shown (empty) while the browser login runs."""
+        self._account_before_add = self.session.account.id
+        self.switch_account(self.accounts.add().id)
+
+    def _update_accounts_menu(self):
+        active = self.session.account
+        menu = self.accounts_button.menu()
+        menu.clear()
+        for account in self.accounts.accounts:
+            action = menu.addAction(account.name or "Cont nou")
+            action.setCheckable(True)
+            action.setChecked(account.id == active.id)
+            action.triggered.connect(lambda checked, account_id=account.id: self.switch_account(account_id))
+        menu.addSeparator()
+        menu.addAction("➕ Adaugă cont", self.add_account)
+        self.accounts_button.setToolTip(active.name or "Cont")
+        self.setWindowTitle(f"Google Calendar — {active.name}" if active.name else "Google Calendar")
+
+    def _schedule_token_refresh(self):
+        """Arm the timer for the first access token, of any signed-in account, that needs renewing."""
+        now = time.monotonic()
+        waits = []
+        for session in self.sessions.values():
+            expires_in = session.engine.token_expires_in()
+            if expires_in is not None and not session.refreshing:
+                waits.append(max(expires_in - TOKEN_REFRESH_MARGIN, session.refresh_after - now, 0))
+        if waits:
+            self._token_timer.start(int(min(waits) * 1000))
+        else:
+            self._token_timer.stop()
+
+    def _refresh_tokens(self):
+        """Renew, in the background, the tokens about to expire, so no request (or switch) waits on one."""
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            expires_in = session.engine.token_expires_in()
+            if (expires_in is None or expires_in > TOKEN_REFRESH_MARGIN or session.refreshing
+                    or session.refresh_after > now):
+                continue
+            session.refreshing = True
+            self._run_in_background(
+                session.engine.refresh_credentials,
+                lambda _, session=session: self._on_token_refreshed(session, True),
+                lambda error, session=session: self._on_token_refreshed(session, False),
+                show_loading=False,
+            )
+        self._schedule_token_refresh()
+
+    def _on_token_refreshed(self, session, ok):
+        session.refreshing = False
+        if not ok:
+            # Offline, most likely; requests made meanwhile still renew it on their own
+            session.refresh_after = time.monotonic() + TOKEN_REFRESH_RETRY
+        self._schedule_token_refresh()
 
     def logout(self):
-        if os.path.exists(TOKEN_PATH):
-            os.remove(TOKEN_PATH)
-        QMessageBox.information(self, "Logout", "Ai fost delogat. Se va reporni aplicația.")
-        python = sys.executable
-        os.execl(python, python, *sys.argv)
+        """Log the shown account out and drop its cache, then show another one, or the login."""
+        session = self.session
+        session.engine.logout()
+        session.month_cache.clear()
+        QMessageBox.information(self, "Logout", "Ai fost delogat.")
+        others = [account for account in self.accounts.accounts if account.id != session.account.id]
+        if others:
+            self._forget_session(session)
+            self.switch_account(others[0].id)
+        else:
+            self.accounts.rename(session.account.id, "")
+            self._show_session(session)
+        self._schedule_token_refresh()
 
 
 if __name__ == "__main__":
+    if COLLECT_METRICS:
+        METRICS.enable()
     app = QApplication(sys.argv)
     window = CalendarApp()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    QTimer.singleShot(0, lambda: window.startup.mark("window shown"))
+    status = app.exec_()
+    if METRICS.enabled and DUMP_PATH:
+        METRICS.dump(DUMP_PATH)
+    sys.exit(status)
\ No newline at end of file
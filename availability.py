@@ -0,0 +1,145 @@
+import bisect
+import datetime
+
+
+CHUNK_DAYS = 7
+FREE_SLOT_HORIZON_DAYS = 56
+WORK_DAY_START = 8
+WORK_DAY_END = 20
+
+
+def is_busy(event):
+    """Timed events block time; all-day events and those marked "free" do not, as in Google's free/busy."""
+    return (
+        "dateTime" in event.get("start", {})
+        and event.get("transparency") != "transparent"
+        and event.get("status") != "cancelled"
+    )
+
+
+class IntervalIndex:
+    """Half-open intervals kept sorted by start, with a running maximum of the ends.
+
+    An overlap query bisects the starts for the right edge and walks left until the running
+    maximum says no earlier interval can reach the left edge, so it only touches candidates.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.max_end = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end, item):
+        if end <= start:
+            return
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.items.insert(i, item)
+        self.max_end.insert(i, 0)
+        # Appending in start order (the common case) only touches the new entry
+        running = self.max_end[i - 1] if i else 0
+        for j in range(i, len(self.starts)):
+            running = max(running, self.ends[j])
+            if j > i and self.max_end[j] == running:
+                break
+            self.max_end[j] = running
+
+    def overlapping(self, start, end):
+        """``(start, end, item)`` of every interval overlapping [start, end), latest start first."""
+        j = bisect.bisect_left(self.starts, end) - 1
+        while j >= 0 and self.max_end[j] > start:
+            if self.ends[j] > start:
+                yield self.starts[j], self.ends[j], self.items[j]
+            j -= 1
+
+    def busy_until(self, start, end):
+        """Latest end among intervals overlapping [start, end), or None if that span is free."""
+        return max((e for _, e, _ in self.overlapping(start, end)), default=None)
+
+
+class Availability:
+    """Busy time across the shown calendars, for conflict checks and free-slot search.
+
+    Stored events are indexed a week at a time, as far as a query needs. Calendars without a
+    local copy are covered by ``add_busy`` with intervals from the free/busy API.
+    """
+
+    def __init__(self, load_rows, first_day, ignore_key=None):
+        # load_rows(start_ts, end_ts) -> store rows overlapping that range, in start order
+        self._load_rows = load_rows
+        self._ignore_key = ignore_key
+        self._remote = []
+        # Called after busy intervals arrive from elsewhere, so a dialog can re-check
+        self.on_change = None
+        self._reset(_midnight_ts(first_day))
+
+    def _reset(self, from_ts):
+        self.index = IntervalIndex()
+        self._loaded_from = self._loaded_until = from_ts
+        for start, end, item in self._remote:
+            self.index.add(start, end, item)
+
+    def _ensure(self, start_ts, end_ts):
+        if start_ts < self._loaded_from:
+            day = datetime.datetime.fromtimestamp(start_ts)
+            self._reset(_midnight_ts(day))
+        while self._loaded_until < end_ts:
+            chunk_end = self._loaded_until + CHUNK_DAYS * 86400
+            for start, end, _, event in self._load_rows(self._loaded_until, chunk_end):
+                # Events reaching into the chunk from before it are already indexed
+                if start < self._loaded_until and self._loaded_until != self._loaded_from:
+                    continue
+                if is_busy(event) and (event.get("_calendar"), event.get("id")) != self._ignore_key:
+                    self.index.add(start, end, event)
+            self._loaded_until = chunk_end
+
+    def add_busy(self, intervals, label):
+        """Merge ``[(start_ts, end_ts)]`` known only as busy (no event details)."""
+        for start, end in intervals:
+            item = {"summary": label}
+            self._remote.append((start, end, item))
+            self.index.add(start, end, item)
+
+    def conflicts(self, start_ts, end_ts):
+        """Events overlapping [start_ts, end_ts), in start order."""
+        self._ensure(start_ts, end_ts)
+        found = list(self.index.overlapping(start_ts, end_ts))
+        found.reverse()
+        return [item for _, _, item in found]
+
+    def next_free_slot(self, after, duration, day_start=WORK_DAY_START, day_end=WORK_DAY_END,
+                       horizon_days=FREE_SLOT_HORIZON_DAYS):
+        """First free ``duration`` (timedelta) at or after the local datetime ``after``, inside
+        working hours, or None within ``horizon_days``.
+        """
+        limit = after + datetime.timedelta(days=horizon_days)
+        t = after.replace(second=0, microsecond=0)
+        while t < limit:
+            opens = t.replace(hour=day_start, minute=0)
+            closes = t.replace(hour=0, minute=0) + datetime.timedelta(hours=day_end)
+            if t < opens:
+                t = opens
+            if t + duration > closes:
+                t = opens + datetime.timedelta(days=1)
+                continue
+            start_ts = int(t.timestamp())
+            end_ts = start_ts + int(duration.total_seconds())
+            self._ensure(start_ts, end_ts)
+            busy_until = self.index.busy_until(start_ts, end_ts)
+            if busy_until is None:
+                return t
+            # Jump straight past the blocking events, rounded up to the next 5 minutes
+            t = datetime.datetime.fromtimestamp(busy_until)
+            if t.second or t.microsecond:
+                t = t.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+            t += datetime.timedelta(minutes=-t.minute % 5)
+        return None
+
+
+def _midnight_ts(day):
+    return int(datetime.datetime(day.year, day.month, day.day).timestamp())
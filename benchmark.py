@@ -0,0 +1,379 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Must be set before Qt creates the application
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QCoreApplication, QDate, QEventLoop, QTime
+from PyQt5.QtWidgets import QApplication, QDialog, QMessageBox
+
+import app
+from event_record import EventRecord
+from fake_service import FakeCalendarService, generate_events
+
+
+VOLUMES = {"small": 10, "medium": 1000, "large": 50000}
+SCENARIOS = ("cold_start", "month_navigation", "day_selection", "list_build", "paint_cell", "mutations", "year_view",
+             "week_view", "reminders", "account_switch", "navigation_burst")
+IDLE_TIMEOUT = 600
+# Seconds between pages while an arrow key is held down
+KEY_REPEAT_INTERVAL = 0.033
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+class Harness:
+    """Runs ``CalendarApp`` windows against a ``FakeCalendarService`` in a throwaway directory."""
+
+    def __init__(self, service):
+        self.service = service
+        self.qapp = QApplication.instance() or QApplication(sys.argv[:1])
+        self.dialogs = 0
+        self._workdir = tempfile.TemporaryDirectory(prefix="calendar-bench-")
+        self._stores = 0
+        self.use_new_store()
+        app.CalendarApp.get_calendar_service = lambda window, engine, interactive=True: (None, service)
+        # A modal dialog would stall a headless run; count them instead
+        QMessageBox.warning = QMessageBox.critical = QMessageBox.information = self._dialog
+        QMessageBox.question = lambda *args, **kwargs: QMessageBox.Yes
+
+    def _dialog(self, *args, **kwargs):
+        self.dialogs += 1
+        return QMessageBox.Ok
+
+    def close(self):
+        self._workdir.cleanup()
+
+    def use_new_store(self):
+        """Point windows opened from now on at an empty store; returns the previous paths."""
+        previous = app.STORE_PATH, app.ACCOUNTS_PATH
+        self._stores += 1
+        app.STORE_PATH = os.path.join(self._workdir.name, f"events{self._stores}.db")
+        app.ACCOUNTS_PATH = os.path.join(self._workdir.name, f"accounts{self._stores}.json")
+        return previous
+
+    def open_window(self):
+        window = app.CalendarApp()
+        window.show()
+        self.process_events()
+        return window
+
+    def process_events(self):
+        QCoreApplication.processEvents(QEventLoop.AllEvents)
+
+    def wait_idle(self, window):
+        """Pump the event loop until no background work is left."""
+        deadline = time.monotonic() + IDLE_TIMEOUT
+        while time.monotonic() < deadline:
+            self.process_events()
+            if (window.service is not None and not window._workers and not window.requests
+                    and not window.session.syncing and not window.session.outbox_busy):
+                self.process_events()
+                return
+            time.sleep(0.001)
+        raise TimeoutError("background work did not finish")
+
+    def wait_written(self, window):
+        """Like ``wait_idle``, but also waits out retries until the outbox is empty."""
+        deadline = time.monotonic() + IDLE_TIMEOUT
+        while time.monotonic() < deadline:
+            self.wait_idle(window)
+            if window.outbox.count() == 0:
+                return
+            time.sleep(0.01)
+        raise TimeoutError("outbox did not drain")
+
+    def close_window(self, window):
+        window._poll_timer.stop()
+        window.close()
+        window.deleteLater()
+        self.process_events()
+
+
+def bench_cold_start(harness, window, repeat):
+    results = {"first_paint": [], "synced": [], "warm_first_paint": [], "warm_synced": []}
+    for _ in range(repeat):
+        shared_paths = harness.use_new_store()
+        for prefix in ("", "warm_"):
+            started = time.perf_counter()
+            w = harness.open_window()
+            w.repaint()
+            results[prefix + "first_paint"].append(elapsed_ms(started))
+            harness.wait_idle(w)
+            results[prefix + "synced"].append(elapsed_ms(started))
+            harness.close_window(w)
+        app.STORE_PATH, app.ACCOUNTS_PATH = shared_paths
+    return results
+
+
+def bench_month_navigation(harness, window, repeat):
+    results = {"cold_cache": [], "warm_cache": []}
+    for _ in range(repeat):
+        window.month_cache.clear()
+        for label in ("cold_cache", "warm_cache"):
+            for step in [window.calendar.showNextMonth] * 6 + [window.calendar.showPreviousMonth] * 6:
+                started = time.perf_counter()
+                step()
+                window.calendar.repaint()
+                results[label].append(elapsed_ms(started))
+                # Let the neighbour prefetch land, as it would between real clicks
+                harness.wait_idle(window)
+    return results
+
+
+def bench_day_selection(harness, window, repeat):
+    results = {"select_day": []}
+    first = window.calendar.selectedDate().addDays(1 - window.calendar.selectedDate().day())
+    for _ in range(repeat):
+        for offset in range(first.daysInMonth()):
+            started = time.perf_counter()
+            window.calendar.setSelectedDate(first.addDays(offset))
+            window.events_list.viewport().repaint()
+            results["select_day"].append(elapsed_ms(started))
+    window.calendar.setSelectedDate(QDate.currentDate())
+    return results
+
+
+def bench_list_build(harness, window, repeat, count):
+    today = datetime.date.today()
+    events = [EventRecord.from_event(dict(ev, _calendar="primary"))
+              for ev in generate_events(count, today, 1, prefix="list", all_day_fraction=0)]
+    events.sort(key=lambda ev: ev.start_ts)
+    results = {f"build_{count}": [], f"first_paint_{count}": []}
+    for _ in range(repeat):
+        window.events_delegate.clear_cache()
+        started = time.perf_counter()
+        window.events_model.set_events(events)
+        results[f"build_{count}"].append(elapsed_ms(started))
+        started = time.perf_counter()
+        window.events_list.viewport().repaint()
+        results[f"first_paint_{count}"].append(elapsed_ms(started))
+    window.load_events()
+    return results
+
+
+def bench_paint_cell(harness, window, repeat):
+    results = {"grid_cold_cache": [], "grid_warm_cache": [], "cell_cold_cache": []}
+    cells = 42
+    for _ in range(repeat):
+        window.calendar._cell_cache.clear()
+        started = time.perf_counter()
+        window.calendar.repaint()
+        cold = elapsed_ms(started)
+        started = time.perf_counter()
+        window.calendar.repaint()
+        results["grid_cold_cache"].append(cold)
+        results["grid_warm_cache"].append(elapsed_ms(started))
+        results["cell_cold_cache"].append(cold / cells)
+    return results
+
+
+def bench_mutations(harness, window, repeat):
+    results = {key: [] for key in (
+        "add_local", "add_round_trip", "edit_local", "edit_round_trip", "delete_local", "delete_round_trip")}
+    titles = []
+
+    def accept(dlg):
+        titles.append(f"Bench {len(titles)}")
+        dlg.title_edit.setText(titles[-1])
+        dlg.start_time.setTime(QTime(10, 0))
+        dlg.end_time.setTime(QTime(11, 0))
+        return QDialog.Accepted
+
+    app.AddEventDialog.exec_ = accept
+
+    def timed(action, name):
+        started = time.perf_counter()
+        action()
+        results[name + "_local"].append(elapsed_ms(started))
+        harness.wait_written(window)
+        results[name + "_round_trip"].append(elapsed_ms(started))
+
+    def select(key):
+        row = window.events_model.row_of(key)
+        window.events_list.setCurrentIndex(window.events_model.index(row))
+
+    for _ in range(repeat):
+        timed(window.add_event, "add")
+        added = next(ev for ev in window.events if ev.summary == titles[-1])
+        select(added.key)
+        timed(window.edit_event, "edit")
+        select(added.key)
+        timed(window.delete_event, "delete")
+    return results
+
+
+def bench_year_view(harness, window, repeat):
+    results = {"open_five_years": [], "repaint_cached": []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        window.show_year_view()
+        harness.wait_idle(window)
+        window._year_dialog.heatmap.repaint()
+        results["open_five_years"].append(elapsed_ms(started))
+        started = time.perf_counter()
+        window._year_dialog.heatmap.repaint()
+        results["repaint_cached"].append(elapsed_ms(started))
+        window._year_dialog.hide()
+    return results
+
+
+def bench_week_view(harness, window, repeat):
+    results = {"cold_layout": [], "warm_layout": []}
+    window.view_buttons.button(1).click()
+    for _ in range(repeat):
+        window._layout_cache.clear()
+        for label in ("cold_layout", "warm_layout"):
+            for step in [window.next_week_button.click] * 4 + [window.previous_week_button.click] * 4:
+                started = time.perf_counter()
+                step()
+                window.week_view.viewport().repaint()
+                results[label].append(elapsed_ms(started))
+                harness.wait_idle(window)
+    window.view_buttons.button(0).click()
+    return results
+
+
+def bench_reminders(harness, window, repeat):
+    results = {"reload_queue": []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        window._reload_reminders()
+        harness.wait_idle(window)
+        results["reload_queue"].append(elapsed_ms(started))
+    return results
+
+
+def bench_account_switch(harness, window, repeat):
+    results = {"first_paint": [], "synced": []}
+    home = window.session.account.id
+    # A second account (on the same fake service), signed in and synced once before timing
+    window.add_account()
+    harness.wait_idle(window)
+    other = window.session.account.id
+    for _ in range(repeat):
+        for account_id in (home, other):
+            started = time.perf_counter()
+            window.switch_account(account_id)
+            window.repaint()
+            results["first_paint"].append(elapsed_ms(started))
+            harness.wait_idle(window)
+            results["synced"].append(elapsed_ms(started))
+    window.switch_account(home)
+    harness.wait_idle(window)
+    return results
+
+
+def bench_navigation_burst(harness, window, repeat):
+    """A held arrow key across two years and back, then the year spinner run back and forth."""
+    results = {"step": [], "settled": []}
+    calendar = window.calendar
+    previous_year = lambda: calendar.setCurrentPage(calendar.yearShown() - 1, calendar.monthShown())
+    next_year = lambda: calendar.setCurrentPage(calendar.yearShown() + 1, calendar.monthShown())
+    for steps in ([calendar.showNextMonth] * 24 + [calendar.showPreviousMonth] * 24,
+                  [previous_year] * 10 + [next_year] * 10):
+        for _ in range(repeat):
+            window.month_cache.clear()
+            burst = time.perf_counter()
+            for step in steps:
+                started = time.perf_counter()
+                step()
+                calendar.repaint()
+                results["step"].append(elapsed_ms(started))
+                # The event loop keeps running between key repeats, as it would for a real user
+                resume = time.perf_counter() + KEY_REPEAT_INTERVAL
+                while time.perf_counter() < resume:
+                    harness.process_events()
+                    time.sleep(0.001)
+            harness.wait_idle(window)
+            results["settled"].append(elapsed_ms(burst))
+    return results
+
+
+def run(volumes, scenarios, repeat, calendars, latency, jitter, error_rate, page_size, list_size):
+    harness = None
+    for volume_name in volumes:
+        count = VOLUMES[volume_name]
+        service = FakeCalendarService.with_volume(
+            count, calendars=calendars, recurring=count // 100, latency=latency, jitter=jitter,
+            error_rate=error_rate, page_size=page_size)
+        harness = Harness(service)
+        window = harness.open_window()
+        harness.wait_idle(window)
+        for scenario in scenarios:
+            service.calls.clear()
+            dialogs = harness.dialogs
+            bench = globals()["bench_" + scenario]
+            if scenario == "list_build":
+                samples = bench(harness, window, repeat, min(list_size, max(count, 10)))
+            else:
+                samples = bench(harness, window, repeat)
+            for metric, values in samples.items():
+                yield dict(
+                    summarize(values), scenario=scenario, metric=metric, volume=volume_name, events=count,
+                    api_calls=dict(service.calls), dialogs=harness.dialogs - dialogs,
+                )
+        harness.close_window(window)
+        harness.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a fake Calendar service.")
+    parser.add_argument("--volumes", default="small,medium", help=f"comma separated, from {', '.join(VOLUMES)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--calendars", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per round trip")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per round trip")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=2500)
+    parser.add_argument("--list-size", type=int, default=2000, help="events in the list_build scenario")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    parser.add_argument("--local-recurrence", action="store_true",
+                        help="sync series as masters and expand them locally")
+    args = parser.parse_args(argv)
+    # Read by each window as it opens, like the store path
+    app.EXPAND_RECURRENCE_LOCALLY = args.local_recurrence or app.EXPAND_RECURRENCE_LOCALLY
+
+    run_info = {
+        "run": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate, "page_size": args.page_size,
+        "local_recurrence": app.EXPAND_RECURRENCE_LOCALLY,
+    }
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in run(args.volumes.split(","), args.scenarios.split(","), args.repeat, args.calendars,
+                          args.latency, args.jitter, args.error_rate, args.page_size, args.list_size):
+            out.write(json.dumps(dict(result, **run_info)) + "\n")
+            out.flush()
+            print(f"{result['volume']:>6} {result['scenario']:<17} {result['metric']:<22} "
+                  f"median {result['median_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+
+from googleapiclient.errors import HttpError
+
+from accounts import AccountRegistry
+from calendar_sync import CalendarSync, NotLoggedIn, EXPAND_RECURRENCE_LOCALLY
+from event_store import event_end_str, event_start_str
+from ics_io import export_calendar, import_calendar
+
+
+CSV_COLUMNS = ("calendar", "id", "start", "end", "all_day", "summary", "location", "description", "status")
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+
+def sync(engine, calendar_ids=None):
+    """Refresh the calendar list and sync ``calendar_ids`` (default: the selected ones).
+
+    Returns ``{calendar_id: changed_rows}``.
+    """
+    engine.attach(*engine.connect(interactive=False))
+    engine.refresh_calendar_list()
+    return {cal_id: engine.sync_calendar(cal_id) for cal_id in calendar_ids or engine.selected_calendar_ids()}
+
+
+def write_jsonl(rows, out):
+    for _, _, _, ev in rows:
+        ev = dict(ev)
+        ev["calendar"] = ev.pop("_calendar")
+        out.write(json.dumps(ev, ensure_ascii=False) + "\n")
+
+
+def write_csv(rows, out):
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for _, _, _, ev in rows:
+        start = event_start_str(ev) or ""
+        writer.writerow((
+            ev["_calendar"], ev.get("id", ""), start, event_end_str(ev) or "", "T" not in start,
+            ev.get("summary", ""), ev.get("location", ""), ev.get("description", ""), ev.get("status", ""),
+        ))
+
+
+def cmd_events(engine, args):
+    calendar_ids = args.calendar or engine.selected_calendar_ids()
+    if not args.offline:
+        sync(engine, calendar_ids)
+    end = args.end or args.start + datetime.timedelta(days=30)
+    rows = engine.iter_events(calendar_ids, args.start, end)
+    (write_csv if args.format == "csv" else write_jsonl)(rows, sys.stdout)
+
+
+def cmd_sync(engine, args):
+    changed = sync(engine, args.calendar)
+    print(json.dumps({"ok": True, "changed": changed, "pending_writes": engine.outbox.count()}))
+
+
+def cmd_calendars(engine, args):
+    if not args.offline:
+        engine.attach(*engine.connect(interactive=False))
+        engine.refresh_calendar_list()
+    for cal in engine.store.calendars():
+        print(json.dumps(cal, ensure_ascii=False))
+
+
+def cmd_import(engine, args):
+    # Syncing first fills the store, so events already in the calendar are skipped locally
+    sync(engine, [args.calendar])
+
+    def progress(state):
+        done, total, stats = state
+        print(f"\r{done * 100 // max(total, 1):3d}%  imported {stats.get('imported', 0)}",
+              end="", file=sys.stderr, flush=True)
+
+    stats = import_calendar(engine, args.file, args.calendar, report=progress)
+    print(file=sys.stderr)
+    engine.sync_calendar(args.calendar)
+    print(json.dumps(dict(stats)))
+
+
+def cmd_export(engine, args):
+    engine.attach(*engine.connect(interactive=False))
+    written = export_calendar(engine, args.file, args.calendar, args.start, args.end,
+                              report=lambda n: print(f"\r{n} events", end="", file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    print(json.dumps({"written": written, "file": args.file}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Google Calendar from the command line, using the same local store as the app.")
+    parser.add_argument("--store", help="SQLite store (default: the one of the account shown in the app)")
+    parser.add_argument("--local-recurrence", action="store_true",
+                        help="sync recurring events as masters and expand them locally")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    events = commands.add_parser("events", help="stream events overlapping a date range")
+    events.add_argument("--from", dest="start", type=parse_date, default=datetime.date.today(),
+                        help="first day, YYYY-MM-DD (default: today)")
+    events.add_argument("--to", dest="end", type=parse_date, help="day after the last one (default: +30 days)")
+    events.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+
+    sync_parser = commands.add_parser("sync", help="sync now; exits non-zero on failure, for cron health checks")
+    calendars = commands.add_parser("calendars", help="list the known calendars")
+
+    import_parser = commands.add_parser("import", help="import an .ics file; re-run to resume an interrupted import")
+    export_parser = commands.add_parser("export", help="write a calendar to an .ics file")
+    for sub in (import_parser, export_parser):
+        sub.add_argument("file")
+        sub.add_argument("--calendar", default="primary", help="calendar id (default: primary)")
+    export_parser.add_argument("--from", dest="start", type=parse_date, help="first day, YYYY-MM-DD (default: all)")
+    export_parser.add_argument("--to", dest="end", type=parse_date, help="day after the last one (default: all)")
+
+    for sub in (events, sync_parser):
+        sub.add_argument("--calendar", action="append", help="calendar id (repeatable; default: the shown ones)")
+    for sub in (events, calendars):
+        sub.add_argument("--offline", action="store_true", help="read the local store only, no API calls")
+
+    args = parser.parse_args(argv)
+    account = AccountRegistry().active
+    engine = CalendarSync(args.store or account.store_path, account.token_path,
+                          expand_recurrence=args.local_recurrence or EXPAND_RECURRENCE_LOCALLY)
+    handler = {"events": cmd_events, "sync": cmd_sync, "calendars": cmd_calendars,
+               "import": cmd_import, "export": cmd_export}[args.command]
+    try:
+        handler(engine, args)
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (NotLoggedIn, HttpError, OSError) as e:
+        if args.command == "sync":
+            print(json.dumps({"ok": False, "error": str(e)}))
+        print(f"error: {e}", file=sys.stderr)
+        return 2 if isinstance(e, NotLoggedIn) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
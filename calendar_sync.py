@@ -0,0 +1,610 @@
+import datetime
+import heapq
+import os
+import pickle
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from googleapiclient.errors import HttpError
+
+from event_store import EventStore, event_row, event_start_str
+from recurrence import Series, UnsupportedRule
+from outbox import Outbox, overlay_pending
+from reminders import popup_minutes
+from month_cache import month_range, local_midnight_ts
+from metrics import METRICS
+
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CREDENTIALS_PATH = os.path.join(BASE_DIR, "credentials.json")
+TOKEN_PATH = os.path.join(BASE_DIR, "token.pkl")
+STORE_PATH = os.path.join(BASE_DIR, "events.db")
+HOLIDAY_CALENDAR_IDS = [
+    "ro.romanian#holiday@group.v.calendar.google.com",
+    "ro.romanian@holiday.calendar.google.com",
+    "en.romanian#holiday@group.v.calendar.google.com",
+]
+# events.list caps maxResults at 2500; fewer, bigger pages are cheaper for large accounts
+PAGE_SIZE = 2500
+# freebusy.query accepts at most 50 calendars per request
+FREE_BUSY_GROUP_SIZE = 50
+# Partial-response projections: the grid only needs enough to place and colour a pill,
+# the day list also shows the description and the reminders used by the edit dialog
+GRID_EVENT_FIELDS = "id,status,summary,colorId,start,end"
+LIST_EVENT_FIELDS = GRID_EVENT_FIELDS + ",description,location,reminders,recurringEventId,iCalUID"
+HOLIDAY_EVENT_FIELDS = "start,summary"
+# Masters and their exceptions, when series are expanded here instead of by the server
+SERIES_EVENT_FIELDS = LIST_EVENT_FIELDS + ",recurrence,originalStartTime,etag"
+EXPAND_RECURRENCE_LOCALLY = os.environ.get("CALENDAR_LOCAL_RECURRENCE") == "1"
+# Expanded instances kept per (series, window)
+INSTANCE_CACHE_SIZE = 512
+
+
+class NotLoggedIn(Exception):
+    """No usable token and the caller did not allow the browser login flow."""
+
+
+def page_fields(event_fields):
+    return f"nextPageToken,nextSyncToken,items({event_fields})"
+
+
+def to_local_rfc3339(dt_naive):
+    local_tz = datetime.datetime.now().astimezone().tzinfo
+    return dt_naive.replace(tzinfo=local_tz).isoformat()
+
+
+def _rfc3339_ts(value):
+    return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def start_date(event):
+    """``YYYY-MM-DD`` the event starts on, for timed and all-day events alike."""
+    start_str = event_start_str(event)
+    return start_str.split("T")[0] if start_str else None
+
+
+class CalendarSync:
+    """Auth, fetching, syncing and writes against Google Calendar plus the local store, without any UI.
+
+    Safe to call from worker threads: the store and the outbox open one SQLite connection per
+    thread, and every thread gets its own HTTP transport.
+    """
+
+    def __init__(self, store_path=STORE_PATH, token_path=TOKEN_PATH, credentials_path=CREDENTIALS_PATH,
+                 expand_recurrence=EXPAND_RECURRENCE_LOCALLY):
+        self.store = EventStore(store_path)
+        self.outbox = Outbox(store_path)
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.creds = None
+        self.service = None
+        self._thread_local = threading.local()
+        # Fetch recurring events as masters (singleEvents=False) and expand them here
+        self.expand_recurrence = expand_recurrence
+        self._instances = OrderedDict()
+        self._instances_lock = threading.Lock()
+        mode = "local" if expand_recurrence else "server"
+        if self.store.get_setting("recurrence_mode") not in (None, mode):
+            # Stored rows are shaped for the other mode; full syncs will replace them
+            self.store.reset_sync_tokens()
+        self.store.set_setting("recurrence_mode", mode)
+
+    def load_credentials(self, interactive=True):
+        # Imported here: the Google auth stack is slow to import and not needed to read the store
+        from google.auth.transport.requests import Request
+        creds = None
+        if os.path.exists(self.token_path):
+            with open(self.token_path, "rb") as token:
+                creds = pickle.load(token)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            elif interactive:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
+                creds = flow.run_local_server(port=0)
+            else:
+                raise NotLoggedIn(f"no valid token in {self.token_path}; log in from the app first")
+            self._save_credentials(creds)
+        return creds
+
+    def _save_credentials(self, creds):
+        with open(self.token_path, "wb") as token:
+            pickle.dump(creds, token)
+
+    def token_expires_in(self):
+        """Seconds until the access token runs out, or None if there is none that can be renewed."""
+        creds = self.creds
+        if creds is None or creds.expiry is None or not creds.refresh_token:
+            return None
+        # google-auth keeps the expiry as naive UTC
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (creds.expiry - now).total_seconds()
+
+    def refresh_credentials(self):
+        """Renew the access token now, ahead of its expiry, and save it."""
+        from google.auth.transport.requests import Request
+        self.creds.refresh(Request())
+        self._save_credentials(self.creds)
+
+    def connect(self, interactive=True):
+        """Load (or obtain) credentials and build the service; returns ``(creds, service)``."""
+        from googleapiclient.discovery import build
+        creds = self.load_credentials(interactive)
+        # Built from the discovery document bundled with the client library: no discovery fetch
+        service = build("calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+        return creds, service
+
+    def attach(self, creds, service):
+        self.creds = creds
+        self.service = service
+        self._thread_local = threading.local()
+
+    def logout(self):
+        if os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        # The cached events belong to the account that is logging out
+        self.store.clear()
+        self.outbox.clear()
+        self.attach(None, None)
+
+    def _thread_http(self):
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+        # httplib2.Http is not thread-safe, so every thread gets its own transport
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(self.creds, http=httplib2.Http())
+            self._thread_local.http = http
+        return http
+
+    def execute(self, request, site=None):
+        if not METRICS.enabled:
+            return request.execute(http=self._thread_http())
+        site = site or request.methodId
+        started = time.perf_counter()
+        try:
+            response = request.execute(http=self._thread_http())
+        except Exception:
+            METRICS.record_response(site, started, None, error=True)
+            raise
+        METRICS.record_response(site, started, response)
+        return response
+
+    def execute_batch(self, requests, site="batch"):
+        """Send ``{key: request}`` in one HTTP round trip and return ``{key: (response, exception)}``."""
+        keys = list(requests)
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[keys[int(request_id)]] = (response, exception)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for i, key in enumerate(keys):
+            batch.add(requests[key], request_id=str(i))
+        started = time.perf_counter()
+        batch.execute(http=self._thread_http())
+        if METRICS.enabled:
+            METRICS.record_batch(site, started, results)
+        return results
+
+    def iter_event_pages(self, first_page=None, execute_first=None, site=None, **params):
+        """Yield events().list responses page by page, following nextPageToken.
+
+        ``first_page`` is an already fetched first response (e.g. from a batch),
+        ``execute_first`` lets the caller send the first request its own way.
+        ``site`` names the pages in the instrumentation.
+        """
+        params.setdefault("maxResults", PAGE_SIZE)
+        page = first_page
+        while True:
+            if page is None:
+                request = self.service.events().list(**params)
+                if execute_first is not None:
+                    page = execute_first(request)
+                    execute_first = None
+                else:
+                    page = self.execute(request, site)
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+            params["pageToken"] = page_token
+            page = None
+
+    # -- reading -----------------------------------------------------------
+
+    def stored_event(self, calendar_id, event_id):
+        event = self.store.get_event(calendar_id, event_id)
+        if event is None and "_" in event_id:
+            # Possibly an instance this side expands from a stored master
+            master = self.store.get_event(calendar_id, event_id.rsplit("_", 1)[0])
+            if master is not None and "recurrence" in master:
+                try:
+                    event = Series(master).instance(event_id)
+                except (UnsupportedRule, KeyError, ValueError):
+                    event = None
+        if event is not None:
+            event["_calendar"] = calendar_id
+        return event
+
+    def selected_calendar_ids(self):
+        calendars = self.store.calendars()
+        # Until calendarList has been fetched once, show the primary calendar
+        return [cal["id"] for cal in calendars if cal["selected"]] if calendars else ["primary"]
+
+    @METRICS.timed("store/month_rows")
+    def month_rows(self, calendar_ids, year, month):
+        """``(rows, nbytes)`` of one month, with writes still in the outbox shown on top of the server state."""
+        first, next_month = month_range(year, month)
+        start_ts, end_ts = local_midnight_ts(first), local_midnight_ts(next_month)
+        rows, nbytes = self.store.rows_between(calendar_ids, start_ts, end_ts)
+        rows = list(self.expand_rows(rows, start_ts, end_ts))
+        rows = overlay_pending(rows, self.outbox.pending(calendar_ids), start_ts, end_ts, self.stored_event)
+        return rows, nbytes
+
+    def iter_events(self, calendar_ids, first, end):
+        """Stored events overlapping the local days [first, end), streamed in start order."""
+        start_ts, end_ts = local_midnight_ts(first), local_midnight_ts(end)
+        return self.expand_rows(self.store.iter_rows_between(calendar_ids, start_ts, end_ts), start_ts, end_ts)
+
+    def expand_rows(self, rows, start_ts, end_ts):
+        """Replace series masters in ``rows`` (in start order) with their instances in the window,
+        keeping the order. Lazy: instances are merged in as the rows stream past.
+        """
+        pending = []
+        for row in rows:
+            event = row[3]
+            # Same order as the store's: start, then calendar, then id
+            order = (row[0], event["_calendar"], event.get("id") or "")
+            while pending and pending[0][:3] <= order:
+                yield heapq.heappop(pending)[-1]
+            if "recurrence" not in event:
+                yield row
+                continue
+            for instance_row in self._series_instances(event, start_ts, end_ts):
+                heapq.heappush(pending, (instance_row[0], event["_calendar"], instance_row[3]["id"], instance_row))
+        while pending:
+            yield heapq.heappop(pending)[-1]
+
+    def _series_instances(self, master, start_ts, end_ts):
+        calendar_id = master["_calendar"]
+        overridden = self.store.recurrence_overrides(calendar_id, master["id"])
+        key = (calendar_id, master["id"], master.get("etag") or master.get("updated"), start_ts, end_ts, overridden)
+        with self._instances_lock:
+            rows = self._instances.get(key)
+            if rows is not None:
+                self._instances.move_to_end(key)
+                return rows
+        try:
+            instances = Series(master).instances(start_ts, end_ts, overridden)
+            rows = [event_row(dict(instance, _calendar=calendar_id)) for instance in instances]
+        except (UnsupportedRule, KeyError, ValueError):
+            rows = []
+        rows = [row for row in rows if row is not None]
+        with self._instances_lock:
+            self._instances[key] = rows
+            if len(self._instances) > INSTANCE_CACHE_SIZE:
+                self._instances.popitem(last=False)
+        return rows
+
+    @METRICS.timed("store/search")
+    def search(self, calendar_ids, text):
+        """Stored events matching ``text``, from the local full-text index only."""
+        return self.store.search(calendar_ids, text)
+
+    @METRICS.timed("store/day_density")
+    def day_density(self, calendar_ids, first, end):
+        """``(counts, hours)`` per local day in [first, end): flat arrays indexed by days since
+        ``first``, holding how many events start that day and the hours their timed ones book.
+
+        The store buckets the plain rows with one GROUP BY; only locally expanded series are
+        walked here, one occurrence at a time.
+        """
+        days = (end - first).days
+        counts = array("l", bytes(days * array("l").itemsize))
+        hours = array("d", bytes(days * array("d").itemsize))
+        for day, (n, seconds) in self.store.day_totals(calendar_ids, first.isoformat(), end.isoformat()).items():
+            i = (datetime.date.fromisoformat(day) - first).days
+            counts[i] = n
+            hours[i] = seconds / 3600
+        if not self.expand_recurrence:
+            return counts, hours
+        start_ts, end_ts = local_midnight_ts(first), local_midnight_ts(end)
+        for master in self.store.series_between(calendar_ids, start_ts, end_ts):
+            overridden = self.store.recurrence_overrides(master["_calendar"], master["id"])
+            try:
+                for start, finish in Series(master).occurrences(start_ts, end_ts, overridden):
+                    timed = isinstance(start, datetime.datetime)
+                    i = ((start.date() if timed else start) - first).days
+                    if 0 <= i < days:
+                        counts[i] += 1
+                        if timed:
+                            hours[i] += min((finish - start).total_seconds(), 86400) / 3600
+            except (UnsupportedRule, KeyError, ValueError):
+                continue
+        return counts, hours
+
+    def reminders_between(self, calendar_ids, start_ts, end_ts):
+        """``(key, summary, start_ts, minutes)`` of every event starting in [start_ts, end_ts) that
+        asks for popup reminders, queued writes included.
+        """
+        defaults = self.store.default_reminders()
+        found = []
+        for row_start, _, _, event in self.busy_rows(calendar_ids, start_ts, end_ts):
+            if row_start < start_ts:
+                continue
+            minutes = popup_minutes(event, defaults.get(event["_calendar"], ()))
+            if minutes:
+                found.append(((event["_calendar"], event.get("id")), event.get("summary") or "", row_start, minutes))
+        return found
+
+    # -- availability ------------------------------------------------------
+
+    def busy_rows(self, calendar_ids, start_ts, end_ts):
+        """Stored rows overlapping [start_ts, end_ts), with queued writes applied."""
+        rows, _ = self.store.rows_between(calendar_ids, start_ts, end_ts)
+        rows = list(self.expand_rows(rows, start_ts, end_ts))
+        return overlay_pending(rows, self.outbox.pending(calendar_ids), start_ts, end_ts, self.stored_event)
+
+    def availability_calendars(self, shown_ids):
+        """Calendars whose busy time counts (the shown ones and the user's own hidden ones),
+        split into ``(local_ids, remote_ids)``: those with a local copy to check against and
+        those only the freebusy API can answer for.
+        """
+        local, remote = [], []
+        for cal in self.store.calendars() or [{"id": cal_id, "access_role": None} for cal_id in shown_ids]:
+            if cal["id"] in shown_ids or cal["access_role"] == "owner":
+                (local if self.store.get_sync_token(cal["id"]) is not None else remote).append(cal["id"])
+        return local, remote
+
+    def fetch_free_busy(self, calendar_ids, first, end):
+        """``{calendar_id: [(start_ts, end_ts)]}`` over the local days [first, end), from the
+        freebusy API: only busy intervals travel, never event details.
+        """
+        body = {
+            "timeMin": to_local_rfc3339(datetime.datetime(first.year, first.month, first.day)),
+            "timeMax": to_local_rfc3339(datetime.datetime(end.year, end.month, end.day)),
+        }
+        groups = [calendar_ids[i:i + FREE_BUSY_GROUP_SIZE]
+                  for i in range(0, len(calendar_ids), FREE_BUSY_GROUP_SIZE)]
+        requests = {
+            i: self.service.freebusy().query(body=dict(body, items=[{"id": cal_id} for cal_id in group]))
+            for i, group in enumerate(groups)
+        }
+        if len(requests) == 1:
+            responses = [self.execute(requests[0], "freebusy.query")]
+        else:
+            responses = []
+            for response, error in self.execute_batch(requests, site="batch/freebusy").values():
+                if error is not None:
+                    raise error
+                responses.append(response)
+        busy = {}
+        for response in responses:
+            for cal_id, info in response.get("calendars", {}).items():
+                if info.get("errors"):
+                    continue
+                busy[cal_id] = [(_rfc3339_ts(b["start"]), _rfc3339_ts(b["end"])) for b in info.get("busy", [])]
+        return busy
+
+    # -- syncing -----------------------------------------------------------
+
+    def sync_calendar(self, calendar_id, holiday_years=(), report=None, changes=None):
+        """Bring one calendar up to date and return how many stored rows changed.
+
+        ``report(changed_so_far)`` is called between pages of a multi-page sync. ``changes``, if
+        given, is a list that collects the items of an incremental sync; a full sync, which also
+        drops events without any item for them, appends None instead.
+        """
+        token = self.store.get_sync_token(calendar_id)
+        try:
+            return self._run_sync(calendar_id, token, holiday_years, report, changes)
+        except HttpError as e:
+            # 410 Gone: the sync token expired server-side, start over with a full sync
+            if token is None or e.resp.status != 410:
+                raise
+            return self._run_sync(calendar_id, None, report=report, changes=changes)
+
+    def _run_sync(self, calendar_id, token, holiday_years=(), report=None, changes=None):
+        sync_gen = None
+        params = {"calendarId": calendar_id, "singleEvents": not self.expand_recurrence,
+                  "fields": page_fields(SERIES_EVENT_FIELDS if self.expand_recurrence else LIST_EVENT_FIELDS)}
+        if token is None:
+            sync_gen = self.store.begin_full_sync(calendar_id)
+        else:
+            params["syncToken"] = token
+
+        def execute_with_holidays(request):
+            # Ride the holiday lookups along with the first page: one round trip for all of them
+            requests = self.holiday_requests_for(holiday_years)
+            requests[("events", calendar_id)] = request
+            results = self.execute_batch(requests, site="batch/sync")
+            self.store_holiday_results(results)
+            response, exception = results[("events", calendar_id)]
+            if exception is not None:
+                raise exception
+            return response
+
+        changed = 0
+        page = None
+        for page in self.iter_event_pages(
+                execute_first=execute_with_holidays if holiday_years else None, site="events.list/sync", **params):
+            items = page.get("items", [])
+            page_changed = self.store.apply_changes(calendar_id, items, sync_gen, overrides=self.expand_recurrence)
+            if self.expand_recurrence:
+                page_changed += self._sync_unexpandable(calendar_id, items, sync_gen)
+            changed += page_changed
+            if changes is not None and sync_gen is None:
+                changes.extend(items)
+            if page_changed and report is not None and page.get("nextPageToken"):
+                # Let the caller show partial results while the remaining pages are still downloading
+                report(changed)
+        if sync_gen is not None:
+            self.store.finish_full_sync(calendar_id, sync_gen)
+            if changes is not None:
+                changes.append(None)
+        self.store.set_sync_token(calendar_id, page.get("nextSyncToken"))
+        return changed
+
+    def _sync_unexpandable(self, calendar_id, items, sync_gen):
+        """Series whose rules the local expander does not handle are stored as server-expanded
+        instances instead, refetched whenever the master changes.
+        """
+        changed = 0
+        for master in items:
+            if "recurrence" not in master or master.get("status") == "cancelled" or event_row(master) is not None:
+                continue
+            self.store.delete_series_instances(calendar_id, master["id"])
+            params = {"calendarId": calendar_id, "eventId": master["id"], "maxResults": PAGE_SIZE,
+                      "fields": "nextPageToken,items(" + LIST_EVENT_FIELDS + ")"}
+            while True:
+                page = self.execute(self.service.events().instances(**params), "events.instances")
+                changed += self.store.apply_changes(calendar_id, page.get("items", []), sync_gen)
+                if not page.get("nextPageToken"):
+                    break
+                params["pageToken"] = page["nextPageToken"]
+        return changed
+
+    def fetch_calendar_list(self):
+        """``(calendars, etag)``, or None when the list has not changed since the stored ETag."""
+        calendars = []
+        page_token = None
+        etag = None
+        while True:
+            request = self.service.calendarList().list(
+                pageToken=page_token,
+                fields="etag,nextPageToken,"
+                       "items(id,summary,backgroundColor,accessRole,primary,selected,defaultReminders)"
+            )
+            if page_token is None:
+                known = self.store.calendar_list_etag()
+                if known:
+                    request.headers["If-None-Match"] = known
+            try:
+                result = self.execute(request, "calendarList.list")
+            except HttpError as e:
+                if e.resp.status == 304:
+                    return None
+                raise
+            if page_token is None:
+                etag = result.get("etag")
+            for cal in result.get("items", []):
+                if cal["id"] in HOLIDAY_CALENDAR_IDS or "#holiday@" in cal["id"]:
+                    # Holidays are drawn separately; a subscribed copy would show them twice
+                    continue
+                if cal.get("primary"):
+                    # Keep the alias the rest of the app (and the store) already uses
+                    cal = dict(cal, id="primary")
+                calendars.append(cal)
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return calendars, etag
+
+    def refresh_calendar_list(self):
+        """Fetch and store the calendar list; returns the ids of newly added, selected calendars."""
+        result = self.fetch_calendar_list()
+        if result is None:
+            return []
+        return self.store.save_calendars(*result)
+
+    # -- holidays ----------------------------------------------------------
+
+    @staticmethod
+    def year_bounds(year):
+        return {
+            "timeMin": to_local_rfc3339(datetime.datetime(year, 1, 1)),
+            "timeMax": to_local_rfc3339(datetime.datetime(year + 1, 1, 1)),
+            "singleEvents": True,
+            "orderBy": "startTime",
+            "fields": page_fields(HOLIDAY_EVENT_FIELDS),
+        }
+
+    def holiday_requests_for(self, years):
+        # Once one of the candidate IDs has worked we never ask the others again
+        resolved = self.store.get_setting("holiday_calendar_id")
+        cal_ids = [resolved] if resolved else HOLIDAY_CALENDAR_IDS
+        requests = {}
+        for year in years:
+            for cal_id in cal_ids:
+                requests[("holiday", cal_id, year)] = self.service.events().list(
+                    calendarId=cal_id, maxResults=PAGE_SIZE, **self.year_bounds(year))
+        return requests
+
+    def fetch_holidays(self, years):
+        self.store_holiday_results(self.execute_batch(self.holiday_requests_for(years), site="batch/holidays"))
+
+    def store_holiday_results(self, results):
+        resolved = self.store.get_setting("holiday_calendar_id")
+        for cal_id in ([resolved] if resolved else HOLIDAY_CALENDAR_IDS):
+            answered = [
+                (key[2], response) for key, (response, exception) in results.items()
+                if key[0] == "holiday" and key[1] == cal_id and exception is None
+            ]
+            if not answered:
+                continue
+            for year, response in answered:
+                holidays = []
+                for page in self.iter_event_pages(
+                        first_page=response, site="events.list/holidays", calendarId=cal_id, **self.year_bounds(year)):
+                    for ev in page.get("items", []):
+                        date_part = start_date(ev)
+                        if date_part:
+                            holidays.append((date_part, ev.get("summary", "Sărbătoare")))
+                self.store.save_holidays(cal_id, year, holidays)
+            if not resolved:
+                self.store.set_setting("holiday_calendar_id", cal_id)
+            return
+        if resolved:
+            errors = [exc for key, (_, exc) in results.items() if key[0] == "holiday"]
+            if any(isinstance(exc, HttpError) and exc.resp.status == 404 for exc in errors):
+                # The calendar we settled on disappeared, go back to probing the candidates
+                self.store.set_setting("holiday_calendar_id", None)
+
+    def holidays_for_year(self, year):
+        """Cached ``(date, summary)`` holidays of ``year``, or None if that year was never fetched."""
+        cal_id = self.store.get_setting("holiday_calendar_id")
+        return self.store.holidays_for_year(cal_id, year) if cal_id else None
+
+    # -- writes ------------------------------------------------------------
+
+    def outbox_request(self, op):
+        events = self.service.events()
+        if op["kind"] == "insert":
+            return events.insert(calendarId=op["calendar_id"], body=op["body"])
+        if op["kind"] == "patch":
+            return events.patch(calendarId=op["calendar_id"], eventId=op["event_id"], body=op["body"])
+        return events.delete(calendarId=op["calendar_id"], eventId=op["event_id"])
+
+    def send_outbox_batch(self, ops):
+        """Send queued operations and return ``{op_id: (response, exception)}``."""
+        if len(ops) == 1:
+            op = ops[0]
+            try:
+                return {op["op_id"]: (self.execute(self.outbox_request(op), f"outbox/{op['kind']}"), None)}
+            except HttpError as e:
+                return {op["op_id"]: (None, e)}
+        # Independent writes (one per event) share a single HTTP round trip
+        return self.execute_batch({op["op_id"]: self.outbox_request(op) for op in ops}, site="batch/outbox")
+
+    def confirm_write(self, op, saved):
+        """Record a write the server accepted; returns False if a sync is needed to learn the result."""
+        calendar_id, event_id = op["calendar_id"], op["event_id"]
+        if op["kind"] == "delete":
+            gone = {"id": event_id, "status": "cancelled"}
+            instance = self.stored_event(calendar_id, event_id) if self.expand_recurrence else None
+            if instance is not None and instance.get("recurringEventId"):
+                # Keep the expansion from bringing the occurrence back
+                gone.update(recurringEventId=instance["recurringEventId"],
+                            originalStartTime=instance["originalStartTime"])
+            self.store.apply_changes(calendar_id, [gone], overrides=self.expand_recurrence)
+            return True
+        if not isinstance(saved, dict):
+            # 409 on a retried insert: the event is on the server, a sync will bring it in
+            return False
+        self.store.apply_changes(calendar_id, [saved], overrides=self.expand_recurrence)
+        return True
@@ -0,0 +1,63 @@
+import datetime
+import sys
+
+from event_store import event_row
+
+
+class EventRecord:
+    """One event as the views and the month cache hold it, instead of the API's nested dict.
+
+    Times are parsed once into epoch seconds, calendar and colour ids are interned (a handful of
+    distinct values shared by every event) and the description is only filled in when something
+    asks for it, except for local edits the store does not have yet.
+    """
+
+    __slots__ = ("calendar", "id", "summary", "color_id", "start_ts", "end_ts", "all_day", "pending",
+                 "description")
+
+    def __init__(self, calendar, event_id, summary, color_id, start_ts, end_ts, all_day,
+                 pending=False, description=None):
+        self.calendar = sys.intern(calendar)
+        self.id = event_id
+        self.summary = summary
+        self.color_id = sys.intern(color_id) if color_id else None
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.all_day = all_day
+        self.pending = pending
+        # None until loaded; "" when there is none
+        self.description = description
+
+    @classmethod
+    def from_event(cls, event, row=None):
+        """Record of an API event dict tagged with ``"_calendar"``, or None if its times do not parse.
+
+        ``row`` is the event's store row, when the caller has already parsed it.
+        """
+        row = row or event_row(event)
+        if row is None:
+            return None
+        pending = bool(event.get("_pending"))
+        color_id = event.get("colorId")
+        return cls(
+            event.get("_calendar", "primary"), event.get("id"), event.get("summary") or "",
+            str(color_id) if color_id else None, row[0], row[1], "date" in event.get("start", {}),
+            pending, (event.get("description") or "") if pending else None,
+        )
+
+    @property
+    def key(self):
+        """Same as ``event_key`` of the dict: ids are only unique within a calendar."""
+        return self.calendar, self.id
+
+    @property
+    def start_day(self):
+        """Local date the event starts on."""
+        return datetime.date.fromtimestamp(self.start_ts)
+
+    def nbytes(self):
+        """Rough memory held by this record, for the month cache's budget."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.id) + sys.getsizeof(self.summary)
+        if self.description:
+            size += sys.getsizeof(self.description)
+        return size
@@ -0,0 +1,532 @@
+import datetime
+import json
+import re
+import sqlite3
+import threading
+
+from recurrence import Series, UnsupportedRule, original_key
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    sync_gen INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (calendar_id, start_date);
+CREATE INDEX IF NOT EXISTS events_by_time ON events (calendar_id, start_ts, end_ts);
+-- Only the all-day events and series masters, so bulk counts can set them apart without
+-- reading every row's JSON; queries must repeat the WHERE verbatim (NOT_TIMED) to use it
+CREATE INDEX IF NOT EXISTS events_not_timed ON events (calendar_id, start_date)
+    WHERE (json_type(data, '$.recurrence') IS NOT NULL OR json_type(data, '$.start.date') IS NOT NULL);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    sync_gen INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS holidays (
+    calendar_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS holidays_by_year ON holidays (calendar_id, year);
+CREATE TABLE IF NOT EXISTS holiday_years (
+    calendar_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    PRIMARY KEY (calendar_id, year)
+);
+CREATE TABLE IF NOT EXISTS calendars (
+    calendar_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    color TEXT,
+    access_role TEXT,
+    selected INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS recurrence_overrides (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    series_id TEXT NOT NULL,
+    original_key TEXT NOT NULL,
+    sync_gen INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS overrides_by_series ON recurrence_overrides (calendar_id, series_id);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+-- Popup minutes of each calendar's default reminders, as a JSON list
+CREATE TABLE IF NOT EXISTS default_reminders (
+    calendar_id TEXT PRIMARY KEY,
+    minutes TEXT NOT NULL
+);
+-- Lists stored before the defaults were asked for are fetched again in full once
+DELETE FROM settings WHERE key = 'calendar_list_etag' AND NOT EXISTS (SELECT 1 FROM default_reminders);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    summary, description, location,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Stores created before the index existed get it filled once
+INSERT INTO events_fts (rowid, summary, description, location)
+    SELECT rowid, json_extract(data, '$.summary'), json_extract(data, '$.description'),
+           json_extract(data, '$.location')
+    FROM events WHERE NOT EXISTS (SELECT 1 FROM events_fts);
+CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, summary, description, location) VALUES (
+        new.rowid, json_extract(new.data, '$.summary'), json_extract(new.data, '$.description'),
+        json_extract(new.data, '$.location'));
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+    DELETE FROM events_fts WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF data ON events BEGIN
+    UPDATE events_fts SET summary = json_extract(new.data, '$.summary'),
+        description = json_extract(new.data, '$.description'),
+        location = json_extract(new.data, '$.location')
+    WHERE rowid = new.rowid;
+END;
+"""
+
+SEARCH_LIMIT = 100
+NOT_TIMED = "(json_type(data, '$.recurrence') IS NOT NULL OR json_type(data, '$.start.date') IS NOT NULL)"
+
+
+def event_start_str(event):
+    return event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
+
+
+def event_end_str(event):
+    return event.get("end", {}).get("dateTime") or event.get("end", {}).get("date")
+
+
+def to_timestamp(value):
+    # All-day events carry a plain date, which is local midnight
+    if "T" not in value:
+        d = datetime.date.fromisoformat(value)
+        return int(datetime.datetime(d.year, d.month, d.day).timestamp())
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return int(datetime.datetime.fromisoformat(value).timestamp())
+
+
+def event_key(event):
+    """Event ids are only unique within a calendar; the same invite can sit in several."""
+    return event.get("_calendar", "primary"), event.get("id")
+
+
+def event_row(event):
+    """``(start_ts, end_ts, start_date, event)`` as held by the store, or None if unparsable.
+
+    A recurring event's master spans its whole series, from the first start to the last end.
+    """
+    if "recurrence" in event:
+        try:
+            start_ts, end_ts = Series(event).span()
+        except (UnsupportedRule, KeyError, TypeError, ValueError):
+            return None
+        return start_ts, end_ts, event_start_str(event).split("T")[0], event
+    start_str = event_start_str(event)
+    end_str = event_end_str(event) or start_str
+    try:
+        return to_timestamp(start_str), to_timestamp(end_str), start_str.split("T")[0], event
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ThreadLocalDatabase:
+    schema = ""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared between threads, so every thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._local.conn = conn
+        return conn
+
+
+class EventStore(ThreadLocalDatabase):
+    """SQLite copy of the synced calendars, kept current with syncToken deltas."""
+
+    schema = SCHEMA
+
+    def get_event(self, calendar_id, event_id):
+        row = self._conn().execute(
+            "SELECT data FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_sync_token(self, calendar_id):
+        row = self._conn().execute(
+            "SELECT sync_token FROM sync_state WHERE calendar_id = ?", (calendar_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_sync_token(self, calendar_id, token):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (calendar_id, sync_token) VALUES (?, ?) "
+                "ON CONFLICT(calendar_id) DO UPDATE SET sync_token = excluded.sync_token",
+                (calendar_id, token),
+            )
+
+    def begin_full_sync(self, calendar_id):
+        """Start a full resync and return the generation number its rows are tagged with."""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (calendar_id, sync_token, sync_gen) VALUES (?, NULL, 1) "
+                "ON CONFLICT(calendar_id) DO UPDATE SET sync_token = NULL, sync_gen = sync_gen + 1",
+                (calendar_id,),
+            )
+            row = conn.execute(
+                "SELECT sync_gen FROM sync_state WHERE calendar_id = ?", (calendar_id,)
+            ).fetchone()
+        return row[0]
+
+    def finish_full_sync(self, calendar_id, sync_gen):
+        # Anything not seen during the full listing was deleted while we were not looking
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE calendar_id = ? AND sync_gen != ?",
+                (calendar_id, sync_gen),
+            )
+            conn.execute(
+                "DELETE FROM recurrence_overrides WHERE calendar_id = ? AND sync_gen != ?",
+                (calendar_id, sync_gen),
+            )
+
+    def apply_changes(self, calendar_id, items, sync_gen=None, overrides=False):
+        """Upsert or delete the given API items and return how many rows changed.
+
+        With ``overrides`` (series stored as masters and expanded locally), instances that come
+        on their own, modified or cancelled, are also recorded against their series so the
+        expansion skips those occurrences.
+        """
+        changed = 0
+        with self._conn() as conn:
+            for ev in items:
+                event_id = ev.get("id")
+                if not event_id:
+                    continue
+                if overrides and ev.get("recurringEventId") and ev.get("originalStartTime"):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO recurrence_overrides "
+                        "(calendar_id, event_id, series_id, original_key, sync_gen) VALUES (?, ?, ?, ?, ?)",
+                        (calendar_id, event_id, ev["recurringEventId"], original_key(ev["originalStartTime"]),
+                         sync_gen or 0),
+                    )
+                if ev.get("status") == "cancelled":
+                    cur = conn.execute(
+                        "DELETE FROM events WHERE calendar_id = ? AND event_id = ?",
+                        (calendar_id, event_id),
+                    )
+                    changed += cur.rowcount
+                    if overrides and not ev.get("recurringEventId"):
+                        # Possibly a whole series: its exceptions go with it
+                        cur = conn.execute(
+                            "DELETE FROM events WHERE calendar_id = ? AND json_extract(data, '$.recurringEventId') = ?",
+                            (calendar_id, event_id),
+                        )
+                        changed += cur.rowcount
+                        conn.execute(
+                            "DELETE FROM recurrence_overrides WHERE calendar_id = ? AND series_id = ?",
+                            (calendar_id, event_id),
+                        )
+                    continue
+                row = event_row(ev)
+                if row is None:
+                    continue
+                start_ts, end_ts, start_date, _ = row
+                # An upsert rather than INSERT OR REPLACE, so the row keeps its rowid and
+                # the search index triggers see an update instead of a silent delete
+                conn.execute(
+                    "INSERT INTO events "
+                    "(calendar_id, event_id, start_date, start_ts, end_ts, sync_gen, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(calendar_id, event_id) DO UPDATE SET start_date = excluded.start_date, "
+                    "start_ts = excluded.start_ts, end_ts = excluded.end_ts, sync_gen = excluded.sync_gen, "
+                    "data = excluded.data",
+                    (calendar_id, event_id, start_date, start_ts, end_ts,
+                     sync_gen or 0, json.dumps(ev)),
+                )
+                changed += 1
+        return changed
+
+    def events_between(self, calendar_id, start_ts, end_ts):
+        """Events overlapping [start_ts, end_ts), ordered by start time like the API's orderBy=startTime."""
+        rows = self._conn().execute(
+            "SELECT data FROM events WHERE calendar_id = ? AND start_ts < ? AND end_ts > ? "
+            "ORDER BY start_ts, event_id",
+            (calendar_id, end_ts, start_ts),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def rows_between(self, calendar_ids, start_ts, end_ts):
+        """Rows ``(start_ts, end_ts, start_date, event)`` of all given calendars overlapping
+        [start_ts, end_ts), merged in start order, plus the payload size.
+
+        Every event is tagged with ``"_calendar"`` so callers know where it came from.
+        """
+        if not calendar_ids:
+            return [], 0
+        marks = ",".join("?" * len(calendar_ids))
+        rows = self._conn().execute(
+            "SELECT calendar_id, start_ts, end_ts, start_date, data FROM events "
+            f"WHERE calendar_id IN ({marks}) AND start_ts < ? AND end_ts > ? "
+            "ORDER BY start_ts, calendar_id, event_id",
+            (*calendar_ids, end_ts, start_ts),
+        ).fetchall()
+        nbytes = sum(len(r[4]) for r in rows)
+        result = []
+        for calendar_id, start, end, start_date, data in rows:
+            event = json.loads(data)
+            event["_calendar"] = calendar_id
+            result.append((start, end, start_date, event))
+        return result, nbytes
+
+    def iter_rows_between(self, calendar_ids, start_ts, end_ts):
+        """Like ``rows_between``, but yields rows one at a time straight off the cursor,
+        so memory stays flat however long the range is.
+        """
+        if not calendar_ids:
+            return
+        marks = ",".join("?" * len(calendar_ids))
+        cursor = self._conn().execute(
+            "SELECT calendar_id, start_ts, end_ts, start_date, data FROM events "
+            f"WHERE calendar_id IN ({marks}) AND start_ts < ? AND end_ts > ? "
+            "ORDER BY start_ts, calendar_id, event_id",
+            (*calendar_ids, end_ts, start_ts),
+        )
+        for calendar_id, start, end, start_date, data in cursor:
+            event = json.loads(data)
+            event["_calendar"] = calendar_id
+            yield start, end, start_date, event
+
+    def day_totals(self, calendar_ids, first_date, end_date):
+        """``{start_date: [events, timed_seconds]}`` for every day in [first_date, end_date) on
+        which events of ``calendar_ids`` start, dates as YYYY-MM-DD, grouped by SQLite itself.
+
+        Timed events count at most a day each towards the seconds; all-day events count none.
+        Series masters are left out: their instances are the caller's to add.
+        """
+        if not calendar_ids:
+            return {}
+        marks = ",".join("?" * len(calendar_ids))
+        params = (*calendar_ids, first_date, end_date)
+        where = f"WHERE calendar_id IN ({marks}) AND start_date >= ? AND start_date < ?"
+        conn = self._conn()
+        totals = {
+            day: [n, seconds] for day, n, seconds in conn.execute(
+                f"SELECT start_date, COUNT(*), TOTAL(MIN(end_ts - start_ts, 86400)) FROM events {where} "
+                "GROUP BY start_date", params)
+        }
+        # Take the few all-day rows and masters back out, through their own index
+        for day, series, seconds in conn.execute(
+                "SELECT start_date, TOTAL(json_type(data, '$.recurrence') IS NOT NULL), "
+                f"TOTAL(MIN(end_ts - start_ts, 86400)) FROM events {where} AND {NOT_TIMED} GROUP BY start_date",
+                params):
+            totals[day][0] -= int(series)
+            totals[day][1] -= seconds
+        return totals
+
+    def series_between(self, calendar_ids, start_ts, end_ts):
+        """Series masters of ``calendar_ids`` whose span overlaps [start_ts, end_ts), tagged with ``"_calendar"``."""
+        if not calendar_ids:
+            return []
+        marks = ",".join("?" * len(calendar_ids))
+        rows = self._conn().execute(
+            # Left to itself the planner walks events_by_time, through every timed row
+            "SELECT calendar_id, data FROM events INDEXED BY events_not_timed "
+            f"WHERE calendar_id IN ({marks}) AND start_ts < ? AND end_ts > ? "
+            f"AND {NOT_TIMED} AND json_type(data, '$.recurrence') IS NOT NULL",
+            (*calendar_ids, end_ts, start_ts),
+        ).fetchall()
+        result = []
+        for calendar_id, data in rows:
+            event = json.loads(data)
+            event["_calendar"] = calendar_id
+            result.append(event)
+        return result
+
+    def search(self, calendar_ids, text, limit=SEARCH_LIMIT):
+        """Events of ``calendar_ids`` whose summary, description or location match every word
+        of ``text`` (as a prefix, ignoring case and diacritics), best matches first.
+        """
+        words = re.findall(r"\w+", text)
+        if not words or not calendar_ids:
+            return []
+        query = " ".join(f'"{word}"*' for word in words)
+        marks = ",".join("?" * len(calendar_ids))
+        rows = self._conn().execute(
+            "SELECT e.calendar_id, e.data FROM events_fts JOIN events e ON e.rowid = events_fts.rowid "
+            f"WHERE events_fts MATCH ? AND e.calendar_id IN ({marks}) "
+            "ORDER BY bm25(events_fts, 10.0, 1.0, 3.0), e.start_ts DESC LIMIT ?",
+            (query, *calendar_ids, limit),
+        ).fetchall()
+        result = []
+        for calendar_id, data in rows:
+            event = json.loads(data)
+            event["_calendar"] = calendar_id
+            result.append(event)
+        return result
+
+    def recurrence_overrides(self, calendar_id, series_id):
+        """Original-start keys of the series' occurrences that are stored (or cancelled) on their own."""
+        rows = self._conn().execute(
+            "SELECT original_key FROM recurrence_overrides WHERE calendar_id = ? AND series_id = ?",
+            (calendar_id, series_id),
+        )
+        return frozenset(r[0] for r in rows)
+
+    def delete_series_instances(self, calendar_id, series_id):
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE calendar_id = ? AND json_extract(data, '$.recurringEventId') = ?",
+                (calendar_id, series_id),
+            )
+
+    def reset_sync_tokens(self):
+        # The next sync of every calendar is a full one
+        with self._conn() as conn:
+            conn.execute("UPDATE sync_state SET sync_token = NULL")
+
+    def ical_uids(self, calendar_id):
+        """iCalUIDs of the calendar's stored events, for skipping duplicates on import."""
+        rows = self._conn().execute(
+            "SELECT json_extract(data, '$.iCalUID') FROM events WHERE calendar_id = ?", (calendar_id,)
+        )
+        return {r[0] for r in rows if r[0]}
+
+    def events_starting_between(self, calendar_id, first_date, end_date):
+        """Events whose start date falls in [first_date, end_date), dates given as YYYY-MM-DD."""
+        rows = self._conn().execute(
+            "SELECT data FROM events WHERE calendar_id = ? AND start_date >= ? AND start_date < ? "
+            "ORDER BY start_ts, event_id",
+            (calendar_id, first_date, end_date),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def save_calendars(self, calendars, etag=None):
+        """Replace the calendar list with ``calendars`` (dicts from calendarList) and return the ids
+        that are new and selected. Known calendars keep the user's own show/hide choice.
+
+        ``etag`` is the list's ETag, kept for conditional refreshes.
+        """
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('calendar_list_etag', ?)", (etag,))
+            known = {r[0] for r in conn.execute("SELECT calendar_id FROM calendars")}
+            added = []
+            for position, cal in enumerate(calendars):
+                cal_id = cal["id"]
+                popups = [r["minutes"] for r in cal.get("defaultReminders", []) if r.get("method") == "popup"]
+                conn.execute(
+                    "INSERT OR REPLACE INTO default_reminders (calendar_id, minutes) VALUES (?, ?)",
+                    (cal_id, json.dumps(popups)),
+                )
+                if cal_id in known:
+                    conn.execute(
+                        "UPDATE calendars SET summary = ?, color = ?, access_role = ?, position = ? "
+                        "WHERE calendar_id = ?",
+                        (cal.get("summary", cal_id), cal.get("backgroundColor"), cal.get("accessRole"),
+                         position, cal_id),
+                    )
+                    continue
+                selected = bool(cal.get("selected") or cal_id == "primary")
+                conn.execute(
+                    "INSERT INTO calendars (calendar_id, summary, color, access_role, selected, position) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cal_id, cal.get("summary", cal_id), cal.get("backgroundColor"), cal.get("accessRole"),
+                     int(selected), position),
+                )
+                if selected:
+                    added.append(cal_id)
+            gone = known - {cal["id"] for cal in calendars}
+            for cal_id in gone:
+                conn.execute("DELETE FROM calendars WHERE calendar_id = ?", (cal_id,))
+                conn.execute("DELETE FROM default_reminders WHERE calendar_id = ?", (cal_id,))
+                conn.execute("DELETE FROM events WHERE calendar_id = ?", (cal_id,))
+                conn.execute("DELETE FROM recurrence_overrides WHERE calendar_id = ?", (cal_id,))
+                conn.execute("DELETE FROM sync_state WHERE calendar_id = ?", (cal_id,))
+        return added
+
+    def calendar_list_etag(self):
+        return self.get_setting("calendar_list_etag")
+
+    def calendars(self):
+        """``[{"id", "summary", "color", "access_role", "selected"}]`` in calendarList order."""
+        rows = self._conn().execute(
+            "SELECT calendar_id, summary, color, access_role, selected FROM calendars ORDER BY position"
+        ).fetchall()
+        return [
+            {"id": r[0], "summary": r[1], "color": r[2], "access_role": r[3], "selected": bool(r[4])}
+            for r in rows
+        ]
+
+    def default_reminders(self):
+        """``{calendar_id: [minutes]}`` of the calendars' default popup reminders."""
+        rows = self._conn().execute("SELECT calendar_id, minutes FROM default_reminders").fetchall()
+        return {cal_id: json.loads(minutes) for cal_id, minutes in rows}
+
+    def set_calendar_selected(self, calendar_id, selected):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE calendars SET selected = ? WHERE calendar_id = ?", (int(selected), calendar_id)
+            )
+
+    def get_setting(self, key):
+        row = self._conn().execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key, value):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    def save_holidays(self, calendar_id, year, holidays):
+        """Replace the cached ``(date, summary)`` holidays of one calendar for one year."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM holidays WHERE calendar_id = ? AND year = ?", (calendar_id, year))
+            conn.executemany(
+                "INSERT INTO holidays (calendar_id, year, date, summary) VALUES (?, ?, ?, ?)",
+                [(calendar_id, year, date, summary) for date, summary in holidays],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO holiday_years (calendar_id, year) VALUES (?, ?)",
+                (calendar_id, year),
+            )
+
+    def holidays_for_year(self, calendar_id, year):
+        """Cached ``(date, summary)`` pairs, or None if that year was never fetched."""
+        conn = self._conn()
+        if conn.execute(
+            "SELECT 1 FROM holiday_years WHERE calendar_id = ? AND year = ?", (calendar_id, year)
+        ).fetchone() is None:
+            return None
+        return conn.execute(
+            "SELECT date, summary FROM holidays WHERE calendar_id = ? AND year = ? ORDER BY date",
+            (calendar_id, year),
+        ).fetchall()
+
+    def clear(self):
+        # Holidays are public data and survive a logout; only the account's events go
+        with self._conn() as conn:
+            conn.execute("DELETE FROM events")
+            conn.execute("DELETE FROM sync_state")
+            conn.execute("DELETE FROM recurrence_overrides")
+            conn.execute("DELETE FROM calendars")
+            conn.execute("DELETE FROM default_reminders")
+            conn.execute("DELETE FROM settings WHERE key = 'calendar_list_etag'")
@@ -0,0 +1,521 @@
+import copy
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+from zoneinfo import ZoneInfo
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+DEFAULT_PAGE_SIZE = 250
+MAX_PAGE_SIZE = 2500
+HOLIDAY_CALENDAR_ID = "ro.romanian#holiday@group.v.calendar.google.com"
+
+TITLES = ("Standup", "1:1", "Review", "Planning", "Lunch", "Dentist", "Gym", "Call", "Workshop", "Demo")
+LOCATIONS = ("", "", "Room 1", "Room 2", "Online", "Office")
+CALENDAR_COLORS = ("#9fe1e7", "#f83a22", "#16a765", "#fad165", "#9a9cff", "#b99aff")
+
+
+def _rfc3339(dt):
+    return dt.astimezone().isoformat()
+
+
+def _parse_time(value):
+    if "T" not in value:
+        d = datetime.date.fromisoformat(value)
+        return datetime.datetime(d.year, d.month, d.day).astimezone()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.datetime.fromisoformat(value).astimezone()
+
+
+def _event_bounds(event):
+    start = event["start"].get("dateTime") or event["start"].get("date")
+    end = event["end"].get("dateTime") or event["end"].get("date")
+    return _parse_time(start), _parse_time(end)
+
+
+def _split_fields(spec):
+    """Split a partial-response spec on top-level commas: ``a,items(b,c)`` -> ``["a", "items(b,c)"]``."""
+    parts, depth, current = [], 0, ""
+    for ch in spec:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (ch == "(") - (ch == ")")
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def project(response, fields):
+    """Apply a ``fields=`` partial-response spec, as the real API does (one level of nesting)."""
+    if not fields:
+        return response
+    result = {}
+    for part in _split_fields(fields):
+        if "(" in part:
+            name, inner = part[:-1].split("(", 1)
+            keys = _split_fields(inner)
+            if name in response:
+                result[name] = [{k: item[k] for k in keys if k in item} for item in response[name]]
+        elif part in response:
+            result[part] = response[part]
+    return result
+
+
+def generate_events(count, first_day, days, seed=0, prefix="ev", all_day_fraction=0.1):
+    """``count`` single events spread over ``days`` days from ``first_day``."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        day = first_day + datetime.timedelta(days=rng.randrange(days))
+        event = {
+            "id": f"{prefix}{i}",
+            "iCalUID": f"{prefix}{i}@fake",
+            "status": "confirmed",
+            "summary": f"{rng.choice(TITLES)} {i}",
+            "description": f"Notes for {prefix}{i}. " * rng.randint(0, 4),
+            "location": rng.choice(LOCATIONS),
+            "colorId": str(rng.randint(1, 11)),
+        }
+        if rng.random() < all_day_fraction:
+            event["start"] = {"date": day.isoformat()}
+            event["end"] = {"date": (day + datetime.timedelta(days=rng.choice((1, 1, 2)))).isoformat()}
+        else:
+            start = datetime.datetime(day.year, day.month, day.day, rng.randrange(7, 20), rng.choice((0, 15, 30, 45)))
+            end = start + datetime.timedelta(minutes=rng.choice((15, 30, 60, 60, 90, 120)))
+            event["start"] = {"dateTime": _rfc3339(start)}
+            event["end"] = {"dateTime": _rfc3339(end)}
+        events.append(event)
+    return events
+
+
+def generate_series(count, first_day, days, seed=0, prefix="rec"):
+    """``count`` recurring masters (daily or weekly, with COUNT) starting within ``days`` of ``first_day``."""
+    rng = random.Random(seed)
+    series = []
+    for i in range(count):
+        day = first_day + datetime.timedelta(days=rng.randrange(days))
+        start = datetime.datetime(day.year, day.month, day.day, rng.randrange(8, 18), rng.choice((0, 30)))
+        freq, occurrences = rng.choice((("DAILY", 10), ("WEEKLY", 26), ("WEEKLY", 52)))
+        series.append({
+            "id": f"{prefix}{i}",
+            "iCalUID": f"{prefix}{i}@fake",
+            "status": "confirmed",
+            "summary": f"{rng.choice(TITLES)} (recurring) {i}",
+            "colorId": str(rng.randint(1, 11)),
+            "start": {"dateTime": _rfc3339(start), "timeZone": "Europe/Bucharest"},
+            "end": {"dateTime": _rfc3339(start + datetime.timedelta(minutes=30)), "timeZone": "Europe/Bucharest"},
+            "recurrence": [f"RRULE:FREQ={freq};INTERVAL={rng.choice((1, 1, 2))};COUNT={occurrences}"],
+        })
+    return series
+
+
+def expand_series(master):
+    """Instances of a ``generate_series`` master, shaped like ``singleEvents=True`` results."""
+    rule = dict(p.split("=", 1) for p in master["recurrence"][0][len("RRULE:"):].split(";"))
+    step = datetime.timedelta(days=int(rule.get("INTERVAL", 1)) * (7 if rule["FREQ"] == "WEEKLY" else 1))
+    zone = ZoneInfo(master["start"].get("timeZone") or "UTC")
+    start, end = (t.astimezone(zone).replace(tzinfo=None) for t in _event_bounds(master))
+    instances = []
+    for n in range(int(rule["COUNT"])):
+        # Wall-clock steps in the series' zone, so occurrences keep their hour across DST
+        s, e = (start + n * step).replace(tzinfo=zone), (end + n * step).replace(tzinfo=zone)
+        original = s.astimezone(datetime.timezone.utc)
+        instance = {k: v for k, v in master.items() if k != "recurrence"}
+        instance.update({
+            "id": f"{master['id']}_{original:%Y%m%dT%H%M%SZ}",
+            "recurringEventId": master["id"],
+            "originalStartTime": {"dateTime": _rfc3339(s)},
+            "start": {"dateTime": _rfc3339(s)},
+            "end": {"dateTime": _rfc3339(e)},
+        })
+        instances.append(instance)
+    return instances
+
+
+class FakeRequest:
+    """Quacks like ``googleapiclient.http.HttpRequest`` as far as the app is concerned."""
+
+    def __init__(self, service, method_id, fn):
+        self.service = service
+        self.methodId = method_id
+        self.headers = {}
+        self._fn = fn
+
+    def execute(self, http=None, num_retries=0):
+        self.service._round_trip(self.methodId)
+        return self._fn(self)
+
+
+class FakeBatch:
+    def __init__(self, service, callback=None):
+        self.service = service
+        self.callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id if request_id is not None else str(len(self._requests))
+        self._requests.append((request_id, request, callback or self.callback))
+
+    def execute(self, http=None):
+        # One round trip for the whole batch; each part can still fail on its own
+        self.service._round_trip("batch")
+        for request_id, request, callback in self._requests:
+            with self.service._lock:
+                self.service.calls[request.methodId] += 1
+            try:
+                self.service._maybe_fail()
+                response, exception = request._fn(request), None
+            except HttpError as e:
+                response, exception = None, e
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _Events:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, calendarId, **params):
+        return FakeRequest(self.service, "calendar.events.list",
+                           lambda req: self.service._list_events(calendarId, params))
+
+    def get(self, calendarId, eventId, **params):
+        return FakeRequest(self.service, "calendar.events.get",
+                           lambda req: self.service._get_event(calendarId, eventId))
+
+    def insert(self, calendarId, body, **params):
+        return FakeRequest(self.service, "calendar.events.insert",
+                           lambda req: self.service._insert_event(calendarId, body))
+
+    def import_(self, calendarId, body, **params):
+        return FakeRequest(self.service, "calendar.events.import",
+                           lambda req: project(self.service._import_event(calendarId, body), params.get("fields")))
+
+    def instances(self, calendarId, eventId, **params):
+        return FakeRequest(self.service, "calendar.events.instances",
+                           lambda req: self.service._list_instances(calendarId, eventId, params))
+
+    def patch(self, calendarId, eventId, body, **params):
+        return FakeRequest(self.service, "calendar.events.patch",
+                           lambda req: self.service._patch_event(calendarId, eventId, body))
+
+    def delete(self, calendarId, eventId, **params):
+        return FakeRequest(self.service, "calendar.events.delete",
+                           lambda req: self.service._delete_event(calendarId, eventId))
+
+
+class _CalendarList:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **params):
+        return FakeRequest(self.service, "calendar.calendarList.list",
+                           lambda req: self.service._list_calendars(params, req.headers))
+
+
+class _FreeBusy:
+    def __init__(self, service):
+        self.service = service
+
+    def query(self, body, **params):
+        return FakeRequest(self.service, "calendar.freebusy.query",
+                           lambda req: self.service._free_busy(body))
+
+
+class FakeCalendarService:
+    """Offline stand-in for the Calendar v3 service object: in-memory calendars behind the
+    parts of ``events()``, ``calendarList()``, ``freebusy()`` and batch requests the app uses.
+
+    ``latency`` (+ up to ``jitter``) seconds are slept per round trip, ``error_rate`` is the
+    chance that a request fails with a retryable 503, and ``page_size`` caps ``maxResults``.
+    Every stored change bumps a version; sync tokens are versions, so deltas work as in the API.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, page_size=MAX_PAGE_SIZE, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._version = 1
+        self._calendars = {}
+        self._events = {}
+        self._primary = None
+        self._fail_next = []
+
+    @classmethod
+    def with_volume(cls, events, calendars=1, recurring=0, days=365, holidays=True, seed=0, **options):
+        """A service holding ``events`` single events and ``recurring`` series spread over
+        ``calendars`` calendars, ``days`` days centred on today.
+        """
+        service = cls(seed=seed, **options)
+        first_day = datetime.date.today() - datetime.timedelta(days=days // 2)
+        for n in range(calendars):
+            cal_id = "me@example.com" if n == 0 else f"team{n}@example.com"
+            service.add_calendar(cal_id, f"Calendar {n}", primary=(n == 0),
+                                 access_role="owner" if n == 0 else "reader")
+            share = events // calendars + (n < events % calendars)
+            service.add_events(cal_id, generate_events(share, first_day, days, seed=seed + n, prefix=f"c{n}e"))
+            series = recurring // calendars + (n < recurring % calendars)
+            service.add_events(cal_id, generate_series(series, first_day, days, seed=seed + n, prefix=f"c{n}r"))
+        if holidays:
+            service.add_calendar(HOLIDAY_CALENDAR_ID, "Sărbători", access_role="reader", listed=False)
+            today = datetime.date.today()
+            service.add_events(HOLIDAY_CALENDAR_ID, [
+                {"id": f"h{year}{m}", "status": "confirmed", "summary": f"Holiday {m}/{year}",
+                 "start": {"date": datetime.date(year, m, 1).isoformat()},
+                 "end": {"date": datetime.date(year, m, 2).isoformat()}}
+                for year in (today.year - 1, today.year, today.year + 1) for m in (1, 5, 12)
+            ])
+        return service
+
+    def add_calendar(self, calendar_id, summary, primary=False, access_role="owner", listed=True):
+        self._calendars[calendar_id] = {
+            "id": calendar_id, "summary": summary, "accessRole": access_role, "selected": True,
+            "backgroundColor": CALENDAR_COLORS[len(self._calendars) % len(CALENDAR_COLORS)],
+            "primary": primary, "_listed": listed, "defaultReminders": [{"method": "popup", "minutes": 10}],
+        }
+        self._events.setdefault(calendar_id, {})
+        if primary:
+            self._primary = calendar_id
+
+    def add_events(self, calendar_id, events):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            for event in events:
+                self._version += 1
+                store[event["id"]] = (self._version, dict(event, etag=f'"{self._version}"'))
+
+    def fail_next(self, status, times=1, reason="backendError"):
+        """Make the next ``times`` requests fail with ``status``."""
+        self._fail_next.extend([(status, reason)] * times)
+
+    def events(self):
+        return _Events(self)
+
+    def calendarList(self):
+        return _CalendarList(self)
+
+    def freebusy(self):
+        return _FreeBusy(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    # -- transport ---------------------------------------------------------
+
+    def _round_trip(self, method_id):
+        with self._lock:
+            self.calls[method_id] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if method_id != "batch":
+            self._maybe_fail()
+
+    def _maybe_fail(self):
+        with self._lock:
+            if self._fail_next:
+                status, reason = self._fail_next.pop(0)
+            elif self.error_rate and self._rng.random() < self.error_rate:
+                status, reason = 503, "backendError"
+            else:
+                return
+        raise self._error(status, reason)
+
+    @staticmethod
+    def _error(status, reason="notFound"):
+        body = {"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}}
+        return HttpError(httplib2.Response({"status": status}), json.dumps(body).encode())
+
+    def _resolve(self, calendar_id):
+        if calendar_id == "primary" and self._primary is not None:
+            return self._primary
+        if calendar_id not in self._events:
+            raise self._error(404)
+        return calendar_id
+
+    # -- events ------------------------------------------------------------
+
+    def _list_events(self, calendar_id, params):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            single = params.get("singleEvents", False)
+            token = params.get("syncToken")
+            since = 0
+            if token is not None:
+                if not token.startswith("v") or not token[1:].isdigit():
+                    raise self._error(410, "fullSyncRequired")
+                since = int(token[1:])
+            items = []
+            for version, event in store.values():
+                if version <= since:
+                    continue
+                if event.get("status") == "cancelled" and token is None and not params.get("showDeleted"):
+                    continue
+                if single and "recurrence" in event and event.get("status") != "cancelled":
+                    # Occurrences edited or cancelled on their own are stored (and listed) separately
+                    items.extend(ev for ev in expand_series(event) if ev["id"] not in store)
+                else:
+                    items.append(event)
+            if "timeMin" in params or "timeMax" in params:
+                time_min = _parse_time(params["timeMin"]) if "timeMin" in params else None
+                time_max = _parse_time(params["timeMax"]) if "timeMax" in params else None
+                items = [ev for ev in items if "start" in ev and self._overlaps(ev, time_min, time_max)]
+            if params.get("orderBy") == "startTime":
+                items.sort(key=lambda ev: _event_bounds(ev)[0])
+            version = self._version
+        size = min(params.get("maxResults") or DEFAULT_PAGE_SIZE, self.page_size, MAX_PAGE_SIZE)
+        offset = int(params.get("pageToken") or 0)
+        response = {"kind": "calendar#events", "items": copy.deepcopy(items[offset:offset + size])}
+        if offset + size < len(items):
+            response["nextPageToken"] = str(offset + size)
+        else:
+            response["nextSyncToken"] = f"v{version}"
+        return project(response, params.get("fields"))
+
+    @staticmethod
+    def _overlaps(event, time_min, time_max):
+        start, end = _event_bounds(event)
+        return (time_max is None or start < time_max) and (time_min is None or end > time_min)
+
+    def _list_instances(self, calendar_id, event_id, params):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            entry = store.get(event_id)
+            if entry is None or "recurrence" not in entry[1]:
+                raise self._error(404)
+            items = [store[ev["id"]][1] if ev["id"] in store else ev for ev in expand_series(entry[1])]
+            items = [ev for ev in items if ev.get("status") != "cancelled"]
+        return project({"kind": "calendar#events", "items": copy.deepcopy(items)}, params.get("fields"))
+
+    @staticmethod
+    def _instance(store, event_id):
+        """A generated occurrence of a stored series, by its instance id."""
+        entry = store.get(event_id.rsplit("_", 1)[0]) if "_" in event_id else None
+        if entry is None or "recurrence" not in entry[1] or entry[1].get("status") == "cancelled":
+            return None
+        return next((ev for ev in expand_series(entry[1]) if ev["id"] == event_id), None)
+
+    def _get_event(self, calendar_id, event_id):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            entry = store.get(event_id)
+            event = entry[1] if entry is not None else self._instance(store, event_id)
+            if event is None or event.get("status") == "cancelled":
+                raise self._error(404)
+            return copy.deepcopy(event)
+
+    def _insert_event(self, calendar_id, body):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            event_id = body.get("id") or f"fake{self._version + 1}"
+            if event_id in store:
+                raise self._error(409, "duplicate")
+            self._version += 1
+            event = dict(copy.deepcopy(body), id=event_id, status="confirmed", etag=f'"{self._version}"')
+            event.setdefault("iCalUID", f"{event_id}@fake")
+            store[event_id] = (self._version, event)
+            return copy.deepcopy(event)
+
+    def _import_event(self, calendar_id, body):
+        # Like the real events.import: an iCalUID already in the calendar is updated in place
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            existing = next((event_id for event_id, (_, ev) in store.items()
+                             if ev.get("iCalUID") == body["iCalUID"]
+                             and ev.get("originalStartTime") == body.get("originalStartTime")), None)
+            self._version += 1
+            event_id = existing or f"imp{self._version}"
+            event = dict(copy.deepcopy(body), id=event_id, etag=f'"{self._version}"')
+            event.setdefault("status", "confirmed")
+            store[event_id] = (self._version, event)
+            return copy.deepcopy(event)
+
+    def _patch_event(self, calendar_id, event_id, body):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            entry = store.get(event_id)
+            if entry is None:
+                # Editing one occurrence turns it into an exception stored on its own
+                instance = self._instance(store, event_id)
+                entry = (0, instance) if instance is not None else None
+            if entry is None or entry[1].get("status") == "cancelled":
+                raise self._error(404)
+            self._version += 1
+            event = dict(entry[1], **copy.deepcopy(body), etag=f'"{self._version}"')
+            store[event_id] = (self._version, event)
+            return copy.deepcopy(event)
+
+    def _delete_event(self, calendar_id, event_id):
+        with self._lock:
+            store = self._events[self._resolve(calendar_id)]
+            entry = store.get(event_id)
+            instance = self._instance(store, event_id) if entry is None else None
+            if entry is None and instance is None:
+                raise self._error(404)
+            if entry is not None and entry[1].get("status") == "cancelled":
+                raise self._error(410, "deleted")
+            self._version += 1
+            cancelled = {"id": event_id, "status": "cancelled"}
+            source = instance or entry[1]
+            if source.get("recurringEventId"):
+                cancelled.update(recurringEventId=source["recurringEventId"],
+                                 originalStartTime=source["originalStartTime"])
+            store[event_id] = (self._version, cancelled)
+            return ""
+
+    # -- free/busy ---------------------------------------------------------
+
+    def _free_busy(self, body):
+        time_min, time_max = _parse_time(body["timeMin"]), _parse_time(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            try:
+                calendar_id = self._resolve(item["id"])
+            except HttpError:
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            busy = []
+            with self._lock:
+                events = [ev for _, ev in self._events[calendar_id].values()]
+            for event in events:
+                if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+                    continue
+                for instance in expand_series(event) if "recurrence" in event else [event]:
+                    if "dateTime" in instance["start"] and self._overlaps(instance, time_min, time_max):
+                        busy.append(_event_bounds(instance))
+            busy.sort()
+            calendars[item["id"]] = {"busy": [
+                {"start": start.astimezone(datetime.timezone.utc).isoformat().replace("+00:00", "Z"),
+                 "end": end.astimezone(datetime.timezone.utc).isoformat().replace("+00:00", "Z")}
+                for start, end in busy
+            ]}
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"],
+                "calendars": calendars}
+
+    # -- calendar list -----------------------------------------------------
+
+    def _list_calendars(self, params, headers):
+        items = [{k: v for k, v in cal.items() if not k.startswith("_") and (k != "primary" or v)}
+                 for cal in self._calendars.values() if cal["_listed"]]
+        etag = f'"cl{len(items)}"'
+        if headers.get("If-None-Match") == etag:
+            raise HttpError(httplib2.Response({"status": 304}), b"")
+        size = min(params.get("maxResults") or 100, self.page_size)
+        offset = int(params.get("pageToken") or 0)
+        response = {"kind": "calendar#calendarList", "etag": etag, "items": copy.deepcopy(items[offset:offset + size])}
+        if offset + size < len(items):
+            response["nextPageToken"] = str(offset + size)
+        return project(response, params.get("fields"))
@@ -0,0 +1,401 @@
+import datetime
+import os
+import re
+import time
+from collections import Counter
+
+from event_store import ThreadLocalDatabase
+from outbox import classify, backoff_delay, DONE, RETRY
+from calendar_sync import page_fields, to_local_rfc3339
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ics_imports (
+    source TEXT NOT NULL,
+    calendar_id TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, calendar_id)
+);
+"""
+
+# The Calendar API accepts at most 50 requests per batch
+IMPORT_BATCH_SIZE = 50
+IMPORT_MAX_ATTEMPTS = 6
+EXPORT_EVENT_FIELDS = (
+    "id,iCalUID,status,summary,description,location,start,end,recurrence,"
+    "recurringEventId,originalStartTime,updated,transparency"
+)
+PRODID = "-//CalendarApp//Google Calendar Desktop//RO"
+
+_DURATION = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+class ImportLog(ThreadLocalDatabase):
+    """How many VEVENTs of each (file, calendar) import have been sent, so an interrupted import resumes."""
+
+    schema = SCHEMA
+
+    def progress(self, source, calendar_id):
+        row = self._conn().execute(
+            "SELECT done FROM ics_imports WHERE source = ? AND calendar_id = ?", (source, calendar_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_progress(self, source, calendar_id, done):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ics_imports (source, calendar_id, done) VALUES (?, ?, ?)",
+                (source, calendar_id, done),
+            )
+
+    def finish(self, source, calendar_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM ics_imports WHERE source = ? AND calendar_id = ?", (source, calendar_id))
+
+
+def source_key(path):
+    # Same path, size and mtime: the same file, so its progress counter still applies
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}"
+
+
+# -- parsing -----------------------------------------------------------------
+
+def unfold(lines):
+    """Yield logical content lines from raw byte lines, undoing RFC 5545 line folding.
+
+    Also yields the byte offset reached, for progress: ``(line, offset)``.
+    """
+    pending = None
+    offset = 0
+    for raw in lines:
+        offset += len(raw)
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending, offset
+        pending = line
+    if pending:
+        yield pending, offset
+
+
+def parse_line(line):
+    """``"DTSTART;TZID=Europe/Bucharest:20260101T100000"`` -> ``("DTSTART", {"TZID": ...}, "2026...")``."""
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ":" and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None
+    name, *raw_params = head.split(";")
+    params = {}
+    for param in raw_params:
+        key, _, val = param.partition("=")
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+def iter_vevents(lines):
+    """Yield ``(properties, offset)`` for every VEVENT, reading ``lines`` (bytes) one at a time.
+
+    ``properties`` maps upper-case names to lists of ``(params, value)``; nested components
+    such as VALARM are skipped.
+    """
+    props = None
+    depth = 0
+    for line, offset in unfold(lines):
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and props is None:
+                props = {}
+            elif props is not None:
+                depth += 1
+            continue
+        if name == "END":
+            if props is not None and depth:
+                depth -= 1
+            elif props is not None and value.upper() == "VEVENT":
+                yield props, offset
+                props = None
+            continue
+        if props is not None and not depth:
+            props.setdefault(name, []).append((params, value))
+
+
+def unescape(text):
+    out, i = [], 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _parse_duration(value):
+    m = _DURATION.match(value)
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = datetime.timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                               minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def _parse_when(params, value):
+    """``(api_time, python_value)`` for a DTSTART/DTEND/RECURRENCE-ID value."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        d = datetime.datetime.strptime(value[:8], "%Y%m%d").date()
+        return {"date": d.isoformat()}, d
+    dt = datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return {"dateTime": dt.isoformat() + "Z", "timeZone": "UTC"}, dt.replace(tzinfo=datetime.timezone.utc)
+    if "TZID" in params:
+        return {"dateTime": dt.isoformat(), "timeZone": params["TZID"]}, dt
+    # Floating time: the API needs an offset, so read it as local time
+    return {"dateTime": to_local_rfc3339(dt)}, dt
+
+
+def _shift(api_time, parsed, delta):
+    if "date" in api_time:
+        return {"date": (parsed + delta).isoformat()}
+    shifted = parsed + delta
+    result = dict(api_time)
+    if api_time["dateTime"].endswith("Z"):
+        result["dateTime"] = shifted.replace(tzinfo=None).isoformat() + "Z"
+    elif "timeZone" in api_time:
+        result["dateTime"] = shifted.isoformat()
+    else:
+        result["dateTime"] = to_local_rfc3339(shifted)
+    return result
+
+
+def _as_utc(dt):
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return {"dateTime": dt.astimezone(datetime.timezone.utc).replace(tzinfo=None).isoformat(), "timeZone": "UTC"}
+
+
+def vevent_to_event(props):
+    """Google Calendar event body for one parsed VEVENT, or None if it cannot be imported."""
+    def first(name):
+        values = props.get(name)
+        return values[0] if values else (None, None)
+
+    uid = first("UID")[1]
+    params, value = first("DTSTART")
+    if not uid or not value:
+        return None
+    try:
+        start, start_value = _parse_when(params, value)
+        end_params, end_raw = first("DTEND")
+        if end_raw:
+            end, end_value = _parse_when(end_params, end_raw)
+        else:
+            duration = _parse_duration(first("DURATION")[1] or "")
+            if duration is None:
+                duration = datetime.timedelta(days=1) if "date" in start else datetime.timedelta(0)
+            end, end_value = _shift(start, start_value, duration), start_value + duration
+    except ValueError:
+        return None
+
+    event = {"iCalUID": uid, "start": start, "end": end}
+    for name, key in (("SUMMARY", "summary"), ("DESCRIPTION", "description"), ("LOCATION", "location")):
+        text = first(name)[1]
+        if text:
+            event[key] = unescape(text)
+    status = (first("STATUS")[1] or "").lower()
+    if status in ("confirmed", "tentative", "cancelled"):
+        event["status"] = status
+    if (first("TRANSP")[1] or "").upper() == "TRANSPARENT":
+        event["transparency"] = "transparent"
+    recurrence = []
+    for name in ("RRULE", "EXRULE", "RDATE", "EXDATE"):
+        for rule_params, rule in props.get(name, []):
+            prefix = name + "".join(f";{k}={v}" for k, v in rule_params.items())
+            recurrence.append(f"{prefix}:{rule}")
+    if recurrence:
+        event["recurrence"] = recurrence
+        if "dateTime" in start and "timeZone" not in start:
+            # The API only expands series that carry a named time zone
+            start, end = _as_utc(start_value), _as_utc(end_value)
+    rid_params, rid = first("RECURRENCE-ID")
+    if rid:
+        try:
+            event["originalStartTime"] = _parse_when(rid_params, rid)[0]
+        except ValueError:
+            return None
+    return event
+
+
+# -- writing -----------------------------------------------------------------
+
+def escape(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line):
+    """Split a content line into 75-octet chunks joined by CRLF + space (RFC 5545 3.1)."""
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    chunks, current, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > (75 if not chunks else 74):
+            chunks.append(current)
+            current, size = "", 0
+        current += ch
+        size += n
+    chunks.append(current)
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def _format_when(name, when):
+    if "date" in when:
+        return f"{name};VALUE=DATE:{when['date'].replace('-', '')}"
+    value = when["dateTime"]
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    dt = datetime.datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        if when.get("timeZone"):
+            return f"{name};TZID={when['timeZone']}:{dt:%Y%m%dT%H%M%S}"
+        dt = dt.astimezone()
+    return f"{name}:{dt.astimezone(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+
+
+def event_to_vevent(event, stamp):
+    lines = ["BEGIN:VEVENT", f"UID:{event.get('iCalUID') or event['id'] + '@google.com'}", f"DTSTAMP:{stamp}",
+             _format_when("DTSTART", event["start"]), _format_when("DTEND", event.get("end") or event["start"])]
+    if event.get("originalStartTime"):
+        lines.append(_format_when("RECURRENCE-ID", event["originalStartTime"]))
+    for key, name in (("summary", "SUMMARY"), ("description", "DESCRIPTION"), ("location", "LOCATION")):
+        if event.get(key):
+            lines.append(f"{name}:{escape(event[key])}")
+    if event.get("status") in ("confirmed", "tentative"):
+        lines.append(f"STATUS:{event['status'].upper()}")
+    if event.get("transparency") == "transparent":
+        lines.append("TRANSP:TRANSPARENT")
+    lines.extend(event.get("recurrence", []))
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+# -- import / export ---------------------------------------------------------
+
+def export_calendar(engine, path, calendar_id, first=None, end=None, report=None, should_stop=None):
+    """Write ``calendar_id`` to ``path`` as iCalendar, page by page from the API.
+
+    Only one page is ever held in memory. The file appears under its name only once complete.
+    ``report(events_written)`` is called after every page. Returns the number of events written.
+    """
+    params = {"calendarId": calendar_id, "singleEvents": False, "fields": page_fields(EXPORT_EVENT_FIELDS)}
+    if first is not None:
+        params["timeMin"] = to_local_rfc3339(datetime.datetime(first.year, first.month, first.day))
+    if end is not None:
+        params["timeMax"] = to_local_rfc3339(datetime.datetime(end.year, end.month, end.day))
+    stamp = f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+    partial = path + ".part"
+    written = 0
+    with open(partial, "w", encoding="utf-8", newline="") as out:
+        out.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n")
+        for page in engine.iter_event_pages(site="events.list/ics_export", **params):
+            for event in page.get("items", []):
+                if event.get("status") == "cancelled" or "start" not in event:
+                    continue
+                out.write(event_to_vevent(event, stamp))
+                written += 1
+            if report is not None:
+                report(written)
+            if should_stop is not None and should_stop():
+                out.close()
+                os.remove(partial)
+                return None
+        out.write("END:VCALENDAR\r\n")
+    os.replace(partial, path)
+    return written
+
+
+def _send_imports(engine, calendar_id, events, stats):
+    attempts = 0
+    while events:
+        requests = {i: engine.service.events().import_(calendarId=calendar_id, body=ev, fields="id") for i, ev in enumerate(events)}
+        results = engine.execute_batch(requests, site="batch/ics_import")
+        retry, delay, last_error = [], 0, None
+        for i, ev in enumerate(events):
+            _, error = results.get(i, (None, None))
+            outcome, retry_after = classify({"kind": "import"}, error)
+            if outcome == DONE:
+                stats["imported"] += 1
+            elif outcome == RETRY:
+                retry.append(ev)
+                delay = max(delay, backoff_delay(attempts, retry_after))
+                last_error = error
+            else:
+                stats["failed"] += 1
+        events = retry
+        if events:
+            attempts += 1
+            if attempts >= IMPORT_MAX_ATTEMPTS:
+                # Progress so far is kept; running the import again resumes from here
+                raise last_error
+            time.sleep(delay)
+
+
+def import_calendar(engine, path, calendar_id, report=None, should_stop=None, batch_size=IMPORT_BATCH_SIZE):
+    """Import the VEVENTs of an .ics file into ``calendar_id`` with batched events.import calls.
+
+    The file is parsed as it is read. Events whose iCalUID is already in the calendar are skipped
+    (and events.import itself updates rather than duplicates by iCalUID). Progress is saved after
+    every batch, so a cancelled or failed import picks up where it stopped when run again.
+    ``report((bytes_read, bytes_total, stats))`` is called after every batch.
+    Returns the stats Counter; ``stats["interrupted"]`` is set if ``should_stop`` ended it early.
+    """
+    log = ImportLog(engine.store.path)
+    source = source_key(path)
+    resume_from = log.progress(source, calendar_id)
+    known = engine.store.ical_uids(calendar_id)
+    stats = Counter(resumed=resume_from)
+    batch = []
+    total = os.path.getsize(path)
+    index = 0
+    with open(path, "rb") as fh:
+        for index, (props, offset) in enumerate(iter_vevents(fh), start=1):
+            if index <= resume_from:
+                continue
+            event = vevent_to_event(props)
+            if event is None:
+                stats["skipped"] += 1
+            elif event["iCalUID"] in known and "originalStartTime" not in event:
+                stats["duplicates"] += 1
+            else:
+                known.add(event["iCalUID"])
+                batch.append(event)
+            if len(batch) >= batch_size:
+                _send_imports(engine, calendar_id, batch, stats)
+                batch = []
+                log.set_progress(source, calendar_id, index)
+                if report is not None:
+                    report((offset, total, dict(stats)))
+                if should_stop is not None and should_stop():
+                    stats["interrupted"] = 1
+                    return stats
+        _send_imports(engine, calendar_id, batch, stats)
+    log.finish(source, calendar_id)
+    if report is not None:
+        report((total, total, dict(stats)))
+    return stats
+
@@ -0,0 +1,168 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Programs with a command-line switch for it (the app's --metrics) call METRICS.enable()
+ENABLED = os.environ.get("CALENDAR_METRICS") == "1"
+# Written on exit when set, so a run can be measured without opening the panel
+DUMP_PATH = os.environ.get("CALENDAR_METRICS_FILE")
+
+
+class SiteStats:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "bytes", "pages", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.pages = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (None past the last bound)."""
+        wanted = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= wanted:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+        return None
+
+    def as_dict(self):
+        return {
+            "count": self.count, "errors": self.errors,
+            "total_ms": round(self.total_ms, 3), "max_ms": round(self.max_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5), "p95_ms": self.percentile(0.95),
+            "bytes": self.bytes, "pages": self.pages,
+            "histogram": dict(zip([str(b) for b in BUCKETS_MS] + ["inf"], self.histogram)),
+        }
+
+
+def _pages(response):
+    return 1 if isinstance(response, dict) and "items" in response else 0
+
+
+def response_size(response):
+    """Bytes of a decoded API response, re-serialized; the client library does not expose the raw body."""
+    if not response:
+        return 0
+    return len(json.dumps(response, separators=(",", ":")))
+
+
+class Metrics:
+    """Per call site counters and latency histograms for API requests, list builds and painting.
+
+    ``timed`` and ``accumulated`` check ``enabled`` on every call, so instrumentation can be
+    switched on after the instrumented modules are imported; while it is off, a call costs one
+    attribute check on top of the function itself.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started = time.time()
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def record(self, site, elapsed_ms, nbytes=0, pages=0, error=False):
+        with self._lock:
+            stats = self._sites.get(site)
+            if stats is None:
+                stats = self._sites[site] = SiteStats()
+            stats.count += 1
+            stats.errors += bool(error)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.bytes += nbytes
+            stats.pages += pages
+            stats.histogram[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+    def record_response(self, site, started, response, error=False):
+        """Record one API round trip that began at ``time.perf_counter()`` value ``started``."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.record(site, elapsed_ms, response_size(response), _pages(response), error)
+
+    def record_batch(self, site, started, results):
+        """Record one batch round trip from its ``{key: (response, exception)}`` results."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        responses = [response for response, _ in results.values()]
+        self.record(
+            site, elapsed_ms, sum(map(response_size, responses)), sum(map(_pages, responses)),
+            any(exception is not None for _, exception in results.values()),
+        )
+
+    def timed(self, site):
+        """Decorator recording each call's duration under ``site``."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(site, (time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorate
+
+    def accumulated(self, site, defer):
+        """Decorator summing every call made in one pass (e.g. all cells of a frame) into one sample.
+
+        ``defer(callback)`` must run ``callback`` once the pass is over, e.g. on the next
+        event loop iteration.
+        """
+        def decorate(fn):
+            pending = []
+
+            def flush():
+                self.record(site, pending.pop())
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    if pending:
+                        pending[0] += elapsed_ms
+                    else:
+                        pending.append(elapsed_ms)
+                        defer(flush)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """``{site: stats dict}`` sorted by site name."""
+        with self._lock:
+            return {site: self._sites[site].as_dict() for site in sorted(self._sites)}
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+            self.started = time.time()
+
+    def dump(self, path):
+        """Append one JSON line per call site to ``path``."""
+        now = time.time()
+        with open(path, "a", encoding="utf-8") as f:
+            for site, stats in self.snapshot().items():
+                f.write(json.dumps(dict(stats, site=site, time=now, since=self.started)) + "\n")
+
+
+METRICS = Metrics(ENABLED)
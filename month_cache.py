@@ -0,0 +1,102 @@
+import bisect
+import datetime
+from collections import OrderedDict
+
+
+def month_range(year, month):
+    first = datetime.date(year, month, 1)
+    if month == 12:
+        next_month = datetime.date(year + 1, 1, 1)
+    else:
+        next_month = datetime.date(year, month + 1, 1)
+    return first, next_month
+
+
+def month_index(year, month):
+    """Months since year 0, so months can be compared and subtracted."""
+    return year * 12 + month - 1
+
+
+def shift_month(year, month, delta):
+    index = month_index(year, month) + delta
+    return index // 12, index % 12 + 1
+
+
+def local_midnight_ts(d):
+    return int(datetime.datetime(d.year, d.month, d.day).timestamp())
+
+
+class MonthCache:
+    """LRU of per-month events, bounded by an approximate byte budget.
+
+    Each month holds the ``EventRecord``s overlapping it, by start time, so both the month grid
+    and any day inside the month can be served without the store.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.generation = 0
+        # Bumped whenever cached events change or are dropped (not when a month is merely loaded),
+        # so views built from them know when to rebuild
+        self.revision = 0
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, events, nbytes, generation=None):
+        # A prefetch started before an invalidation must not resurrect stale events
+        if generation is not None and generation != self.generation:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= old[1]
+        self._entries[key] = (events, nbytes)
+        self._size += nbytes
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= evicted
+
+    def replace_event(self, key, record):
+        """Drop the event with ``key`` from every cached month and insert ``record`` (if any)
+        where it overlaps.
+
+        Returns the keys of the months that changed.
+        """
+        changed = []
+        for month, (events, size) in list(self._entries.items()):
+            first, next_month = month_range(*month)
+            kept = []
+            for ev in events:
+                if ev.key == key:
+                    size -= ev.nbytes()
+                else:
+                    kept.append(ev)
+            inserted = (record is not None and record.start_ts < local_midnight_ts(next_month)
+                        and record.end_ts > local_midnight_ts(first))
+            if inserted:
+                bisect.insort(kept, record, key=lambda ev: ev.start_ts)
+                size += record.nbytes()
+            if inserted or len(kept) != len(events):
+                # Mutate in place: callers may be holding on to the month's event list
+                events[:] = kept
+                self._size += size - self._entries[month][1]
+                self._entries[month] = (events, size)
+                changed.append(month)
+        if changed:
+            self.revision += 1
+        return changed
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+        self.generation += 1
+        self.revision += 1
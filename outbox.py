@@ -0,0 +1,204 @@
+import json
+import random
+import time
+
+from googleapiclient.errors import HttpError
+
+from event_store import ThreadLocalDatabase, event_key, event_row
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    body TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    in_flight INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_by_event ON outbox (calendar_id, event_id);
+"""
+
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# What to do with a finished operation
+DONE, RETRY, FAIL = "done", "retry", "fail"
+
+
+def backoff_delay(attempts, retry_after=None):
+    delay = min(BACKOFF_BASE * (2 ** attempts), BACKOFF_MAX) * random.uniform(0.5, 1.0)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def classify(op, error):
+    """Return ``(DONE | RETRY | FAIL, retry_after_seconds)`` for an operation's outcome."""
+    if error is None:
+        return DONE, None
+    if not isinstance(error, HttpError):
+        # Socket errors, timeouts, DNS: we are probably offline, keep the write
+        return RETRY, None
+    status = error.resp.status
+    if op["kind"] == "insert" and status == 409:
+        # The id is ours, so a 409 means an earlier attempt got through after all
+        return DONE, None
+    if op["kind"] == "delete" and status in (404, 410):
+        return DONE, None
+    try:
+        retry_after = float(error.resp.get("retry-after") or 0)
+    except ValueError:
+        retry_after = 0
+    if status in RETRYABLE_STATUSES:
+        return RETRY, retry_after
+    if status == 403:
+        reasons = {d.get("reason") for d in (error.error_details or []) if isinstance(d, dict)}
+        if reasons & RATE_LIMIT_REASONS:
+            return RETRY, retry_after
+    return FAIL, None
+
+
+class Outbox(ThreadLocalDatabase):
+    """Write-ahead queue of event mutations that have not reached the server yet.
+
+    Writes to the same event are merged as they are queued: patches fold into a
+    pending insert or patch, and a delete cancels a pending insert outright.
+    An operation that is already being sent is never merged into.
+    """
+
+    schema = SCHEMA
+
+    def enqueue(self, calendar_id, kind, event_id, body=None):
+        with self._conn() as conn:
+            last = conn.execute(
+                "SELECT op_id, kind, body FROM outbox "
+                "WHERE calendar_id = ? AND event_id = ? AND in_flight = 0 ORDER BY op_id DESC LIMIT 1",
+                (calendar_id, event_id),
+            ).fetchone()
+            last_kind = last[1] if last else None
+            if kind == "patch" and last_kind in ("insert", "patch"):
+                merged = dict(json.loads(last[2]), **body)
+                conn.execute("UPDATE outbox SET body = ? WHERE op_id = ?", (json.dumps(merged), last[0]))
+                return
+            if kind == "patch" and last_kind == "delete":
+                return
+            if kind == "delete" and last_kind == "insert":
+                # Never reached the server, so there is nothing to delete
+                conn.execute("DELETE FROM outbox WHERE op_id = ?", (last[0],))
+                return
+            if kind == "delete" and last_kind == "patch":
+                conn.execute("UPDATE outbox SET kind = 'delete', body = NULL WHERE op_id = ?", (last[0],))
+                return
+            if kind == "delete" and last_kind == "delete":
+                return
+            conn.execute(
+                "INSERT INTO outbox (calendar_id, event_id, kind, body) VALUES (?, ?, ?, ?)",
+                (calendar_id, event_id, kind, json.dumps(body) if body is not None else None),
+            )
+
+    def take_ready(self, limit, now=None):
+        """Mark up to ``limit`` due operations as in flight and return them, at most one per event."""
+        now = time.time() if now is None else now
+        with self._conn() as conn:
+            busy = {
+                (r[0], r[1]) for r in conn.execute(
+                    "SELECT calendar_id, event_id FROM outbox WHERE in_flight = 1")
+            }
+            ops = []
+            for op_id, calendar_id, event_id, kind, body, attempts, next_attempt in conn.execute(
+                    "SELECT op_id, calendar_id, event_id, kind, body, attempts, next_attempt "
+                    "FROM outbox WHERE in_flight = 0 ORDER BY op_id").fetchall():
+                key = (calendar_id, event_id)
+                if key in busy:
+                    continue
+                # Later writes to this event must wait for the earlier one either way
+                busy.add(key)
+                if next_attempt > now:
+                    continue
+                ops.append({
+                    "op_id": op_id, "calendar_id": calendar_id, "event_id": event_id, "kind": kind,
+                    "body": json.loads(body) if body else None, "attempts": attempts,
+                })
+                if len(ops) >= limit:
+                    break
+            conn.executemany("UPDATE outbox SET in_flight = 1 WHERE op_id = ?", [(op["op_id"],) for op in ops])
+        return ops
+
+    def complete(self, op_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM outbox WHERE op_id = ?", (op_id,))
+
+    drop = complete
+
+    def retry(self, op_id, next_attempt):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE outbox SET in_flight = 0, attempts = attempts + 1, next_attempt = ? WHERE op_id = ?",
+                (next_attempt, op_id),
+            )
+
+    def release_in_flight(self):
+        # After a crash nothing is really in flight any more
+        with self._conn() as conn:
+            conn.execute("UPDATE outbox SET in_flight = 0")
+
+    def next_due(self):
+        row = self._conn().execute("SELECT MIN(next_attempt) FROM outbox WHERE in_flight = 0").fetchone()
+        return row[0]
+
+    def pending(self, calendar_ids):
+        """Queued ``(calendar_id, event_id, kind, body)`` for the given calendars, oldest first."""
+        if not calendar_ids:
+            return []
+        marks = ",".join("?" * len(calendar_ids))
+        rows = self._conn().execute(
+            f"SELECT calendar_id, event_id, kind, body FROM outbox WHERE calendar_id IN ({marks}) ORDER BY op_id",
+            tuple(calendar_ids),
+        ).fetchall()
+        return [(cal_id, event_id, kind, json.loads(body) if body else None) for cal_id, event_id, kind, body in rows]
+
+    def has_pending(self, calendar_id, event_id):
+        return self._conn().execute(
+            "SELECT 1 FROM outbox WHERE calendar_id = ? AND event_id = ? LIMIT 1", (calendar_id, event_id)
+        ).fetchone() is not None
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM outbox")
+
+
+def overlay_pending(rows, pending, start_ts, end_ts, lookup):
+    """Apply queued writes on top of store rows so unsynced changes survive a restart.
+
+    ``lookup(calendar_id, event_id)`` fetches the stored event for patches of events outside ``rows``.
+    Overlaid events carry ``"_pending": True``.
+    """
+    if not pending:
+        return rows
+    by_key = {event_key(r[3]): r for r in rows}
+    for calendar_id, event_id, kind, body in pending:
+        key = (calendar_id, event_id)
+        if kind == "delete":
+            by_key.pop(key, None)
+            continue
+        if kind == "insert":
+            event = dict(body, _calendar=calendar_id, _pending=True)
+        else:
+            base = by_key[key][3] if key in by_key else lookup(calendar_id, event_id)
+            if base is None:
+                continue
+            event = dict(base, **body, _calendar=calendar_id, _pending=True)
+        row = event_row(event)
+        if row is not None:
+            by_key[key] = row
+    merged = [r for r in by_key.values() if r[0] < end_ts and r[1] > start_ts]
+    merged.sort(key=lambda r: (r[0], r[3]["_calendar"], r[3].get("id") or ""))
+    return merged
@@ -0,0 +1,352 @@
+import calendar
+import datetime
+import heapq
+from zoneinfo import ZoneInfo
+
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+SUPPORTED_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "BYMONTH", "BYSETPOS", "WKST"}
+# Series without COUNT or UNTIL run forever; their stored row spans up to here
+OPEN_ENDED_TS = 2 ** 53
+# A rule whose filters stop matching (e.g. BYMONTHDAY=30;BYMONTH=2) must not spin forever
+MAX_EMPTY_PERIODS = 1000
+
+
+class UnsupportedRule(ValueError):
+    """The series uses RRULE parts this expander does not implement; let the server expand it."""
+
+
+def parse_rule(text):
+    """``"RRULE:FREQ=WEEKLY;BYDAY=MO,WE"`` -> ``{"FREQ": "WEEKLY", "BYDAY": ["MO", "WE"], ...}``."""
+    rule = {}
+    for part in text.split(":", 1)[-1].split(";"):
+        if not part:
+            continue
+        key, _, value = part.partition("=")
+        key = key.upper()
+        if key not in SUPPORTED_PARTS:
+            raise UnsupportedRule(key)
+        rule[key] = value
+    if rule.get("FREQ") not in FREQUENCIES:
+        raise UnsupportedRule(rule.get("FREQ"))
+    rule["INTERVAL"] = int(rule.get("INTERVAL", 1))
+    if "COUNT" in rule:
+        rule["COUNT"] = int(rule["COUNT"])
+    for key in ("BYMONTHDAY", "BYMONTH", "BYSETPOS"):
+        if key in rule:
+            rule[key] = [int(v) for v in rule[key].split(",")]
+    if "BYDAY" in rule:
+        days = []
+        for value in rule["BYDAY"].split(","):
+            ordinal, weekday = value[:-2], value[-2:]
+            if weekday not in WEEKDAYS:
+                raise UnsupportedRule(value)
+            days.append((int(ordinal) if ordinal else None, WEEKDAYS.index(weekday)))
+        rule["BYDAY"] = days
+    rule["WKST"] = WEEKDAYS.index(rule.get("WKST", "MO"))
+    return rule
+
+
+def _weekdays_in(first, last, byday):
+    """Days in [first, last] matching BYDAY entries; an ordinal counts within that span."""
+    days = []
+    span = (last - first).days + 1
+    for ordinal, weekday in byday:
+        matches = [first + datetime.timedelta(days=i) for i in range(span)
+                   if (first + datetime.timedelta(days=i)).weekday() == weekday]
+        if ordinal is None:
+            days.extend(matches)
+        elif -len(matches) <= ordinal <= len(matches) and ordinal:
+            days.append(matches[ordinal - 1 if ordinal > 0 else ordinal])
+    return days
+
+
+def _month_days(year, month, rule, default_day):
+    last_day = calendar.monthrange(year, month)[1]
+    first, last = datetime.date(year, month, 1), datetime.date(year, month, last_day)
+    by_month_day = None
+    if "BYMONTHDAY" in rule:
+        by_month_day = {
+            datetime.date(year, month, d if d > 0 else last_day + d + 1)
+            for d in rule["BYMONTHDAY"] if -last_day <= d <= last_day and d
+        }
+    if "BYDAY" in rule:
+        days = set(_weekdays_in(first, last, rule["BYDAY"]))
+        return days & by_month_day if by_month_day is not None else days
+    if by_month_day is not None:
+        return by_month_day
+    return {datetime.date(year, month, default_day)} if default_day <= last_day else set()
+
+
+def _period_dates(rule, dtstart, n):
+    """Candidate dates of the n-th period (before BYMONTH filtering and BYSETPOS)."""
+    freq, interval = rule["FREQ"], rule["INTERVAL"]
+    if freq == "DAILY":
+        day = dtstart + datetime.timedelta(days=n * interval)
+        if "BYMONTHDAY" in rule and day not in _month_days(day.year, day.month, {"BYMONTHDAY": rule["BYMONTHDAY"]}, 0):
+            return []
+        if "BYDAY" in rule and day.weekday() not in {wd for _, wd in rule["BYDAY"]}:
+            return []
+        return [day]
+    if freq == "WEEKLY":
+        week_start = dtstart - datetime.timedelta(days=(dtstart.weekday() - rule["WKST"]) % 7)
+        week_start += datetime.timedelta(weeks=n * interval)
+        weekdays = {wd for _, wd in rule["BYDAY"]} if "BYDAY" in rule else {dtstart.weekday()}
+        return sorted(week_start + datetime.timedelta(days=i) for i in range(7)
+                      if (week_start + datetime.timedelta(days=i)).weekday() in weekdays)
+    if freq == "MONTHLY":
+        index = dtstart.year * 12 + dtstart.month - 1 + n * interval
+        year, month = divmod(index, 12)
+        return sorted(_month_days(year, month + 1, rule, dtstart.day))
+    year = dtstart.year + n * interval
+    if "BYDAY" in rule and "BYMONTH" not in rule and "BYMONTHDAY" not in rule:
+        # Yearly BYDAY without BYMONTH: ordinals count within the whole year
+        return sorted(_weekdays_in(datetime.date(year, 1, 1), datetime.date(year, 12, 31), rule["BYDAY"]))
+    months = rule.get("BYMONTH", [dtstart.month])
+    days = set()
+    for month in months:
+        days |= _month_days(year, month, rule, dtstart.day)
+    return sorted(days)
+
+
+def _periods_before(rule, dtstart, day):
+    """Whole periods between dtstart and ``day``, so open-ended series can skip straight to a window."""
+    if day <= dtstart:
+        return 0
+    freq, interval = rule["FREQ"], rule["INTERVAL"]
+    if freq == "DAILY":
+        units = (day - dtstart).days
+    elif freq == "WEEKLY":
+        units = (day - dtstart).days // 7
+    elif freq == "MONTHLY":
+        units = (day.year - dtstart.year) * 12 + day.month - dtstart.month
+    else:
+        units = day.year - dtstart.year
+    return max(0, units // interval - 1)
+
+
+def iter_rule_dates(rule, dtstart, skip_to=None):
+    """Dates the rule produces from ``dtstart`` (a date) on, in order; infinite without COUNT/UNTIL.
+
+    UNTIL is left to the caller, which knows the time of day and zone it compares in.
+    ``skip_to`` jumps ahead to about that date, which is only allowed without COUNT.
+    """
+    count = rule.get("COUNT")
+    n = _periods_before(rule, dtstart, skip_to) if skip_to is not None and count is None else 0
+    emitted = 0
+    empty = 0
+    while empty < MAX_EMPTY_PERIODS:
+        dates = [d for d in _period_dates(rule, dtstart, n) if "BYMONTH" not in rule or d.month in rule["BYMONTH"]]
+        if "BYSETPOS" in rule and dates:
+            dates = [dates[p - 1 if p > 0 else p] for p in rule["BYSETPOS"] if -len(dates) <= p <= len(dates) and p]
+            dates = sorted(set(dates))
+        dates = [d for d in dates if d >= dtstart]
+        empty = 0 if dates else empty + 1
+        for d in dates:
+            yield d
+            emitted += 1
+            if count is not None and emitted >= count:
+                return
+        n += 1
+
+
+# -- series ------------------------------------------------------------------
+
+def _zone(when):
+    name = when.get("timeZone")
+    if name:
+        try:
+            return ZoneInfo(name)
+        except Exception:
+            pass
+    value = when["dateTime"].replace("Z", "+00:00")
+    return datetime.datetime.fromisoformat(value).tzinfo or datetime.timezone.utc
+
+
+def _aware(value, zone):
+    dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt.astimezone(zone) if dt.tzinfo else dt.replace(tzinfo=zone)
+
+
+def _parse_rule_time(value, params, zone, all_day):
+    """An EXDATE/RDATE/UNTIL value as a date (all-day series) or an aware datetime."""
+    if len(value) == 8:
+        d = datetime.datetime.strptime(value, "%Y%m%d").date()
+        return d if all_day else datetime.datetime(d.year, d.month, d.day, tzinfo=zone)
+    dt = datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    elif "TZID" in params:
+        try:
+            dt = dt.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except Exception:
+            dt = dt.replace(tzinfo=zone)
+    else:
+        dt = dt.replace(tzinfo=zone)
+    return dt.date() if all_day else dt
+
+
+def original_key(when):
+    """Key identifying an occurrence by its original start: the date, or the UTC timestamp."""
+    if "date" in when:
+        return when["date"]
+    return str(int(_aware(when["dateTime"], datetime.timezone.utc).timestamp()))
+
+
+class Series:
+    """A recurring event's master, expandable into ``singleEvents=True``-shaped instances."""
+
+    def __init__(self, master):
+        self.master = master
+        self.all_day = "date" in master["start"]
+        self.rules, self.exdates, self.rdates = [], set(), []
+        if self.all_day:
+            self.zone = None
+            self.start = datetime.date.fromisoformat(master["start"]["date"])
+            self.duration = datetime.date.fromisoformat(master["end"]["date"]) - self.start
+        else:
+            self.zone = _zone(master["start"])
+            start = _aware(master["start"]["dateTime"], self.zone)
+            end = _aware(master["end"]["dateTime"], self.zone)
+            # Occurrences keep the wall-clock time across DST changes, as Google's do
+            self.start = start.replace(tzinfo=None)
+            self.duration = end.replace(tzinfo=None) - self.start
+        for line in master.get("recurrence", []):
+            head, _, value = line.partition(":")
+            name, *raw_params = head.split(";")
+            params = dict(p.partition("=")[::2] for p in raw_params)
+            name = name.upper()
+            if name == "RRULE":
+                rule = parse_rule(value)
+                if "UNTIL" in rule:
+                    rule["UNTIL"] = _parse_rule_time(rule["UNTIL"], {}, self.zone, self.all_day)
+                self.rules.append(rule)
+            elif name in ("EXDATE", "RDATE"):
+                times = [_parse_rule_time(v, params, self.zone, self.all_day) for v in value.split(",") if v]
+                if name == "EXDATE":
+                    self.exdates.update(self._key(t) for t in times)
+                else:
+                    self.rdates.extend(times)
+            elif name == "EXRULE":
+                raise UnsupportedRule(name)
+
+    def _localize(self, naive):
+        return naive.replace(tzinfo=self.zone)
+
+    def _key(self, value):
+        if self.all_day:
+            return value.isoformat()
+        return str(int(value.timestamp()))
+
+    def _occurrence_starts(self, skip_to=None):
+        """Occurrence starts in order: dates for all-day series, aware datetimes otherwise."""
+        streams = []
+        for rule in self.rules or [{"FREQ": "DAILY", "INTERVAL": 1, "COUNT": 1, "WKST": 0}]:
+            streams.append(self._rule_starts(rule, skip_to))
+        extra = sorted(self.rdates)
+        if extra:
+            streams.append(iter(extra))
+        if len(streams) == 1:
+            yield from streams[0]
+            return
+        last = None
+        for value in heapq.merge(*streams):
+            if value != last:
+                yield value
+            last = value
+
+    def _rule_starts(self, rule, skip_to):
+        first_day = self.start if self.all_day else self.start.date()
+        until = rule.get("UNTIL")
+        for day in iter_rule_dates(rule, first_day, skip_to):
+            if self.all_day:
+                value = day
+            else:
+                value = self._localize(datetime.datetime.combine(day, self.start.time()))
+            if until is not None and value > until:
+                return
+            yield value
+
+    def span(self):
+        """``(first_start_ts, last_end_ts)`` of the whole series, for indexing it as one row."""
+        first = self._timestamp(self.start if self.all_day else self._localize(self.start))
+        if not self.rules:
+            last_start = max([self.start if self.all_day else self._localize(self.start)] + self.rdates)
+        elif all("COUNT" in r or "UNTIL" in r for r in self.rules):
+            last_start = None
+            for last_start in self._occurrence_starts():
+                pass
+            if last_start is None:
+                return first, first
+        else:
+            return first, OPEN_ENDED_TS
+        return first, self._timestamp(self._end_of(last_start))
+
+    def _end_of(self, start):
+        if self.all_day:
+            return start + self.duration
+        return self._localize(start.replace(tzinfo=None) + self.duration)
+
+    @staticmethod
+    def _timestamp(value):
+        if isinstance(value, datetime.datetime):
+            return int(value.timestamp())
+        return int(datetime.datetime(value.year, value.month, value.day).timestamp())
+
+    def instances(self, start_ts, end_ts, overridden=()):
+        """Instances overlapping [start_ts, end_ts), lazily, skipping EXDATEs and the
+        original starts in ``overridden`` (exceptions that are stored on their own).
+        """
+        for start, end in self.occurrences(start_ts, end_ts, overridden):
+            yield self._instance(start, end)
+
+    def occurrences(self, start_ts, end_ts, overridden=()):
+        """``(start, end)`` of the instances ``instances`` would build: dates for all-day
+        series, aware datetimes in the series' zone otherwise.
+        """
+        open_ended = any("COUNT" not in r for r in self.rules)
+        skip_to = None
+        if open_ended and not self.rdates:
+            skip_to = datetime.date.fromtimestamp(start_ts) - datetime.timedelta(days=self.duration.days + 1)
+        for start in self._occurrence_starts(skip_to):
+            if self._timestamp(start) >= end_ts:
+                return
+            end = self._end_of(start)
+            if self._timestamp(end) <= start_ts and not (start == end and self._timestamp(start) >= start_ts):
+                continue
+            key = self._key(start)
+            if key in self.exdates or key in overridden:
+                continue
+            yield start, end
+
+    def _instance(self, start, end):
+        master = self.master
+        instance = {k: v for k, v in master.items() if k not in ("recurrence", "etag")}
+        if self.all_day:
+            suffix = f"{start:%Y%m%d}"
+            when = {"date": start.isoformat()}
+            instance["end"] = {"date": end.isoformat()}
+        else:
+            suffix = f"{start.astimezone(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+            when = dict(master["start"], dateTime=start.isoformat())
+            instance["end"] = dict(master["end"], dateTime=end.isoformat())
+        instance.update(id=f"{master['id']}_{suffix}", recurringEventId=master["id"],
+                        start=when, originalStartTime=dict(when))
+        return instance
+
+    def instance(self, event_id):
+        """The generated instance with this id (``<series id>_<original start>``), or None."""
+        suffix = event_id.rsplit("_", 1)[-1]
+        try:
+            if self.all_day:
+                day = datetime.datetime.strptime(suffix, "%Y%m%d")
+            else:
+                day = datetime.datetime.strptime(suffix, "%Y%m%dT%H%M%SZ").replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            return None
+        ts = int(day.timestamp())
+        for instance in self.instances(ts - 2 * 86400, ts + 2 * 86400):
+            if instance["id"] == event_id:
+                return instance
+        return None
@@ -0,0 +1,118 @@
+import heapq
+
+
+# Google caps reminders at four weeks before the start
+MAX_REMINDER_MINUTES = 4 * 7 * 24 * 60
+
+
+def popup_minutes(event, defaults=()):
+    """Minutes before the start of ``event`` (an API dict) at which it asks for a popup.
+
+    ``defaults`` are the popup minutes of its calendar's default reminders; as in Google, they
+    only apply to timed events.
+    """
+    reminders = event.get("reminders") or {"useDefault": True}
+    if reminders.get("useDefault"):
+        return [] if "date" in event.get("start", {}) else list(defaults)
+    return [r["minutes"] for r in reminders.get("overrides", [])
+            if r.get("method") == "popup" and 0 <= r.get("minutes", -1) <= MAX_REMINDER_MINUTES]
+
+
+class Reminder:
+    __slots__ = ("key", "summary", "start_ts", "minutes", "fire_ts")
+
+    def __init__(self, key, summary, start_ts, minutes, fire_ts):
+        self.key = key
+        self.summary = summary
+        self.start_ts = start_ts
+        self.minutes = minutes
+        self.fire_ts = fire_ts
+
+
+class ReminderQueue:
+    """Upcoming popup reminders in a heap ordered by when they fire.
+
+    Replacing or dropping an event does not search the heap: every entry carries the version of
+    its event, and entries of an older version are thrown away when they reach the top. Once
+    the stale ones outnumber the live ones the heap is rebuilt, so it stays O(live) in size.
+
+    ``fired_until`` is the time up to which reminders have been handed out; nothing at or
+    before it is queued again. ``until`` is how far ahead events have been loaded; the owner
+    moves it forward as it loads more.
+    """
+
+    def __init__(self, now):
+        self._heap = []
+        # key -> [version, summary, start_ts, entries still in the heap]
+        self._events = {}
+        self._version = 0
+        self._stale = 0
+        self.fired_until = now
+        self.until = now
+
+    def __len__(self):
+        return len(self._heap) - self._stale
+
+    def set_event(self, key, summary, start_ts, minutes):
+        """Queue the reminders of event ``key`` (replacing any it had) ``minutes`` before ``start_ts``."""
+        self.remove(key)
+        fire_times = {start_ts - m * 60: m for m in minutes if start_ts - m * 60 > self.fired_until}
+        if not fire_times:
+            return
+        self._version += 1
+        self._events[key] = [self._version, summary, start_ts, len(fire_times)]
+        for fire_ts, m in fire_times.items():
+            heapq.heappush(self._heap, (fire_ts, self._version, key, m))
+
+    def remove(self, key):
+        entry = self._events.pop(key, None)
+        if entry is not None:
+            self._stale += entry[3]
+            self._compact()
+
+    def remove_calendar(self, calendar_id):
+        for key in [key for key in self._events if key[0] == calendar_id]:
+            self.remove(key)
+
+    def clear(self):
+        self._heap = []
+        self._events.clear()
+        self._stale = 0
+
+    def _compact(self):
+        if self._stale > 1024 and self._stale > len(self._heap) // 2:
+            self._heap = [item for item in self._heap if self._live(item)]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _live(self, item):
+        entry = self._events.get(item[2])
+        return entry is not None and entry[0] == item[1]
+
+    def _drop_stale_top(self):
+        while self._heap and not self._live(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale -= 1
+
+    def next_due(self):
+        """When the next reminder fires (epoch seconds), or None if nothing is queued."""
+        self._drop_stale_top()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Reminders due at or before ``now``, in firing order; after a long sleep that is all
+        the missed ones at once, for the caller to thin out.
+        """
+        due = []
+        while True:
+            self._drop_stale_top()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            fire_ts, _, key, minutes = heapq.heappop(self._heap)
+            entry = self._events[key]
+            entry[3] -= 1
+            if not entry[3]:
+                del self._events[key]
+            due.append(Reminder(key, entry[1], entry[2], minutes, fire_ts))
+        self.fired_until = max(self.fired_until, now)
+        return due
@@ -0,0 +1,115 @@
+import itertools
+import time
+
+
+class RequestDropped(Exception):
+    """The request was still queued when the view moved too far from the pages it was for."""
+
+
+class _Request:
+    __slots__ = ("key", "fn", "pages", "settle", "waiters", "order")
+
+    def __init__(self, key, fn, pages, settle, order):
+        self.key = key
+        self.fn = fn
+        self.pages = pages
+        self.settle = settle
+        # (on_done, on_error) of every caller that asked for this key
+        self.waiters = []
+        self.order = order
+
+
+class RequestScheduler:
+    """Sits between the navigation of the views and the background pool.
+
+    Requests are keyed: asking for one that is already queued or running joins it, and every
+    caller gets the same result. A request is for a span of pages, ``(first, last)`` in month
+    numbers (``month_index``), or for no page in particular (``None``). Queued requests start
+    nearest to the visible page first. When the view moves, the ones left more than ``keep``
+    pages away are dropped, and their callers get ``RequestDropped``.
+
+    While the user is still paging, requests submitted with ``settle`` (the ones that cost an
+    API call) wait until navigation has been quiet for ``settle`` seconds, so a held arrow key
+    only fetches where it stops. Local reads go ahead, nearest first.
+
+    ``run(fn, on_done, on_error)`` starts ``fn`` in the background. ``wake(delay)`` asks the
+    owner to call ``pump`` after ``delay`` seconds; a later call replaces an earlier one.
+    """
+
+    def __init__(self, run, wake, max_running=2, settle=0.15, keep=2, clock=time.monotonic):
+        self._run = run
+        self._wake = wake
+        self._max_running = max_running
+        self._settle = settle
+        self._keep = keep
+        self._clock = clock
+        self._queued = {}
+        self._running = {}
+        self._order = itertools.count()
+        self._quiet_at = 0
+        self.visible = None
+
+    def __len__(self):
+        return len(self._queued) + len(self._running)
+
+    def _distance(self, request):
+        if request.pages is None or self.visible is None:
+            return 0
+        first, last = request.pages
+        return max(first - self.visible, self.visible - last, 0)
+
+    def submit(self, key, fn, on_done, on_error=None, pages=None, settle=False):
+        """Run ``fn`` for ``key``, or join the request for ``key`` already queued or running.
+
+        ``on_error`` also gets ``RequestDropped``; without one, errors are ignored. With
+        ``settle``, it does not start while the user is paging.
+        """
+        request = self._running.get(key) or self._queued.get(key)
+        if request is None:
+            request = self._queued[key] = _Request(key, fn, pages, settle, next(self._order))
+        request.waiters.append((on_done, on_error))
+        self.pump()
+
+    def navigate(self, page):
+        """The view moved to ``page``: drop what is now out of reach and hold back the API calls."""
+        self.visible = page
+        self._quiet_at = self._clock() + self._settle
+        self._drop([request for request in self._queued.values() if self._distance(request) > self._keep])
+
+    def clear(self):
+        """Drop every queued request; running ones still report to their callers."""
+        self._drop(list(self._queued.values()))
+
+    def _drop(self, requests):
+        for request in requests:
+            del self._queued[request.key]
+        for request in requests:
+            for _, on_error in request.waiters:
+                if on_error is not None:
+                    on_error(RequestDropped(request.key))
+
+    def pump(self):
+        """Start as many queued requests as may run now, the nearest to the visible page first."""
+        wait = self._quiet_at - self._clock()
+        while len(self._running) < self._max_running:
+            ready = [r for r in self._queued.values() if wait <= 0 or not r.settle]
+            if not ready:
+                break
+            request = min(ready, key=lambda r: (self._distance(r), r.order))
+            del self._queued[request.key]
+            self._running[request.key] = request
+            self._run(request.fn,
+                      lambda result, request=request: self._finish(request, result, None),
+                      lambda error, request=request: self._finish(request, None, error))
+        if wait > 0 and self._queued:
+            self._wake(wait)
+
+    def _finish(self, request, result, error):
+        # Gone before the callbacks run, so one of them can ask for the same key afresh
+        del self._running[request.key]
+        for on_done, on_error in request.waiters:
+            if error is None:
+                on_done(result)
+            elif on_error is not None:
+                on_error(error)
+        self.pump()
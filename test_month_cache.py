@@ -0,0 +1,48 @@
+from event_record import EventRecord
+from month_cache import MonthCache, local_midnight_ts, month_range
+
+
+JANUARY, FEBRUARY = (2026, 1), (2026, 2)
+
+
+def _event(event_id, start, end, summary=""):
+    return {"_calendar": "primary", "id": event_id, "summary": summary,
+            "start": {"dateTime": start}, "end": {"dateTime": end}}
+
+
+def _cache_with(*events):
+    cache = MonthCache(1024 * 1024)
+    records = sorted((EventRecord.from_event(ev) for ev in events), key=lambda ev: ev.start_ts)
+    for month in (JANUARY, FEBRUARY):
+        first, next_month = month_range(*month)
+        cache.put(month, [ev for ev in records if ev.start_ts < local_midnight_ts(next_month)
+                          and ev.end_ts > local_midnight_ts(first)], 0)
+    return cache
+
+
+def _cached(cache, month):
+    return [(ev.id, ev.summary) for ev in cache.get(month)]
+
+
+def test_edit_replaces_the_cached_row():
+    cache = _cache_with(_event("a", "2026-01-10T09:00:00", "2026-01-10T10:00:00"),
+                        _event("b", "2026-01-11T09:00:00", "2026-01-11T10:00:00"))
+    edited = _event("a", "2026-01-12T09:00:00", "2026-01-12T10:00:00", "edited")
+    assert cache.replace_event(("primary", "a"), EventRecord.from_event(edited)) == [JANUARY]
+    assert _cached(cache, JANUARY) == [("b", ""), ("a", "edited")]
+
+
+def test_delete_drops_the_cached_row():
+    cache = _cache_with(_event("a", "2026-01-10T09:00:00", "2026-01-10T10:00:00"),
+                        _event("b", "2026-01-11T09:00:00", "2026-01-11T10:00:00"))
+    assert cache.replace_event(("primary", "a"), None) == [JANUARY]
+    assert _cached(cache, JANUARY) == [("b", "")]
+
+
+def test_event_spanning_two_months_is_replaced_in_both():
+    cache = _cache_with(_event("a", "2026-01-30T09:00:00", "2026-02-02T10:00:00"))
+    edited = _event("a", "2026-01-31T09:00:00", "2026-02-03T10:00:00", "edited")
+    assert sorted(cache.replace_event(("primary", "a"), EventRecord.from_event(edited))) == [JANUARY, FEBRUARY]
+    assert _cached(cache, JANUARY) == _cached(cache, FEBRUARY) == [("a", "edited")]
+    cache.replace_event(("primary", "a"), None)
+    assert _cached(cache, JANUARY) == _cached(cache, FEBRUARY) == []
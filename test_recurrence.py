@@ -0,0 +1,103 @@
+import datetime
+
+from calendar_sync import CalendarSync
+from recurrence import Series, iter_rule_dates, original_key, parse_rule
+
+
+ZONE = "Europe/Bucharest"
+
+
+def _series(start, end, *recurrence, event_id="s"):
+    return Series({"id": event_id, "start": {"dateTime": start, "timeZone": ZONE},
+                   "end": {"dateTime": end, "timeZone": ZONE}, "recurrence": list(recurrence)})
+
+
+def _ts(year, month, day):
+    return int(datetime.datetime(year, month, day, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _starts(series, first=(2000, 1, 1), end=(2100, 1, 1), overridden=()):
+    return [start.isoformat() for start, _ in series.occurrences(_ts(*first), _ts(*end), overridden)]
+
+
+def _dates(rule, dtstart, limit=None):
+    dates = []
+    for day in iter_rule_dates(parse_rule(rule), dtstart):
+        if limit is not None and len(dates) == limit:
+            break
+        dates.append(day.isoformat())
+    return dates
+
+
+def test_byday_ordinal_is_the_last_friday_of_each_month():
+    assert _dates("RRULE:FREQ=MONTHLY;BYDAY=-1FR", datetime.date(2026, 1, 1), 4) == [
+        "2026-01-30", "2026-02-27", "2026-03-27", "2026-04-24"]
+
+
+def test_bysetpos_picks_the_last_weekday_of_each_month():
+    assert _dates("RRULE:FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1", datetime.date(2026, 1, 1), 4) == [
+        "2026-01-30", "2026-02-27", "2026-03-31", "2026-04-30"]
+
+
+def test_bymonthday_31_skips_short_months():
+    assert _dates("RRULE:FREQ=MONTHLY;BYMONTHDAY=31;COUNT=4", datetime.date(2026, 1, 31)) == [
+        "2026-01-31", "2026-03-31", "2026-05-31", "2026-07-31"]
+
+
+def test_interval_with_count():
+    assert _dates("RRULE:FREQ=DAILY;INTERVAL=3;COUNT=4", datetime.date(2026, 1, 1)) == [
+        "2026-01-01", "2026-01-04", "2026-01-07", "2026-01-10"]
+
+
+def test_interval_with_until_includes_the_last_start():
+    series = _series("2026-01-05T09:00:00+02:00", "2026-01-05T10:00:00+02:00",
+                     "RRULE:FREQ=WEEKLY;INTERVAL=2;UNTIL=20260216T070000Z")
+    assert _starts(series) == ["2026-01-05T09:00:00+02:00", "2026-01-19T09:00:00+02:00",
+                               "2026-02-02T09:00:00+02:00", "2026-02-16T09:00:00+02:00"]
+    assert series.span()[1] == _ts(2026, 2, 16) + 8 * 3600
+
+
+def test_exdates_with_tzid_and_in_utc_are_skipped():
+    series = _series("2026-01-05T09:00:00+02:00", "2026-01-05T10:00:00+02:00",
+                     "RRULE:FREQ=WEEKLY;COUNT=4",
+                     f"EXDATE;TZID={ZONE}:20260112T090000",
+                     "EXDATE:20260119T070000Z")
+    assert _starts(series) == ["2026-01-05T09:00:00+02:00", "2026-01-26T09:00:00+02:00"]
+
+
+def test_wall_clock_time_is_kept_across_dst():
+    series = _series("2026-03-28T09:00:00+02:00", "2026-03-28T10:00:00+02:00", "RRULE:FREQ=DAILY;COUNT=2")
+    assert _starts(series) == ["2026-03-28T09:00:00+02:00", "2026-03-29T09:00:00+03:00"]
+    assert [instance["id"] for instance in series.instances(_ts(2026, 3, 1), _ts(2026, 4, 1))] == [
+        "s_20260328T070000Z", "s_20260329T060000Z"]
+    series = _series("2026-10-24T09:00:00+03:00", "2026-10-24T10:00:00+03:00", "RRULE:FREQ=DAILY;COUNT=2")
+    assert _starts(series) == ["2026-10-24T09:00:00+03:00", "2026-10-25T09:00:00+02:00"]
+
+
+def test_skipping_ahead_matches_the_full_expansion():
+    for rule in ("RRULE:FREQ=WEEKLY;INTERVAL=3;BYDAY=TU,FR", "RRULE:FREQ=MONTHLY;INTERVAL=2;BYDAY=-1FR",
+                 "RRULE:FREQ=DAILY;INTERVAL=5", "RRULE:FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29"):
+        series = _series("2020-01-03T23:30:00+02:00", "2020-01-04T01:00:00+02:00", rule)
+        seen = 0
+        for first, end in (((2026, 5, 20), (2026, 8, 1)), ((2032, 2, 20), (2032, 4, 1))):
+            start_ts, end_ts = _ts(*first), _ts(*end)
+            full = [(start, stop) for start, stop in series.occurrences(_ts(2020, 1, 1), end_ts)
+                    if series._timestamp(stop) > start_ts]
+            assert list(series.occurrences(start_ts, end_ts)) == full, rule
+            seen += len(full)
+        assert seen, rule
+
+
+def test_exception_replaces_its_original_occurrence(tmp_path):
+    master = {"id": "s", "summary": "Curs", "start": {"dateTime": "2026-01-05T09:00:00+02:00", "timeZone": ZONE},
+              "end": {"dateTime": "2026-01-05T10:00:00+02:00", "timeZone": ZONE},
+              "recurrence": ["RRULE:FREQ=WEEKLY;COUNT=3"]}
+    moved = {"id": "s_20260112T070000Z", "recurringEventId": "s", "summary": "Curs mutat",
+             "originalStartTime": {"dateTime": "2026-01-12T09:00:00+02:00", "timeZone": ZONE},
+             "start": {"dateTime": "2026-01-13T15:00:00+02:00"}, "end": {"dateTime": "2026-01-13T16:00:00+02:00"}}
+    assert original_key(moved["originalStartTime"]) == str(_ts(2026, 1, 12) + 7 * 3600)
+    engine = CalendarSync(store_path=str(tmp_path / "events.db"), expand_recurrence=True)
+    engine.store.apply_changes("primary", [master, moved], overrides=True)
+    events = engine.iter_events(["primary"], datetime.date(2026, 1, 1), datetime.date(2026, 2, 1))
+    assert [(ev["id"], ev["summary"]) for _, _, _, ev in events] == [
+        ("s_20260105T070000Z", "Curs"), ("s_20260112T070000Z", "Curs mutat"), ("s_20260119T070000Z", "Curs")]
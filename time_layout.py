@@ -0,0 +1,167 @@
+import bisect
+import datetime
+import heapq
+
+from month_cache import local_midnight_ts
+
+
+DAY_MINUTES = 24 * 60
+# Shorter events still get this much room, so they can be seen and clicked
+MIN_BLOCK_MINUTES = 20
+
+
+class Block:
+    """One event's piece on one day of a time grid, in minutes since that day's midnight."""
+
+    __slots__ = ("day", "start", "end", "event", "column", "columns", "continues_before", "continues_after")
+
+    def __init__(self, day, start, end, event, continues_before, continues_after):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.event = event
+        self.column = 0
+        self.columns = 1
+        self.continues_before = continues_before
+        self.continues_after = continues_after
+
+
+class Bar:
+    """An all-day or day-long event across days ``first``..``last`` of a grid; ``column`` is its lane."""
+
+    __slots__ = ("first", "last", "event", "column", "columns", "continues_before", "continues_after")
+
+    def __init__(self, first, last, event, continues_before, continues_after):
+        self.first = first
+        self.last = last
+        self.event = event
+        self.column = 0
+        self.columns = 1
+        self.continues_before = continues_before
+        self.continues_after = continues_after
+
+
+class TimeGridLayout:
+    """Where every event of ``days`` days from ``first`` goes: ``bars`` (on ``lanes`` lanes)
+    above the grid, ``blocks[day]`` side by side within it.
+    """
+
+    def __init__(self, first, days, blocks, bars, lanes):
+        self.first = first
+        self.days = days
+        self.blocks = blocks
+        self.bars = bars
+        self.lanes = lanes
+
+
+def day_bounds(first, days):
+    """Local midnights from ``first`` to the day after the last, as timestamps (DST-safe)."""
+    return [local_midnight_ts(first + datetime.timedelta(days=i)) for i in range(days + 1)]
+
+
+def is_day_long(event):
+    """Shown as a bar above the hours rather than inside them."""
+    return event.all_day or event.end_ts - event.start_ts >= 86400
+
+
+def split_by_day(events, bounds):
+    """``(day, start_ts, end_ts, event)`` for every day of ``bounds`` each event overlaps,
+    with the times clipped to that day. An instant (start == end) lands on its start's day.
+
+    Events are ``EventRecord``s, or anything with ``start_ts`` and ``end_ts``.
+    """
+    days = len(bounds) - 1
+    for event in events:
+        start, end = event.start_ts, max(event.start_ts, event.end_ts)
+        day = max(bisect.bisect_right(bounds, start) - 1, 0)
+        while day < days and bounds[day] < end or (start == end and day < days and bounds[day] <= start):
+            yield day, max(start, bounds[day]), min(end, bounds[day + 1]), event
+            if start == end:
+                break
+            day += 1
+
+
+def assign_columns(items, start_of, end_of):
+    """Sweep-line packing of ``items`` (sorted by start) into the fewest side-by-side columns.
+
+    Each item gets ``column``, and ``columns``: the width of its cluster, i.e. of the run of
+    transitively overlapping items it belongs to, so a cluster shares the space evenly.
+    Returns the largest width. O(n log n): one heap of running items, one of freed columns.
+    """
+    running = []
+    free = []
+    cluster = []
+    width = widest = 0
+    for item in items:
+        start = start_of(item)
+        while running and running[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(running)[1])
+        if not running:
+            for done in cluster:
+                done.columns = width
+            cluster, free, width = [], [], 0
+        if free:
+            column = heapq.heappop(free)
+        else:
+            column, width = width, width + 1
+        heapq.heappush(running, (end_of(item), column))
+        item.column = column
+        cluster.append(item)
+        widest = max(widest, width)
+    for done in cluster:
+        done.columns = width
+    return widest
+
+
+def _minutes(ts, midnight):
+    # Wall-clock minutes, so a block sits at its hour on DST days too
+    if ts == midnight:
+        return 0
+    t = datetime.datetime.fromtimestamp(ts)
+    return t.hour * 60 + t.minute
+
+
+def layout_days(events, first, days):
+    """Lay out ``events`` (``EventRecord``s, in start order) over ``days`` days from ``first``.
+
+    All-day events and timed ones lasting a day or more become bars; the rest are cut at
+    midnight into per-day blocks, then packed into columns day by day.
+    """
+    bounds = day_bounds(first, days)
+    blocks = [[] for _ in range(days)]
+    bars = []
+    spans = {}
+    for day, start, end, event in split_by_day(events, bounds):
+        if is_day_long(event):
+            span = spans.get(id(event))
+            if span is None:
+                spans[id(event)] = span = Bar(day, day, event, event.start_ts < bounds[day], False)
+                bars.append(span)
+            span.last = day
+            span.continues_after = event.end_ts > bounds[day + 1]
+            continue
+        block = Block(day, _minutes(start, bounds[day]), 0, event, event.start_ts < start, event.end_ts > end)
+        block.end = DAY_MINUTES if end == bounds[day + 1] else _minutes(end, bounds[day])
+        blocks[day].append(block)
+    for day_blocks in blocks:
+        day_blocks.sort(key=lambda b: (b.start, -b.end))
+        assign_columns(day_blocks, lambda b: b.start, lambda b: max(b.end, b.start + MIN_BLOCK_MINUTES))
+    bars.sort(key=lambda b: (b.first, -b.last))
+    lanes = assign_columns(bars, lambda b: b.first, lambda b: b.last + 1)
+    return TimeGridLayout(first, days, blocks, bars, lanes)
+
+
+def bucket_by_day(events, first, end):
+    """``{date: [event, ...]}`` for every local day in [first, end) each event overlaps, in the given order."""
+    days = (end - first).days
+    buckets = {}
+    for day, _, _, event in split_by_day(events, day_bounds(first, days)):
+        buckets.setdefault(first + datetime.timedelta(days=day), []).append(event)
+    return buckets
+
+
+def events_on_day(events, day):
+    """Events overlapping the local calendar day ``day``."""
+    day_start = local_midnight_ts(day)
+    day_end = local_midnight_ts(day + datetime.timedelta(days=1))
+    return [ev for ev in events if ev.start_ts < day_end and ev.end_ts > day_start]